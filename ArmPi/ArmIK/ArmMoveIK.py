@@ -8,6 +8,8 @@ from math import sqrt
 import matplotlib.pyplot as plt
 from ArmIK.InverseKinematics import *
 from ArmIK.Transform import getAngle
+from ArmIK.BatchIK import BatchIK
+from ArmIK.IKTable import IKTable
 from mpl_toolkits.mplot3d import Axes3D
 from HiwonderSDK.Board import setBusServoPulse, getBusServoPulse
 
@@ -37,6 +39,17 @@ class ArmIK:
         self.servo4Param = (self.servo4Range[1] - self.servo4Range[0]) / (self.servo4Range[3] - self.servo4Range[2])
         self.servo5Param = (self.servo5Range[1] - self.servo5Range[0]) / (self.servo5Range[3] - self.servo5Range[2])
         self.servo6Param = (self.servo6Range[1] - self.servo6Range[0]) / (self.servo6Range[3] - self.servo6Range[2])
+        # 批量求解器，一次计算所有候选俯仰角
+        self.batch = BatchIK(ik, self.servo3Range, self.servo4Range, self.servo5Range, self.servo6Range)
+        # 舵机范围改变后查找表失效，需要重新调用useIKTable
+        self.table = None
+
+    def useIKTable(self, **kwargs):
+        # 使用预先计算的查找表加速setPitchRangeMoving，参数同IKTable，默认对应alpha=-90, alpha1=-90, alpha2=0的查询
+        # 表保存在文件中，首次使用或连杆参数、舵机范围改变时重新计算
+        self.table = IKTable(self.batch, transform=self.transformAngelAdaptArm, **kwargs)
+        self.table.load()
+        return self.table
 
     def transformAngelAdaptArm(self, theta3, theta4, theta5, theta6):
         #将逆运动学算出的角度转换为舵机对应的脉宽值
@@ -87,18 +100,8 @@ class ArmIK:
         #如果无解返回False,否则返回对应舵机角度,俯仰角
         #坐标单位cm， 以元组形式传入，例如(0, 5, 10)
         #da为俯仰角遍历时每次增加的角度
-        x, y, z = coordinate_data
-        if alpha1 >= alpha2:
-            da = -da
-        for alpha in np.arange(alpha1, alpha2, da):#遍历求解
-            result = ik.getRotationAngle((x, y, z), alpha)
-            if result:
-                theta3, theta4, theta5, theta6 = result['theta3'], result['theta4'], result['theta5'], result['theta6']
-                servos = self.transformAngelAdaptArm(theta3, theta4, theta5, theta6)
-                if servos != False:
-                    return servos, alpha
-
-        return False
+        #所有俯仰角一次批量求解，返回遍历顺序中第一个可行解
+        return self.batch.setPitchRange(coordinate_data, alpha1, alpha2, da)
 
     def setPitchRangeMoving(self, coordinate_data, alpha, alpha1, alpha2, movetime=None):
         #给定坐标coordinate_data和俯仰角alpha,以及俯仰角范围的范围alpha1, alpha2，自动寻找最接近给定俯仰角的解，并转到目标位置
@@ -107,19 +110,13 @@ class ArmIK:
         #alpha为给定俯仰角
         #alpha1和alpha2为俯仰角的取值范围
         #movetime为舵机转动时间，单位ms, 如果不给出时间，则自动计算
-        x, y, z = coordinate_data
-        result1 = self.setPitchRange((x, y, z), alpha, alpha1)
-        result2 = self.setPitchRange((x, y, z), alpha, alpha2)
-        if result1 != False:
-            data = result1
-            if result2 != False:
-                if abs(result2[1] - alpha) < abs(result1[1] - alpha):
-                    data = result2
+        #两个方向的俯仰角一次求解，取最接近alpha的解；有对应的查找表时先查表
+        if self.table is not None and self.table.matches(alpha, alpha1, alpha2):
+            data = self.table.lookup(coordinate_data)
         else:
-            if result2 != False:
-                data = result2
-            else:
-                return False
+            data = self.batch.bestPitch(coordinate_data, alpha, alpha1, alpha2)
+        if data == False:
+            return False
         servos, alpha = data[0], data[1]
 
         movetime = self.servosMove((servos["servo3"], servos["servo4"], servos["servo5"], servos["servo6"]), movetime)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+# 批量逆运动学：用NumPy一次求解多个目标点、多个俯仰角，并同时判断舵机范围
+# 结果与 IK.getRotationAngle + ArmIK.transformAngelAdaptArm 逐个求解一致
+import sys
+sys.path.append('/home/pi/ArmPi/')
+import numpy as np
+from ArmIK.InverseKinematics import IK
+
+SERVO_RANGE = (0, 1000, 0, 240) #脉宽， 角度
+
+class BatchIK:
+    def __init__(self, ik, servo3_Range=SERVO_RANGE, servo4_Range=SERVO_RANGE, servo5_Range=SERVO_RANGE, servo6_Range=SERVO_RANGE):
+        # ik为已设置好连杆长度的IK对象
+        self.ik = ik
+        self.setServoRange(servo3_Range, servo4_Range, servo5_Range, servo6_Range)
+
+    def setServoRange(self, servo3_Range=SERVO_RANGE, servo4_Range=SERVO_RANGE, servo5_Range=SERVO_RANGE, servo6_Range=SERVO_RANGE):
+        # 适配不同的舵机，参数同ArmIK.setServoRange
+        self.servo3Range = servo3_Range
+        self.servo4Range = servo4_Range
+        self.servo5Range = servo5_Range
+        self.servo6Range = servo6_Range
+        self.servo3Param = (self.servo3Range[1] - self.servo3Range[0]) / (self.servo3Range[3] - self.servo3Range[2])
+        self.servo4Param = (self.servo4Range[1] - self.servo4Range[0]) / (self.servo4Range[3] - self.servo4Range[2])
+        self.servo5Param = (self.servo5Range[1] - self.servo5Range[0]) / (self.servo5Range[3] - self.servo5Range[2])
+        self.servo6Param = (self.servo6Range[1] - self.servo6Range[0]) / (self.servo6Range[3] - self.servo6Range[2])
+
+    def getRotationAngles(self, coordinates, alphas):
+        # 批量版的IK.getRotationAngle
+        # coordinates为(N, 3)的坐标数组，alphas为(M,)的俯仰角数组，单位cm和度
+        # 返回theta3, theta4, theta5, theta6（形状(N, M)）和有解掩码valid
+        ik = self.ik
+        coordinates = np.asarray(coordinates, dtype=float).reshape(-1, 3)
+        X = coordinates[:, 0:1]
+        Y = coordinates[:, 1:2]
+        Z = coordinates[:, 2:3]
+        Alpha = np.asarray(alphas, dtype=float).reshape(1, -1)
+        if ik.arm_type == 'pump':
+            Alpha = Alpha - ik.alpha
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            #求底座旋转角度
+            theta6 = np.degrees(np.arctan2(Y, X)) + np.zeros_like(Alpha)
+
+            P_O = np.sqrt(X*X + Y*Y) #P_到原点O距离
+            CD = ik.l4 * np.cos(np.radians(Alpha))
+            PD = ik.l4 * np.sin(np.radians(Alpha))
+            AF = P_O - CD
+            CF = Z - ik.l1 - PD
+            AC = np.sqrt(AF**2 + CF**2)
+            valid = (np.round(CF, 4) >= -ik.l1) & (ik.l2 + ik.l3 >= np.round(AC, 4))
+
+            #求theat4，余弦定理
+            cos_ABC = np.round(-(AC**2 - ik.l2**2 - ik.l3**2)/(2*ik.l2*ik.l3), 4)
+            valid &= np.abs(cos_ABC) <= 1
+            theta4 = 180.0 - np.degrees(np.arccos(cos_ABC))
+
+            #求theta5
+            CAF = np.arccos(AF / AC)
+            cos_BAC = np.round((AC**2 + ik.l2**2 - ik.l3**2)/(2*ik.l2*AC), 4)
+            valid &= np.abs(cos_BAC) <= 1
+            zf_flag = np.where(CF < 0, -1, 1)
+            theta5 = np.degrees(CAF * zf_flag + np.arccos(cos_BAC))
+
+            #求theta3
+            theta3 = Alpha - theta5 + theta4
+            if ik.arm_type == 'pump':
+                theta3 = theta3 + ik.alpha
+
+        valid &= np.isfinite(theta3) & np.isfinite(theta5)
+        return theta3, theta4, theta5, theta6, valid
+
+    def transformAngelAdaptArm(self, theta3, theta4, theta5, theta6):
+        # 批量版的ArmIK.transformAngelAdaptArm
+        # 返回舵机脉宽数组（最后一维依次为3,4,5,6号舵机）和范围内掩码
+        with np.errstate(invalid='ignore'):
+            servo3 = np.round(theta3 * self.servo3Param + (self.servo3Range[1] + self.servo3Range[0])/2)
+            valid = (servo3 <= self.servo3Range[1]) & (servo3 >= self.servo3Range[0] + 60)
+
+            servo4 = np.round(theta4 * self.servo4Param + (self.servo4Range[1] + self.servo4Range[0])/2)
+            valid &= (servo4 <= self.servo4Range[1]) & (servo4 >= self.servo4Range[0])
+
+            servo5_mid = (self.servo5Range[1] + self.servo5Range[0])/2
+            servo5 = np.round(servo5_mid - (90.0 - theta5) * self.servo5Param)
+            valid &= (servo5 <= servo5_mid + 90*self.servo5Param) & (servo5 >= servo5_mid - 90*self.servo5Param)
+
+            half6 = (self.servo6Range[3] - self.servo6Range[2])/2
+            servo6 = np.round(np.where(theta6 < -half6,
+                                       (half6 + (90 + (180 + theta6))) * self.servo6Param,
+                                       (half6 - (90 - theta6)) * self.servo6Param))
+            valid &= (servo6 <= self.servo6Range[1]) & (servo6 >= self.servo6Range[0])
+
+        servos = np.stack([servo3, servo4, servo5, servo6], axis=-1)
+        servos = np.where(valid[..., np.newaxis], servos, 0).astype(int)
+        return servos, valid
+
+    def solve(self, coordinates, alphas):
+        # 对每个坐标、每个俯仰角求舵机脉宽
+        # 返回servos（形状(N, M, 4)）和可行掩码feasible（形状(N, M)）
+        theta3, theta4, theta5, theta6, valid = self.getRotationAngles(coordinates, alphas)
+        servos, in_range = self.transformAngelAdaptArm(theta3, theta4, theta5, theta6)
+        return servos, valid & in_range
+
+    @staticmethod
+    def pitchCandidates(alpha1, alpha2, da=1):
+        # 与ArmIK.setPitchRange相同的俯仰角遍历顺序
+        if alpha1 >= alpha2:
+            da = -da
+        return np.arange(alpha1, alpha2, da)
+
+    @staticmethod
+    def _firstFeasible(feasible, start, stop):
+        # 每行在[start, stop)列中第一个可行解的列号，以及是否找到
+        n = len(feasible)
+        if stop <= start:
+            return np.zeros(n, dtype=int), np.zeros(n, dtype=bool)
+        first = start + np.argmax(feasible[:, start:stop], axis=1)
+        return first, feasible[np.arange(n), first]
+
+    def setPitchRanges(self, coordinates, alpha1, alpha2, da=1):
+        # 批量版的ArmIK.setPitchRange：每个坐标取遍历顺序中第一个可行的俯仰角
+        # 返回servos（(N, 4)）、alpha（(N,)）和found（(N,)）
+        alphas = self.pitchCandidates(alpha1, alpha2, da)
+        coordinates = np.asarray(coordinates, dtype=float).reshape(-1, 3)
+        n = len(coordinates)
+        if len(alphas) == 0:
+            return np.zeros((n, 4), dtype=int), np.full(n, np.nan), np.zeros(n, dtype=bool)
+        servos, feasible = self.solve(coordinates, alphas)
+        first, found = self._firstFeasible(feasible, 0, len(alphas))
+        return servos[np.arange(n), first], np.where(found, alphas[first], np.nan), found
+
+    def setPitchRange(self, coordinate_data, alpha1, alpha2, da=1):
+        # 与ArmIK.setPitchRange返回值相同：无解返回False，否则返回(舵机脉宽字典, 俯仰角)
+        servos, alpha, found = self.setPitchRanges([coordinate_data], alpha1, alpha2, da)
+        if not found[0]:
+            return False
+        return self._servoDict(servos[0]), alpha[0]
+
+    @classmethod
+    def pitchOrder(cls, alpha, alpha1, alpha2, da=1):
+        # ArmIK.setPitchRangeMoving的两个遍历方向：alpha到alpha1、alpha到alpha2
+        # 返回拼接后的俯仰角数组和两个方向的分界
+        toward1 = cls.pitchCandidates(alpha, alpha1, da)
+        toward2 = cls.pitchCandidates(alpha, alpha2, da)
+        return np.concatenate([toward1, toward2]), len(toward1)
+
+    def selectPitch(self, servos, feasible, alphas, split, alpha):
+        # 在solve的结果中按setPitchRangeMoving的规则取解：
+        # 两个方向各取第一个可行解，取最接近alpha的（相同时取alpha1方向）
+        n = len(feasible)
+        rows = np.arange(n)
+        first1, found1 = self._firstFeasible(feasible, 0, split)
+        first2, found2 = self._firstFeasible(feasible, split, len(alphas))
+        if len(alphas) == 0:
+            return np.zeros((n, 4), dtype=int), np.full(n, np.nan), found1
+        use2 = found2 & (~found1 | (np.abs(alphas[first2] - alpha) < np.abs(alphas[first1] - alpha)))
+        best = np.where(use2, first2, first1)
+        found = found1 | found2
+        return servos[rows, best], np.where(found, alphas[best], np.nan), found
+
+    def bestPitches(self, coordinates, alpha, alpha1, alpha2, da=1):
+        # 批量版的setPitchRangeMoving求解部分
+        # 返回servos（(N, 4)）、alpha（(N,)）和found（(N,)）
+        alphas, split = self.pitchOrder(alpha, alpha1, alpha2, da)
+        coordinates = np.asarray(coordinates, dtype=float).reshape(-1, 3)
+        if len(alphas) == 0:
+            return self.selectPitch(None, np.zeros((len(coordinates), 0), dtype=bool), alphas, split, alpha)
+        servos, feasible = self.solve(coordinates, alphas)
+        return self.selectPitch(servos, feasible, alphas, split, alpha)
+
+    def bestPitch(self, coordinate_data, alpha, alpha1, alpha2, da=1):
+        # ArmIK.setPitchRangeMoving的求解部分，两个方向的俯仰角一次求解
+        # 无解返回False，否则返回(舵机脉宽字典, 俯仰角)
+        servos, best, found = self.bestPitches([coordinate_data], alpha, alpha1, alpha2, da)
+        if not found[0]:
+            return False
+        return self._servoDict(servos[0]), best[0]
+
+    @staticmethod
+    def _servoDict(servos):
+        return {"servo3": int(servos[0]), "servo4": int(servos[1]), "servo5": int(servos[2]), "servo6": int(servos[3])}
+
+if __name__ == '__main__':
+    ik = IK('arm')
+    ik.setLinkLength(L1=ik.l1 + 0.75, L4=ik.l4 - 0.15)
+    batch = BatchIK(ik)
+    print(batch.bestPitch((-4.8, 15, 1.5), 0, -90, 0))
+    servos, alpha, found = batch.setPitchRanges([(0, 10, 10), (-4.8, 15, 1.5), (0, 40, 0)], 0, -90)
+    print(servos, alpha, found)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+# 批量逆运动学与逐个求解的速度对比，并检查两者结果一致
+# 用法：python3 BatchIKBenchmark.py [目标点数]
+import sys
+sys.path.append('/home/pi/ArmPi/')
+import time
+import numpy as np
+from ArmIK.ArmMoveIK import ik, ArmIK
+
+def scalarPitchRange(AK, coordinate_data, alpha1, alpha2, da=1):
+    # 原来的逐角度求解：每个俯仰角调用一次getRotationAngle和transformAngelAdaptArm
+    if alpha1 >= alpha2:
+        da = -da
+    for alpha in np.arange(alpha1, alpha2, da):
+        result = ik.getRotationAngle(coordinate_data, alpha)
+        if result:
+            servos = AK.transformAngelAdaptArm(result['theta3'], result['theta4'], result['theta5'], result['theta6'])
+            if servos != False:
+                return servos, alpha
+    return False
+
+def scalarBestPitch(AK, coordinate_data, alpha, alpha1, alpha2):
+    # 原来setPitchRangeMoving的求解部分
+    result1 = scalarPitchRange(AK, coordinate_data, alpha, alpha1)
+    result2 = scalarPitchRange(AK, coordinate_data, alpha, alpha2)
+    if result1 != False:
+        if result2 != False and abs(result2[1] - alpha) < abs(result1[1] - alpha):
+            return result2
+        return result1
+    return result2
+
+def run(AK, count=500, seed=0):
+    # 在工作空间内随机取点，俯仰角-90到0度，与各功能玩法的用法相同
+    rng = np.random.default_rng(seed)
+    points = np.column_stack([rng.uniform(-20, 20, count), rng.uniform(5, 30, count), rng.uniform(0, 20, count)])
+    targets = [tuple(p) for p in points]
+
+    t = time.perf_counter()
+    scalar = [scalarBestPitch(AK, p, -90, -90, 0) for p in targets]
+    scalar_time = time.perf_counter() - t
+
+    t = time.perf_counter()
+    batch = [AK.batch.bestPitch(p, -90, -90, 0) for p in targets]
+    batch_time = time.perf_counter() - t
+
+    t = time.perf_counter()
+    servos, alphas, found = AK.batch.setPitchRanges(points, 0, -90)
+    many_time = time.perf_counter() - t
+
+    mismatches = sum(1 for a, b in zip(scalar, batch) if a != b)
+    print('目标点数: %d, 有解: %d, 结果不一致: %d' % (count, sum(1 for r in scalar if r != False), mismatches))
+    print('逐个求解:   %8.1f us/点' % (scalar_time / count * 1e6))
+    print('批量俯仰角: %8.1f us/点 (%.1fx)' % (batch_time / count * 1e6, scalar_time / batch_time))
+    print('批量目标点: %8.1f us/点 (setPitchRanges, %d个点一次求解)' % (many_time / count * 1e6, count))
+    return mismatches
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    sys.exit(1 if run(ArmIK(), count) else 0)
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+# 逆运动学查找表：在(x, y, z)网格上预先求出每个点的可行俯仰角范围，以及setPitchRangeMoving的解
+# 查询时在所在网格内对俯仰角做三线性插值，只在这个俯仰角（及更接近alpha的相邻角度）上求逆运动学，
+# 舵机脉宽是精确解；alpha1和alpha2在alpha两侧时，另一侧更接近alpha的俯仰角再一次批量求解；
+# 靠近工作空间边界、或网格顶点的俯仰角相差太大时改为完整的精确求解
+# 注意：同一侧只从查表得到的俯仰角向alpha逐度尝试，遇到无解即停止，若可行俯仰角在中间断开，
+# 结果可能与setPitchRangeMoving不同（测试中未出现）
+# 表保存为.npz文件，文件名为连杆参数、舵机范围和网格参数的哈希，参数改变后会自动重新计算
+import sys
+sys.path.append('/home/pi/ArmPi/')
+import os
+import time
+import hashlib
+import tempfile
+import itertools
+import numpy as np
+from ArmIK.BatchIK import BatchIK
+
+#查找表存储路径
+table_path = '/home/pi/ArmPi/ArmIK/ik_tables/'
+
+#表格式版本，计算方法改变时加1使旧文件失效
+TABLE_VERSION = 1
+
+#查询时代替nan表示无解，使顶点俯仰角的差值超出max_spread
+NO_SOLUTION = 1e6
+
+#检查另一侧时，候选俯仰角不超过这个数就逐个求解，否则一次批量求解（批量求解的固定开销约为20次单个求解）
+SCALAR_CHECK = 16
+
+class IKTable:
+    def __init__(self, batch, alpha=-90, alpha1=-90, alpha2=0, x_range=(-25, 25), y_range=(-10, 30), z_range=(0, 20), step=0.5, max_spread=10, transform=None, path=table_path):
+        # batch为BatchIK对象，alpha, alpha1, alpha2为查询用的俯仰角及范围，与setPitchRangeMoving的参数相同
+        # x_range, y_range, z_range为网格范围，step为网格间距，单位cm，默认网格首次计算在树莓派上需要几十秒
+        # max_spread为同一网格内8个顶点俯仰角的最大差值，超过时精确求解
+        # transform为把关节角转换为舵机脉宽的函数，参数和返回值同ArmIK.transformAngelAdaptArm，默认用batch计算
+        self.batch = batch
+        self.alpha = alpha
+        self.alpha1 = alpha1
+        self.alpha2 = alpha2
+        self.step = float(step)
+        self.origin = np.array([x_range[0], y_range[0], z_range[0]], dtype=float)
+        self.shape = tuple(int(round((r[1] - r[0]) / self.step)) + 1 for r in (x_range, y_range, z_range))
+        self.max_spread = max_spread
+        #alpha1和alpha2在alpha两侧时，查到一侧的解后还要检查另一侧
+        self.two_sided = (alpha1 - alpha) * (alpha2 - alpha) < 0
+        self.transform = transform if transform is not None else self._batchTransform
+        self.path = path
+        self.pitch = None     #最接近alpha的可行俯仰角，无解为nan
+        self.pitch_min = None #可行俯仰角范围，无解为nan
+        self.pitch_max = None
+        self.servos = None    #对应的3,4,5,6号舵机脉宽
+        self.hits = 0         #插值得到的查询次数
+        self.fallbacks = 0    #精确求解的查询次数
+
+    def key(self):
+        # 连杆参数、舵机范围、俯仰角和网格参数的哈希，作为文件名
+        ik = self.batch.ik
+        params = (TABLE_VERSION, ik.arm_type, ik.l1, ik.l2, ik.l3, ik.l4, ik.l5, ik.l6, ik.alpha,
+                  self.batch.servo3Range, self.batch.servo4Range, self.batch.servo5Range, self.batch.servo6Range,
+                  self.alpha, self.alpha1, self.alpha2, tuple(self.origin), self.step, self.shape)
+        return hashlib.sha1(repr(params).encode()).hexdigest()[:16]
+
+    def fileName(self):
+        return os.path.join(self.path, 'ik_table_%s.npz' % self.key())
+
+    def grid(self):
+        # 网格点坐标，形状(X, Y, Z, 3)
+        axes = [self.origin[i] + self.step * np.arange(self.shape[i]) for i in range(3)]
+        return np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1)
+
+    def build(self):
+        # 计算整张表，按x分层求解以限制内存占用
+        alphas, split = self.batch.pitchOrder(self.alpha, self.alpha1, self.alpha2)
+        points = self.grid()
+        self.pitch = np.full(self.shape, np.nan, dtype=np.float32)
+        self.pitch_min = np.full(self.shape, np.nan, dtype=np.float32)
+        self.pitch_max = np.full(self.shape, np.nan, dtype=np.float32)
+        self.servos = np.zeros(self.shape + (4,), dtype=np.int16)
+        if len(alphas) == 0:
+            self._index()
+            return
+        for i in range(self.shape[0]):
+            layer = points[i].reshape(-1, 3)
+            servos, feasible = self.batch.solve(layer, alphas)
+            best_servos, best, found = self.batch.selectPitch(servos, feasible, alphas, split, self.alpha)
+            with np.errstate(invalid='ignore'):
+                candidates = np.where(feasible, alphas, np.nan)
+                any_feasible = feasible.any(axis=1)
+                low = np.where(any_feasible, np.nanmin(np.where(any_feasible[:, None], candidates, 0), axis=1), np.nan)
+                high = np.where(any_feasible, np.nanmax(np.where(any_feasible[:, None], candidates, 0), axis=1), np.nan)
+            self.pitch[i] = best.reshape(self.shape[1:])
+            self.pitch_min[i] = low.reshape(self.shape[1:])
+            self.pitch_max[i] = high.reshape(self.shape[1:])
+            self.servos[i] = best_servos.reshape(self.shape[1:] + (4,))
+        self._index()
+
+    def save(self):
+        # 先写临时文件再替换，避免中途断电留下损坏的表
+        os.makedirs(self.path, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez_compressed(f, key=self.key(), pitch=self.pitch, pitch_min=self.pitch_min,
+                                    pitch_max=self.pitch_max, servos=self.servos)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, self.fileName())
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def load(self, build=True):
+        # 读取查找表，文件不存在、参数不符或损坏时重新计算并保存
+        # 返回True表示从文件读取
+        try:
+            with np.load(self.fileName()) as data:
+                if str(data['key']) == self.key() and data['pitch'].shape == self.shape:
+                    self.pitch = data['pitch']
+                    self.pitch_min = data['pitch_min']
+                    self.pitch_max = data['pitch_max']
+                    self.servos = data['servos']
+                    self._index()
+                    return True
+        except (OSError, KeyError, ValueError):
+            pass
+        if build:
+            self.build()
+            try:
+                self.save()
+            except OSError as e:
+                print('IKTable: 保存查找表失败', e)
+        return False
+
+    def _index(self):
+        # 展平后的数组和网格8个顶点的偏移，查询时一次取出
+        nx, ny, nz = self.shape
+        self._origin = tuple(self.origin.tolist())
+        self._pitch = np.nan_to_num(self.pitch.reshape(-1).astype(float), nan=NO_SOLUTION)
+        self._corners = np.array([(i*ny + j)*nz + k for i, j, k in itertools.product((0, 1), repeat=3)])
+
+    def matches(self, alpha, alpha1, alpha2):
+        # 查询的俯仰角参数是否与表相同
+        return self.pitch is not None and (alpha, alpha1, alpha2) == (self.alpha, self.alpha1, self.alpha2)
+
+    def _cell(self, coordinate_data):
+        # 坐标所在网格的起始下标和网格内的相对位置，超出网格返回None
+        nx, ny, nz = self.shape
+        ox, oy, oz = self._origin
+        fx = (coordinate_data[0] - ox) / self.step
+        fy = (coordinate_data[1] - oy) / self.step
+        fz = (coordinate_data[2] - oz) / self.step
+        if not (0 <= fx <= nx - 1 and 0 <= fy <= ny - 1 and 0 <= fz <= nz - 1):
+            return None
+        i = min(int(fx), nx - 2)
+        j = min(int(fy), ny - 2)
+        k = min(int(fz), nz - 2)
+        return (i*ny + j)*nz + k, fx - i, fy - j, fz - k
+
+    def _batchTransform(self, theta3, theta4, theta5, theta6):
+        servos, valid = self.batch.transformAngelAdaptArm(theta3, theta4, theta5, theta6)
+        if not valid:
+            return False
+        return self.batch._servoDict(servos)
+
+    def _solveAt(self, coordinate_data, alpha):
+        # 单个俯仰角的逆运动学，无解返回False
+        result = self.batch.ik.getRotationAngle(coordinate_data, alpha)
+        if not result:
+            return False
+        return self.transform(result['theta3'], result['theta4'], result['theta5'], result['theta6'])
+
+    def _otherSide(self, coordinate_data, servos, alpha):
+        # 与setPitchRangeMoving相同的取舍：另一侧的第一个可行解更接近self.alpha时取另一侧，
+        # 距离相同时取alpha1方向
+        distance = abs(alpha - self.alpha)
+        if (alpha - self.alpha) * (self.alpha1 - self.alpha) > 0:
+            candidates = self.batch.pitchCandidates(self.alpha, self.alpha2)[:distance]
+        else:
+            candidates = self.batch.pitchCandidates(self.alpha, self.alpha1)[:distance + 1]
+        if len(candidates) <= SCALAR_CHECK:
+            for candidate in candidates.tolist():
+                other = self._solveAt(coordinate_data, candidate)
+                if other:
+                    return other, candidate
+            return servos, alpha
+        other, feasible = self.batch.solve([coordinate_data], candidates)
+        hits = np.flatnonzero(feasible[0])
+        if len(hits) == 0:
+            return servos, alpha
+        return self.batch._servoDict(other[0][hits[0]]), candidates[hits[0]]
+
+    def lookup(self, coordinate_data):
+        # 与ArmIK.setPitchRangeMoving的求解部分返回值相同：无解返回False，否则返回(舵机脉宽字典, 俯仰角)
+        cell = self._cell(coordinate_data)
+        if cell is not None:
+            base, tx, ty, tz = cell
+            pitch = self._pitch[base + self._corners].tolist()
+            #8个顶点都有解且俯仰角接近时插值
+            if max(pitch) - min(pitch) <= self.max_spread:
+                weights = [wx*wy*wz for wx in (1 - tx, tx) for wy in (1 - ty, ty) for wz in (1 - tz, tz)]
+                alpha = self.alpha + round(sum(w*p for w, p in zip(weights, pitch)) - self.alpha)
+                servos = self._solveAt(coordinate_data, alpha)
+                if servos:
+                    #向alpha方向逐度尝试，取最接近alpha的解
+                    da = 1 if alpha < self.alpha else -1
+                    while alpha != self.alpha:
+                        closer = self._solveAt(coordinate_data, alpha + da)
+                        if not closer:
+                            break
+                        servos, alpha = closer, alpha + da
+                else:
+                    #插值的俯仰角无解时，向顶点中离alpha最远的俯仰角方向寻找
+                    far = max(pitch, key=lambda p: abs(p - self.alpha))
+                    da = 1 if far > alpha else -1
+                    while not servos and alpha != far:
+                        alpha += da
+                        servos = self._solveAt(coordinate_data, alpha)
+                if servos:
+                    if self.two_sided and alpha != self.alpha:
+                        servos, alpha = self._otherSide(coordinate_data, servos, alpha)
+                    self.hits += 1
+                    return servos, float(alpha)
+        self.fallbacks += 1
+        return self.batch.bestPitch(coordinate_data, self.alpha, self.alpha1, self.alpha2)
+
+    def pitchRange(self, coordinate_data):
+        # 最近网格点的可行俯仰角范围，无解或超出网格返回False
+        cell = self._cell(coordinate_data)
+        if cell is None:
+            return False
+        base, tx, ty, tz = cell
+        nx, ny, nz = self.shape
+        index = base + (int(round(tx))*ny + int(round(ty)))*nz + int(round(tz))
+        low = self.pitch_min.reshape(-1)[index]
+        if np.isnan(low):
+            return False
+        return float(low), float(self.pitch_max.reshape(-1)[index])
+
+if __name__ == '__main__':
+    # 计算查找表并与精确求解比较速度和结果
+    from ArmIK.InverseKinematics import IK
+    ik = IK('arm')
+    ik.setLinkLength(L1=ik.l1 + 0.75, L4=ik.l4 - 0.15)
+    batch = BatchIK(ik)
+    step = float(sys.argv[1]) if len(sys.argv) > 1 else 0.5
+    table = IKTable(batch, step=step, path=sys.argv[2] if len(sys.argv) > 2 else table_path)
+    t = time.perf_counter()
+    loaded = table.load()
+    print('%s查找表 %s: %.2f s' % ('读取' if loaded else '计算', table.shape, time.perf_counter() - t))
+
+    rng = np.random.default_rng(0)
+    targets = [tuple(p) for p in np.column_stack([rng.uniform(-20, 20, 2000), rng.uniform(-8, 28, 2000), rng.uniform(0, 15, 2000)])]
+    t = time.perf_counter()
+    exact = [batch.bestPitch(p, -90, -90, 0) for p in targets]
+    exact_time = (time.perf_counter() - t) / len(targets)
+    t = time.perf_counter()
+    fast = [table.lookup(p) for p in targets]
+    fast_time = (time.perf_counter() - t) / len(targets)
+
+    both = [(a, b) for a, b in zip(exact, fast) if a != False and b != False]
+    differ = [abs(a[1] - b[1]) for a, b in both if a[1] != b[1]]
+    print('精确求解: %6.1f us/点, 查找表: %6.1f us/点 (插值%d次, 精确求解%d次)' % (exact_time*1e6, fast_time*1e6, table.hits, table.fallbacks))
+    print('有解%d个点, 可达性不一致%d个, 俯仰角不一致%d个(最大相差%d度)' % (
+        len(both), sum(1 for a, b in zip(exact, fast) if (a == False) != (b == False)), len(differ), max(differ or [0])))
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+'''
+Per-device overhead of the simulated HAT library.
+
+Times constructing Pin, PWM and Servo objects and calling Servo.angle()
+with logging at the default warning level and at debug level (debug
+output formatted into a buffer), and counts the loggers left behind.
+
+Usage (from the repository root):
+    python -m benchmarks.device_benchmark [--objects N] [--calls N]
+'''
+import argparse
+import io
+import logging
+import time
+
+from sim_robot_hat import Pin, PWM, Servo, Sim_HAT
+
+
+def time_calls(count, call):
+    start = time.perf_counter()
+    for i in range(count):
+        call(i)
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objects", type=int, default=2000)
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    loggers_before = len(logging.Logger.manager.loggerDict)
+    with Sim_HAT():
+        for name, make in (("Pin", lambda i: Pin("D0")),
+                           ("PWM", lambda i: PWM(i % 12)),
+                           ("Servo", lambda i: Servo(i % 12))):
+            cost = time_calls(args.objects, make)
+            print(f"{name + '()':<28} {cost * 1e6:8.1f} us")
+
+        # debug records are formatted into a buffer rather than the terminal
+        handler = Servo._class_logger().handlers[0]
+        for level in ("warning", "debug"):
+            stream = handler.setStream(io.StringIO())
+            servo = Servo("P0", debug_level=level)
+            cost = time_calls(args.calls, lambda i: servo.angle(i % 90))
+            handler.setStream(stream)
+            print(f"{'Servo.angle() ' + level:<28} {cost * 1e6:8.1f} us")
+
+    print(f"loggers created: {len(logging.Logger.manager.loggerDict) - loggers_before}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+'''
+Import-time budget check for the picarx and sim_robot_hat packages.
+
+Imports each module in a fresh interpreter under "python -X importtime"
+and compares its cumulative import time against a budget. Exits non-zero
+when any module is over budget, so it can run as a regression check.
+
+Usage (from the repository root):
+    python -m benchmarks.import_time [--runs N] [--scale X] [module ...]
+'''
+import argparse
+import statistics
+import subprocess
+import sys
+
+# Cumulative import budget per module in milliseconds. None of these should
+# pull in robot_hat, numpy, cv2 or picamera2 at import time.
+BUDGETS_MS = {
+    "picarx": 15,
+    "picarx.picarx_improved": 60,
+    "picarx.kinematics": 10,
+    "picarx.maneuvers": 60,
+    "picarx.controller.steering_controller": 60,
+    "picarx.controller.ultrasonic_controller": 60,
+    "picarx.controller.actuator_service": 60,
+    "picarx.core.edge_detector": 30,
+    "picarx.core.ultrasonic_interpreter": 30,
+    "picarx.sensing.grayscale_sensing": 60,
+    # sim_robot_hat imports submodules on first use and must not start
+    # subprocesses or pull in numpy, pyaudio or librosa at import time
+    "sim_robot_hat": 10,
+    "sim_robot_hat.pwm": 40,
+    "sim_robot_hat.servo": 40,
+    "sim_robot_hat.robot": 60,
+}
+
+
+def import_time_ms(module):
+    '''
+    Cumulative import time of module in a fresh interpreter, in ms.
+    '''
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1]) / 1000.0
+    raise RuntimeError(f"no import time reported for {module}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=list(BUDGETS_MS))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiply every budget, e.g. 3 on a Raspberry Pi")
+    args = parser.parse_args()
+
+    over = []
+    for module in args.modules:
+        samples = [import_time_ms(module) for _ in range(args.runs)]
+        median = statistics.median(samples)
+        budget = BUDGETS_MS.get(module)
+        if budget is None:
+            print(f"{module:<42} {median:8.2f} ms   (no budget)")
+            continue
+        budget *= args.scale
+        status = "ok" if median <= budget else "OVER"
+        print(f"{module:<42} {median:8.2f} ms   budget {budget:8.2f} ms   {status}")
+        if median > budget:
+            over.append(module)
+
+    if over:
+        print(f"{len(over)} module(s) over budget: {', '.join(over)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+'''
+Cold-start benchmark for Picarx construction.
+
+Times Picarx() against Picarx(fast_start=True) and, for reference, the
+first grayscale and ultrasonic access that fast start defers.
+
+Usage (from the repository root):
+    python -m benchmarks.startup_benchmark [--runs N] [--config PATH]
+'''
+import argparse
+import statistics
+import time
+
+from picarx import Picarx
+
+
+def time_construction(runs, config, fast_start):
+    samples = []
+    deferred = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        px = Picarx(config=config, fast_start=fast_start)
+        samples.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        px.get_grayscale_data()
+        px.ultrasonic
+        deferred.append(time.perf_counter() - start)
+    return samples, deferred
+
+
+def report(name, samples):
+    print(f"{name:<28} median {statistics.median(samples) * 1000:8.2f} ms"
+          f"   min {min(samples) * 1000:8.2f} ms   max {max(samples) * 1000:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--config", default=Picarx.CONFIG)
+    args = parser.parse_args()
+
+    cold, cold_deferred = time_construction(args.runs, args.config, fast_start=False)
+    fast, fast_deferred = time_construction(args.runs, args.config, fast_start=True)
+
+    report("Picarx()", cold)
+    report("  first sensor access", cold_deferred)
+    report("Picarx(fast_start=True)", fast)
+    report("  first sensor access", fast_deferred)
+    print(f"speedup (construction): {statistics.median(cold) / statistics.median(fast):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
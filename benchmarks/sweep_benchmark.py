@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+'''
+Controller parameter sweep on the batched simulator.
+
+Runs a grid of Steering_Controller scaling factors and Edge_Detector
+thresholds as one Batch_Simulator, then times a single Picarx_Simulator
+run for the per-configuration cost of sweeping one car at a time.
+
+Usage (from the repository root):
+    python -m benchmarks.sweep_benchmark [--scales N] [--thresholds N] [--laps N]
+'''
+import argparse
+import logging
+
+import numpy as np
+
+from picarx.simulator import Track, Picarx_Simulator, Batch_Simulator, Batch_Line_Follower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, default=20)
+    parser.add_argument("--thresholds", type=int, default=10)
+    parser.add_argument("--laps", type=int, default=1)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    track = Track()
+    scales = np.linspace(0.5, 4.0, args.scales)
+    thresholds = np.linspace(300, 1200, args.thresholds)
+    scale_grid, threshold_grid = (g.ravel() for g in np.meshgrid(scales, thresholds, indexing="ij"))
+    n = len(scale_grid)
+
+    policy = Batch_Line_Follower(n, threshold=threshold_grid, scaling_factor=scale_grid)
+    report = Batch_Simulator(track, n).run(policy, laps=args.laps)
+    ok = report["status"] == "ok"
+    print(f"batched: {n} configurations, {report['ticks']} ticks in {report['wall_time']:.2f} s "
+          f"({report['tick_mean_us']:.0f} us per tick, {ok.sum()} completed)")
+
+    if ok.any():
+        total = np.where(ok, np.nansum(report["lap_times"], axis=1), np.inf)
+        for i in np.argsort(total)[:5]:
+            if not ok[i]:
+                break
+            print(f"  scaling_factor {scale_grid[i]:.2f}  threshold {threshold_grid[i]:4.0f}  "
+                  f"time {total[i]:6.2f} s  xte rms {report['xte_rms_mm'][i]:5.1f} mm")
+
+    from picarx.core.edge_detector import Edge_Detector
+    from picarx.controller.steering_controller import Steering_Controller
+    sim = Picarx_Simulator(track)
+    detector = Edge_Detector()
+    controller = Steering_Controller()
+    logging.getLogger().setLevel(logging.WARNING)
+    single = sim.run(lambda px: controller.run(px, detector.detect(px.get_grayscale_data())), laps=args.laps)
+    sim.close()
+    sequential = single["wall_time"] * n
+    print(f"one car through Picarx: {single['wall_time']:.2f} s, "
+          f"about {sequential:.1f} s for {n} configurations ({sequential / report['wall_time']:.0f}x slower)")
+
+
+if __name__ == "__main__":
+    main()
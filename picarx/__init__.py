@@ -1,3 +1,11 @@
 #!/usr/bin/env python3
-from .picarx_improved import Picarx
 from .version import __version__
+
+
+def __getattr__(name):
+    # Picarx pulls in the HAT driver stack; import it on first access so
+    # "import picarx.<submodule>" stays cheap.
+    if name == "Picarx":
+        from .picarx_improved import Picarx
+        return Picarx
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
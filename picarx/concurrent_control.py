@@ -11,7 +11,6 @@ import logging
 import atexit
 
 from helper.logging_config import setup_logging
-setup_logging()
 
 logger = logging.getLogger(__spec__.name if __spec__ else __name__)
 
@@ -22,6 +21,7 @@ from picarx.core.contour_detector import Contour_Detector
 from picarx.core.ultrasonic_interpreter import Ultrasonic_Interpreter
 from picarx.controller.steering_controller import Steering_Controller as Edge_Detector_Controller
 from picarx.controller.ultrasonic_controller import Ultrasonic_Controller
+from picarx.controller.actuator_service import Actuator_Service
 from picarx.rossros import (
     Bus, Producer, ConsumerProducer, Consumer, Timer, Printer, runConcurrently,
 )
@@ -30,16 +30,22 @@ from picarx.rossros import (
 RUN_DURATION = 30       # seconds
 SENSOR_DELAY = 0.05     # 50ms between sensor reads
 CAM_SENSOR_DELAY = 0.033  # ~30fps camera read rate
-US_SENSOR_DELAY = 0.1   # 100ms between ultrasonic reads (HC-SR04 needs ~60ms min)
+US_PING_DELAY = 0.06    # 60ms between background pings (HC-SR04 physical limit)
 INTERP_DELAY = 0.05     # 50ms between interpretations
 CONTROL_DELAY = 0.05    # 50ms between control updates
 PRINT_DELAY = 0.25      # 250ms between prints
 
 
 def main():
+    setup_logging()
     # --- Hardware ---
     px = Picarx()
     atexit.register(px.close)
+    # Ping in the background so the ultrasonic producer never blocks on the echo
+    px.start_ranging(interval=US_PING_DELAY)
+    # Only the actuator service touches the motors/servos; the loops post commands to it
+    actuators = Actuator_Service(px)
+    actuators.start()
 
     # --- Sensor / interpreter / controller instances ---
     cam_sensing = Image_Sensing(backend="picam", width=640, height=480, fps=30, warmup_s=0.5)
@@ -94,9 +100,9 @@ def main():
     # Consumer: steer based on edge value
     def steer(edge_value):
         if us_clear_bus.get_message():
-            edge_controller.run(px, edge_value)
+            edge_controller.run(actuators, edge_value)
         else:
-            px.stop()
+            actuators.stop()
     steering_consumer = Consumer(
         consumer_function=steer,
         input_buses=edge_bus,
@@ -106,11 +112,11 @@ def main():
     )
 
     # --- Ultrasonic pipeline ---
-    # Producer: read ultrasonic distance
+    # Producer: read filtered ultrasonic distance (cached, pings run in the ranger)
     us_producer = Producer(
         producer_function=us_sensing.read_values,
         output_buses=us_distance_bus,
-        delay=US_SENSOR_DELAY,
+        delay=INTERP_DELAY,
         termination_buses=termination_bus,
         name="Ultrasonic Sensor Producer",
     )
@@ -127,7 +133,7 @@ def main():
 
     # Consumer: stop/go based on is_clear
     def drive(is_clear):
-        us_controller.run(px, is_clear)
+        us_controller.run(actuators, is_clear)
     us_drive_consumer = Consumer(
         consumer_function=drive,
         input_buses=us_clear_bus,
@@ -170,7 +176,7 @@ def main():
         us_printer,
     ])
 
-    px.stop()
+    actuators.close()
     logger.info("Concurrent control finished")
 
 
@@ -0,0 +1,177 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__spec__.name if __spec__ else __name__)
+
+from picarx import Picarx
+
+import atexit
+
+
+class Actuator_Service(object):
+    '''
+    Owns the Picarx actuators and applies the latest (steer, speed) command
+    at a fixed rate.
+
+    Producers post targets to a mailbox and return immediately; the service
+    thread slew-limits towards the merged target and commits each tick as a
+    single Picarx batch. It also exposes the Picarx drive methods
+    (set_dir_servo_angle, forward, backward, stop, batch), so controllers
+    written against Picarx can be handed the service instead.
+    '''
+
+    def __init__(
+        self,
+        px: Picarx,
+        rate_hz: float = 50.0,
+        max_steer_rate: float = 300.0,
+        max_accel: float = 400.0,
+        name: str = "Actuator Service",
+    ):
+        '''
+        param rate_hz: command application rate
+        param max_steer_rate: steering slew limit in degrees per second
+        param max_accel: speed slew limit in speed units (percent) per second
+        '''
+        self.px = px
+        self.period = 1.0 / rate_hz
+        self.max_steer_rate = max_steer_rate
+        self.max_accel = max_accel
+        self.name = name
+
+        self.DIR_MIN = px.DIR_MIN
+        self.DIR_MAX = px.DIR_MAX
+
+        self._mailbox_lock = threading.RLock()
+        self._target_steer = 0.0
+        self._target_speed = 0.0
+        self._hard_stop = False
+
+        self.steer = 0.0
+        self.speed = 0.0
+
+        self._stop_event = threading.Event()
+        self._thread = None
+        logger.info("Actuator service initialized at %.0f Hz", rate_hz)
+
+    # --------- mailbox ---------
+    def post(self, steer: float = None, speed: float = None):
+        '''
+        Post a target command; fields left as None keep their last value.
+        '''
+        with self._mailbox_lock:
+            if steer is not None:
+                self._target_steer = float(steer)
+            if speed is not None:
+                self._target_speed = float(speed)
+                self._hard_stop = False
+
+    def set_dir_servo_angle(self, value):
+        self.post(steer=value)
+
+    def forward(self, speed):
+        self.post(speed=speed)
+
+    def backward(self, speed):
+        self.post(speed=-speed)
+
+    def stop(self):
+        '''
+        Stop the motors on the next tick, bypassing the speed slew limit.
+        '''
+        with self._mailbox_lock:
+            self._target_speed = 0.0
+            self._hard_stop = True
+
+    @contextmanager
+    def batch(self):
+        '''
+        Post several fields atomically, e.g. steer and speed from one controller tick.
+        '''
+        with self._mailbox_lock:
+            yield self
+
+    # --------- service thread ---------
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.px.stop()
+
+    @staticmethod
+    def _slew(current, target, max_step):
+        if target > current + max_step:
+            return current + max_step
+        if target < current - max_step:
+            return current - max_step
+        return target
+
+    def step(self, dt: float):
+        '''
+        Move the applied command towards the mailbox target and commit it.
+        '''
+        with self._mailbox_lock:
+            target_steer = self._target_steer
+            target_speed = self._target_speed
+            hard_stop = self._hard_stop
+
+        self.steer = self._slew(self.steer, target_steer, self.max_steer_rate * dt)
+        if hard_stop:
+            self.speed = 0.0
+        else:
+            self.speed = self._slew(self.speed, target_speed, self.max_accel * dt)
+
+        with self.px.batch():
+            self.px.set_dir_servo_angle(self.steer)
+            if self.speed > 0:
+                self.px.forward(self.speed)
+            elif self.speed < 0:
+                self.px.backward(-self.speed)
+            else:
+                self.px.stop()
+
+    def _run(self):
+        next_t = time.monotonic()
+        last_t = next_t
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            try:
+                self.step(now - last_t)
+            except Exception:
+                logger.exception("Actuator update failed")
+            last_t = now
+
+            next_t += self.period
+            delay = next_t - time.monotonic()
+            if delay < 0:
+                next_t = time.monotonic()
+                delay = 0
+            self._stop_event.wait(delay)
+
+
+if __name__ == "__main__":
+    from helper.logging_config import setup_logging
+    setup_logging()
+    px = Picarx()
+    atexit.register(px.close)
+    actuators = Actuator_Service(px)
+    actuators.start()
+    try:
+        actuators.post(steer=20, speed=30)
+        time.sleep(1)
+        actuators.post(steer=-20)
+        time.sleep(1)
+        actuators.stop()
+        time.sleep(0.2)
+    finally:
+        actuators.close()
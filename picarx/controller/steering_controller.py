@@ -1,18 +1,8 @@
 import logging
 
-import cv2
-
-from helper.logging_config import setup_logging
-from picarx.core.contour_detector import Contour_Detector
-from picarx.sensing.image_sensing import Image_Sensing
-setup_logging()
-
 logger = logging.getLogger(__spec__.name if __spec__ else __name__)
 
-import atexit
 from picarx import Picarx
-from picarx.core.edge_detector import Edge_Detector
-from picarx.sensing.grayscale_sensing import Grayscale_Sensing
 from collections import deque
 
 class Steering_Controller(object):
@@ -50,18 +40,20 @@ class Steering_Controller(object):
 
             self.steering_angles_history.append(steering_angle)
                         
-            px.set_dir_servo_angle(-steering_angle)
-            # speed_factor = 1 - min(abs(steering_direction * self.scaling_factor), 0.9)
-            speed_factor = 1
-            # Slow down on sharp turns
-            # Increase speed slowly if not sharp turns
-            if self.sharp_turns:
-                px.forward(self.start_speed * speed_factor)
-            else:
-                next_speed = max(self.start_speed, self.last_speed + self.speed_step)
-                speed = self.clamp(next_speed, self.start_speed, self.MAX_SPEED)
-                self.last_speed = speed
-                px.forward(speed * speed_factor)
+            # Steering and both motors go out as one commit per tick
+            with px.batch():
+                px.set_dir_servo_angle(-steering_angle)
+                # speed_factor = 1 - min(abs(steering_direction * self.scaling_factor), 0.9)
+                speed_factor = 1
+                # Slow down on sharp turns
+                # Increase speed slowly if not sharp turns
+                if self.sharp_turns:
+                    px.forward(self.start_speed * speed_factor)
+                else:
+                    next_speed = max(self.start_speed, self.last_speed + self.speed_step)
+                    speed = self.clamp(next_speed, self.start_speed, self.MAX_SPEED)
+                    self.last_speed = speed
+                    px.forward(speed * speed_factor)
 
             logger.info(f"Relative Steering Direction: {steering_direction}, Steering angle: {steering_angle}, Speed: {self.last_speed * speed_factor}")
 
@@ -70,6 +62,11 @@ class Steering_Controller(object):
             px.close()
 
 if __name__ == "__main__":
+    from helper.logging_config import setup_logging
+    from picarx.core.contour_detector import Contour_Detector
+    from picarx.sensing.image_sensing import Image_Sensing
+    setup_logging()
+
     px = Picarx()
     px.set_cam_tilt_angle(-30)
     # gs_sensing = Grayscale_Sensing()
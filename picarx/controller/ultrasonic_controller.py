@@ -1,8 +1,5 @@
 import logging
 
-from helper.logging_config import setup_logging
-setup_logging()
-
 logger = logging.getLogger(__spec__.name if __spec__ else __name__)
 
 from picarx import Picarx
@@ -3,12 +3,6 @@ import logging
 from helper.logging_config import setup_logging
 from picarx.core.detector import Detector
 
-from picarx import Picarx
-
-from picarx.sensing.grayscale_sensing import Grayscale_Sensing
-
-import atexit
-
 class Edge_Detector(Detector):
     
     def __init__(self, threshold: int = 600, polarity: int = 0):
@@ -19,6 +13,9 @@ class Edge_Detector(Detector):
         self.logger.info("Edge Detector initialized with threshold %d and polarity %d", threshold, polarity)
 
     def detect(self, sensor_values: list[int]) -> float:
+        # Sampler has not produced a filtered reading yet
+        if sensor_values is None:
+            return 0.0
         if len(sensor_values) != 3:
             raise ValueError("sensor_values must be a list of three integers")
         
@@ -35,18 +32,27 @@ class Edge_Detector(Detector):
         if self.polarity == 1:
             value = -value
 
-        self.logger.debug(f"Sensor values: {sensor_values}, Detected edges: {value}")
+        self.logger.debug("Sensor values: %s, Detected edges: %s", sensor_values, value)
         return value
     
 if __name__ == "__main__":
+    import atexit
+    import time
+    from picarx import Picarx
+    from picarx.sensing.grayscale_sampler import Grayscale_Sampler
+
     edge_detector = Edge_Detector()
     px = Picarx()
     atexit.register(px.close)
-    gs_sensing = Grayscale_Sensing()
+    gs_sampler = Grayscale_Sampler(px)
+    gs_sampler.start()
     try:
         while True:
-            gs_values = gs_sensing.read_values()
+            gs_values = gs_sampler.read_values()
             edge_value = edge_detector.detect(gs_values)
             edge_detector.logger.info(f"Grayscale values: {gs_values}, Edge value: {edge_value}")
+            time.sleep(0.05)
     except KeyboardInterrupt:
-        edge_detector.logger.info("Exiting edge detection test.")
\ No newline at end of file
+        edge_detector.logger.info("Exiting edge detection test.")
+    finally:
+        gs_sampler.stop()
\ No newline at end of file
@@ -1,7 +1,6 @@
 import logging
 
-from helper.logging_config import setup_logging
-setup_logging()
+from picarx.sensing.distance_filter import Distance_Filter
 
 logger = logging.getLogger(__spec__.name if __spec__ else __name__)
 
@@ -16,12 +15,16 @@ class Ultrasonic_Interpreter(object):
         """Interpret ultrasonic distance reading.
 
         Returns True if the path is clear, False if an obstacle is detected.
-        Error codes (-1, -2) are treated as 'obstacle detected' for safety.
+        Timeout (-1) and stale (-3) readings are treated as 'obstacle detected'
+        for safety; out of range (-2) is treated as clear.
         """
-        if distance == -1:
+        if distance == Distance_Filter.STALE:
+            logger.warning("Ultrasonic reading stale, treating as obstacle")
+            return False
+        if distance == Distance_Filter.TIMEOUT:
             logger.warning("Ultrasonic timeout (-1), treating as obstacle")
             return False
-        if distance == -2:
+        if distance == Distance_Filter.OUT_OF_RANGE:
             logger.debug("Ultrasonic out of range (-2), treating as clear")
             return True
 
@@ -0,0 +1,39 @@
+'''
+Lazy access to the Robot HAT library.
+
+robot_hat is imported on first use rather than at import time; off the
+robot the in-repo sim_robot_hat stands in for it.
+'''
+import time
+
+_hat = None
+on_the_robot = None
+
+
+def load_hat():
+    '''
+    Import and return robot_hat, or sim_robot_hat when it is not installed.
+    '''
+    global _hat, on_the_robot
+    if _hat is None:
+        try:
+            import robot_hat as hat
+            on_the_robot = True
+        except ImportError:
+            import sim_robot_hat as hat
+            on_the_robot = False
+        _hat = hat
+    return _hat
+
+
+def hat_clock():
+    '''
+    Clock (monotonic() and sleep()) the HAT runs on.
+
+    On the robot this is the time module; in the simulator it is the
+    current Sim_HAT's clock, which may be virtual.
+    '''
+    hat = load_hat()
+    if on_the_robot:
+        return time
+    return hat.current_hat().clock
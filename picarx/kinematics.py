@@ -0,0 +1,119 @@
+import math
+
+
+def constrain(x, min_val, max_val):
+    '''
+    Constrains value to be within a range.
+    '''
+    return max(min_val, min(max_val, x))
+
+
+def ackermann_ratio(steering_angle_deg: float, wheelbase_mm: float, track_width_mm: float) -> float:
+    """
+    Geometry-based Ackermann approximation:
+    returns inner/outer wheel speed ratio in [0, 1].
+    """
+    # straight
+    if abs(steering_angle_deg) < 1e-6:
+        return 1.0
+
+    delta = math.radians(abs(steering_angle_deg))  # assume servo deg ~= wheel steer deg
+
+    # Turning radius of rear axle center
+    # R = L / tan(delta)
+    tan_delta = math.tan(delta)
+    if abs(tan_delta) < 1e-6:
+        return 1.0
+
+    R = wheelbase_mm / tan_delta
+    halfW = track_width_mm / 2.0
+
+    # Inner/outer ratio (outer normalized to 1.0)
+    ratio = (R - halfW) / (R + halfW)
+
+    # Safety clamp
+    return constrain(ratio, 0.0, 1.0)
+
+
+class Ackermann_Table(object):
+    '''
+    Inner/outer wheel ratio precomputed over the steering servo range.
+
+    ratio() interpolates linearly between table entries with plain Python
+    so the per-tick scalar lookup stays cheap; ratios() does the same for
+    NumPy arrays.
+    '''
+
+    def __init__(self, wheelbase_mm: float, track_width_mm: float, dir_min: float = -30, dir_max: float = 30, resolution: float = 0.1):
+        if dir_max <= dir_min:
+            raise ValueError("dir_max must be greater than dir_min")
+        self.wheelbase_mm = wheelbase_mm
+        self.track_width_mm = track_width_mm
+        self.dir_min = dir_min
+        self.dir_max = dir_max
+        self.resolution = resolution
+
+        n = int(round((dir_max - dir_min) / resolution)) + 1
+        self.angles = [dir_min + i * resolution for i in range(n)]
+        self.table = [ackermann_ratio(a, wheelbase_mm, track_width_mm) for a in self.angles]
+        # NumPy copies are built on the first ratios() call so the scalar
+        # path used by Picarx never imports NumPy
+        self._angles_np = None
+        self._table_np = None
+
+    def ratio(self, steering_angle_deg: float) -> float:
+        steer = constrain(steering_angle_deg, self.dir_min, self.dir_max)
+        pos = (steer - self.dir_min) / self.resolution
+        i = int(pos)
+        if i >= len(self.table) - 1:
+            return self.table[-1]
+        frac = pos - i
+        return self.table[i] + (self.table[i + 1] - self.table[i]) * frac
+
+    def ratios(self, steering_angles_deg):
+        import numpy as np
+        if self._table_np is None:
+            self._angles_np = np.asarray(self.angles)
+            self._table_np = np.asarray(self.table)
+        steer = np.clip(np.asarray(steering_angles_deg, dtype=np.float64), self.dir_min, self.dir_max)
+        return np.interp(steer, self._angles_np, self._table_np)
+
+
+def motor_commands(steering_angles_deg, speeds, table: Ackermann_Table):
+    '''
+    Vectorised Picarx.forward/backward: signed speed (negative reverses)
+    and steering angle to the (motor 1, motor 2) values handed to
+    Picarx.set_motor_speed.
+    '''
+    import numpy as np
+    speeds = np.asarray(speeds, dtype=np.float64)
+    ratio = table.ratios(steering_angles_deg)
+    return speeds, -speeds * ratio
+
+
+def motor_duty(commands, cali_dir: int = 1, cali_speed: float = 0):
+    '''
+    Vectorised Picarx.set_motor_speed for one motor.
+
+    Returns (direction pin level, PWM duty percent) arrays.
+    '''
+    import numpy as np
+    commands = np.clip(np.asarray(commands, dtype=np.float64), -100, 100)
+    direction = np.where(commands >= 0, 1, -1) * cali_dir
+    duty = np.trunc(np.abs(commands) / 2) - cali_speed
+    level = (direction < 0).astype(np.int8)
+    return level, duty
+
+
+def drive_duty(steering_angles_deg, speeds, table: Ackermann_Table, cali_dir=(1, 1), cali_speed=(0, 0)):
+    '''
+    Map arrays of (steer, signed speed) to left/right motor outputs.
+
+    Returns (left_level, left_duty, right_level, right_duty), matching what
+    Picarx writes to the direction pins and PWM channels, so the live car
+    and offline simulation share one mapping.
+    '''
+    left_cmd, right_cmd = motor_commands(steering_angles_deg, speeds, table)
+    left_level, left_duty = motor_duty(left_cmd, cali_dir[0], cali_speed[0])
+    right_level, right_duty = motor_duty(right_cmd, cali_dir[1], cali_speed[1])
+    return left_level, left_duty, right_level, right_duty
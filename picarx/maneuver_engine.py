@@ -0,0 +1,171 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, CancelledError
+
+logger = logging.getLogger(__spec__.name if __spec__ else __name__)
+
+from picarx.maneuvers import Segment
+
+
+class Maneuver_Engine(object):
+    '''
+    Runs compiled maneuvers (segment lists from picarx.maneuvers) on a
+    scheduler thread.
+
+    submit() queues a maneuver and returns a concurrent.futures.Future right
+    away, so the caller keeps sensing or reading input while the car moves.
+    Segment boundaries are absolute deadlines from the maneuver start, so
+    late wake-ups do not stretch the maneuver. cancel() pre-empts the running
+    maneuver within one wait, drops the queue and stops the motors.
+
+    px can be a Picarx or an Actuator_Service.
+    '''
+
+    def __init__(self, px, name: str = "Maneuver Engine"):
+        self.px = px
+        self.name = name
+
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._current = None
+        self._preempt = threading.Event()
+        self._closing = False
+        self._thread = None
+        logger.info("Maneuver engine initialized")
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def submit(self, segments, name: str = "maneuver", preempt: bool = False) -> Future:
+        '''
+        Queue a maneuver.
+
+        param segments: iterable of (steer, speed, duration) segments
+        param preempt: cancel the running and queued maneuvers first
+        return: Future resolving to the elapsed time in seconds, or
+                cancelled if the maneuver is pre-empted
+        '''
+        segments = [Segment(*segment) for segment in segments]
+        future = Future()
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("Maneuver engine is closed")
+            if preempt:
+                self._cancel_locked()
+            self._queue.append((name, segments, future))
+            self._cond.notify()
+        logger.debug("Queued %s (%d segments)", name, len(segments))
+        return future
+
+    def cancel(self):
+        '''
+        Pre-empt the running maneuver, drop queued ones and stop the motors.
+        '''
+        with self._cond:
+            self._cancel_locked()
+        self.px.stop()
+
+    def _cancel_locked(self):
+        while self._queue:
+            _, _, future = self._queue.popleft()
+            future.cancel()
+        if self._current is not None:
+            self._preempt.set()
+
+    @property
+    def busy(self) -> bool:
+        with self._cond:
+            return self._current is not None or bool(self._queue)
+
+    def close(self):
+        with self._cond:
+            self._closing = True
+            self._cancel_locked()
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.px.stop()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closing:
+                    self._cond.wait()
+                if self._closing:
+                    return
+                name, segments, future = self._queue.popleft()
+                if not future.set_running_or_notify_cancel():
+                    continue
+                self._preempt.clear()
+                self._current = future
+
+            logger.info("Maneuver: %s", name)
+            start = time.monotonic()
+            try:
+                completed = self._execute(segments)
+            except Exception as e:
+                logger.exception("Maneuver %s failed", name)
+                future.set_exception(e)
+            else:
+                if completed:
+                    future.set_result(time.monotonic() - start)
+                else:
+                    logger.info("Maneuver %s pre-empted", name)
+                    future.set_exception(CancelledError())
+            finally:
+                with self._cond:
+                    self._current = None
+
+    def _apply(self, segment: Segment):
+        with self.px.batch():
+            self.px.set_dir_servo_angle(segment.steer)
+            if segment.speed > 0:
+                self.px.forward(segment.speed)
+            elif segment.speed < 0:
+                self.px.backward(-segment.speed)
+            else:
+                self.px.stop()
+
+    def _execute(self, segments) -> bool:
+        '''
+        Drive the segments back to back; False if pre-empted.
+        '''
+        deadline = time.monotonic()
+        try:
+            for segment in segments:
+                self._apply(segment)
+                deadline += segment.duration
+                if self._preempt.wait(max(0.0, deadline - time.monotonic())):
+                    return False
+            return True
+        finally:
+            self.px.stop()
+
+
+if __name__ == "__main__":
+    import atexit
+    from helper.logging_config import setup_logging
+    from picarx import Picarx
+    from picarx.maneuvers import k_turn_left_segments, forward_straight_segments
+    setup_logging()
+
+    px = Picarx()
+    atexit.register(px.close)
+    engine = Maneuver_Engine(px)
+    engine.start()
+    try:
+        done = engine.submit(forward_straight_segments(40, 1.0), name="forward_straight")
+        turn = engine.submit(k_turn_left_segments(px.DIR_MAX), name="k_turn_left")
+        logger.info("forward_straight took %.3f s", done.result())
+        time.sleep(1.5)
+        engine.cancel()
+        logger.info("k_turn_left cancelled: %s", turn.cancelled() or turn.exception() is not None)
+    finally:
+        engine.close()
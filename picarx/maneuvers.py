@@ -1,10 +1,8 @@
 import time
 import logging
+from collections import namedtuple
 from logdecorator import log_on_start, log_on_end, log_on_error
 
-from helper.logging_config import setup_logging
-setup_logging()
-
 logger = logging.getLogger(__spec__.name if __spec__ else __name__)
 
 from picarx import Picarx
@@ -48,47 +46,96 @@ def backward_turn(px: Picarx, steering_deg: float, speed: int = 35, duration_s:
     drive(px, speed=-abs(speed), duration_s=duration_s, steering_deg=steering_deg)
 
 
+def run_segments(px: Picarx, segments):
+    '''
+    Drive a compiled segment list on the caller's thread, blocking until done.
+
+    Maneuver_Engine runs the same lists on a scheduler thread instead.
+    '''
+    for segment in segments:
+        drive(px, speed=segment.speed, duration_s=segment.duration, steering_deg=segment.steer)
+
+
+# --------- compiled maneuvers ---------
+# Each *_segments() function returns the maneuver as a list of timed
+# (steer, speed, duration) segments; negative speed drives backwards.
+Segment = namedtuple("Segment", ["steer", "speed", "duration"])
+
+# Final segment of compound maneuvers: wheels straight, motors stopped
+STRAIGHTEN = Segment(0.0, 0, 0.0)
+
+
+def drive_segments(speed: int, duration_s: float, steering_deg: float = 0.0):
+    return [Segment(float(steering_deg), speed, max(0.0, duration_s))]
+
+
+def forward_straight_segments(speed: int = 40, duration_s: float = 1.0):
+    return drive_segments(abs(speed), duration_s)
+
+
+def backward_straight_segments(speed: int = 40, duration_s: float = 1.0):
+    return drive_segments(-abs(speed), duration_s)
+
+
+def forward_turn_segments(steering_deg: float, speed: int = 35, duration_s: float = 1.0):
+    return drive_segments(abs(speed), duration_s, steering_deg)
+
+
+def backward_turn_segments(steering_deg: float, speed: int = 35, duration_s: float = 1.0):
+    return drive_segments(-abs(speed), duration_s, steering_deg)
+
+
+def parallel_park_right_segments(steering_deg: float, speed: int = 35, t1=1.0, t2=1.0, t3=0.6):
+    return (backward_turn_segments(+steering_deg, speed, t1)
+            + backward_turn_segments(-steering_deg, speed, t2)
+            + forward_straight_segments(speed, t3)
+            + [STRAIGHTEN])
+
+
+def parallel_park_left_segments(steering_deg: float, speed: int = 35, t1=1.0, t2=1.0, t3=0.6):
+    return (backward_turn_segments(-steering_deg, speed, t1)
+            + backward_turn_segments(+steering_deg, speed, t2)
+            + forward_straight_segments(speed, t3)
+            + [STRAIGHTEN])
+
+
+def k_turn_left_segments(steering_deg: float, speed: int = 35, t1=1.0, t2=1.0, t3=1.0):
+    return (forward_turn_segments(-steering_deg, speed, t1)
+            + backward_turn_segments(+steering_deg, speed, t2)
+            + forward_turn_segments(-steering_deg, speed, t3)
+            + [STRAIGHTEN])
+
+
+def k_turn_right_segments(steering_deg: float, speed: int = 35, t1=1.0, t2=1.0, t3=1.0):
+    return (forward_turn_segments(+steering_deg, speed, t1)
+            + backward_turn_segments(-steering_deg, speed, t2)
+            + forward_turn_segments(+steering_deg, speed, t3)
+            + [STRAIGHTEN])
+
+
 def parallel_park_right(px: Picarx, speed: int = 35, t1=1.0, t2=1.0, t3=0.6):
     logger.info("Maneuver: parallel_park_right")
-
-    steering_deg = px.DIR_MAX
-    backward_turn(px, +steering_deg, speed, t1)
-    backward_turn(px, -steering_deg, speed, t2)
-    forward_straight(px, speed, t3)
-    px.set_dir_servo_angle(0.0)
+    run_segments(px, parallel_park_right_segments(px.DIR_MAX, speed, t1, t2, t3))
 
 
 def parallel_park_left(px: Picarx, speed: int = 35, t1=1.0, t2=1.0, t3=0.6):
     logger.info("Maneuver: parallel_park_left")
-
-    steering_deg = px.DIR_MAX
-    backward_turn(px, -steering_deg, speed, t1)
-    backward_turn(px, +steering_deg, speed, t2)
-    forward_straight(px, speed, t3)
-    px.set_dir_servo_angle(0.0)
+    run_segments(px, parallel_park_left_segments(px.DIR_MAX, speed, t1, t2, t3))
 
 
 def k_turn_left(px: Picarx, speed: int = 35, t1=1.0, t2=1.0, t3=1.0):
     logger.info("Maneuver: k_turn_left")
-
-    steering_deg = px.DIR_MAX
-    forward_turn(px, -steering_deg, speed, t1)
-    backward_turn(px, +steering_deg, speed, t2)
-    forward_turn(px, -steering_deg, speed, t3)
-    px.set_dir_servo_angle(0.0)
+    run_segments(px, k_turn_left_segments(px.DIR_MAX, speed, t1, t2, t3))
 
 
 def k_turn_right(px: Picarx, speed: int = 35, t1=1.0, t2=1.0, t3=1.0):
     logger.info("Maneuver: k_turn_right")
-
-    steering_deg = px.DIR_MAX
-    forward_turn(px, +steering_deg, speed, t1)
-    backward_turn(px, -steering_deg, speed, t2)
-    forward_turn(px, +steering_deg, speed, t3)
-    px.set_dir_servo_angle(0.0)
+    run_segments(px, k_turn_right_segments(px.DIR_MAX, speed, t1, t2, t3))
 
 
 if __name__ == "__main__":
+    from helper.logging_config import setup_logging
+    setup_logging()
     px = Picarx()
     try:
         forward_straight(px, 40, 1.0)
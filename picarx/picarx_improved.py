@@ -1,25 +1,14 @@
 import os
-on_the_robot = None
-try:
-    from robot_hat import Pin, ADC, PWM, Servo, fileDB
-    from robot_hat import Grayscale_Module, Ultrasonic, utils
-    on_the_robot = True
-except ImportError:
-    # import sys
-    # sys.path.append(os.path.abspath(os.path.join(
-    #     os.path.dirname(__file__), '..')))
-    from sim_robot_hat import Pin, ADC, PWM, Servo, fileDB
-    from sim_robot_hat import Grayscale_Module, Ultrasonic, utils
-    on_the_robot = False
 import time
 
 import logging
-import math
 import atexit
+import threading
+from contextlib import contextmanager
 from logdecorator import log_on_start, log_on_end
 
-from helper.logging_config import setup_logging
-setup_logging()
+from picarx import hat_loader
+from picarx.kinematics import Ackermann_Table
 
 logger = logging.getLogger(__spec__.name if __spec__ else __name__)
 
@@ -55,28 +44,38 @@ class Picarx(object):
     # grayscale_pins: 3 adc channels
     # ultrasonic_pins: trig, echo2
     # config: path of config file
+    # fast_start: skip the MCU reset if this boot already reset it and the MCU
+    #             still reports the same firmware, set up each PWM timer once
+    #             and create grayscale/ultrasonic on first use. Only use it
+    #             when nothing but Picarx drives the HAT between runs.
     def __init__(self, 
                 servo_pins:list=['P0', 'P1', 'P2'], 
                 motor_pins:list=['D4', 'D5', 'P13', 'P12'],
                 grayscale_pins:list=['A0', 'A1', 'A2'],
                 ultrasonic_pins:list=['D2','D3'],
                 config:str=CONFIG,
+                fast_start:bool=False,
                 ):
         atexit.register(self.close)
+        self._hat = hat = hat_loader.load_hat()
         # reset robot_hat
-        utils.reset_mcu()
-        time.sleep(0.2)
+        if not (fast_start and self._hat_state_known()):
+            hat.utils.reset_mcu()
+            hat_loader.hat_clock().sleep(0.2)
+            self._mark_hat_state()
+        else:
+            logger.debug("Robot HAT already reset this boot, skipping MCU reset")
 
         # --------- config_flie ---------
-        if on_the_robot:
-            self.config_flie = fileDB(config, 777, os.getlogin())
+        if hat_loader.on_the_robot:
+            self.config_flie = hat.fileDB(config, 777, os.getlogin())
         else:
-            self.config_flie = fileDB(config, 777, '')
+            self.config_flie = hat.fileDB(config, 777, '')
 
         # --------- servos init ---------
-        self.cam_pan = Servo(servo_pins[0])
-        self.cam_tilt = Servo(servo_pins[1])   
-        self.dir_servo_pin = Servo(servo_pins[2])
+        self.cam_pan = hat.Servo(servo_pins[0])
+        self.cam_tilt = hat.Servo(servo_pins[1])   
+        self.dir_servo_pin = hat.Servo(servo_pins[2])
         # get calibration values
         self.dir_cali_val = float(self.config_flie.get("picarx_dir_servo", default_value=0))
         self.cam_pan_cali_val = float(self.config_flie.get("picarx_cam_pan_servo", default_value=0))
@@ -87,37 +86,183 @@ class Picarx(object):
         self.cam_tilt.angle(self.cam_tilt_cali_val)
 
         # --------- motors init ---------
-        self.left_rear_dir_pin = Pin(motor_pins[0])
-        self.right_rear_dir_pin = Pin(motor_pins[1])
-        self.left_rear_pwm_pin = PWM(motor_pins[2])
-        self.right_rear_pwm_pin = PWM(motor_pins[3])
+        self.left_rear_dir_pin = hat.Pin(motor_pins[0])
+        self.right_rear_dir_pin = hat.Pin(motor_pins[1])
+        self.left_rear_pwm_pin = hat.PWM(motor_pins[2])
+        self.right_rear_pwm_pin = hat.PWM(motor_pins[3])
         self.motor_direction_pins = [self.left_rear_dir_pin, self.right_rear_dir_pin]
         self.motor_speed_pins = [self.left_rear_pwm_pin, self.right_rear_pwm_pin]
         # get calibration values
-        self.cali_dir_value = self.config_flie.get("picarx_dir_motor", default_value="[1, 1]")
-        self.cali_dir_value = [int(i.strip()) for i in self.cali_dir_value.strip().strip("[]").split(",")]
+        self.cali_dir_value = self._parse_list(self.config_flie.get("picarx_dir_motor", default_value="[1, 1]"), int)
         self.cali_speed_value = [0, 0]
         self.dir_current_angle = 0
+        self.ackermann = Ackermann_Table(self.WHEELBASE_MM, self.TRACK_WIDTH_MM, self.DIR_MIN, self.DIR_MAX)
         # init pwm
+        timers_done = set()
         for pin in self.motor_speed_pins:
+            # motor channels share a timer, its registers only need writing once
+            timer = getattr(pin, 'timer_index', id(pin))
+            if fast_start and timer in timers_done:
+                continue
             pin.period(self.PERIOD)
             pin.prescaler(self.PRESCALER)
+            timers_done.add(timer)
 
         # --------- grayscale module init ---------
-        adc0, adc1, adc2 = [ADC(pin) for pin in grayscale_pins]
-        self.grayscale = Grayscale_Module(adc0, adc1, adc2, reference=None)
+        self._grayscale_pins = grayscale_pins
+        self._grayscale = None
         # get reference
-        self.line_reference = self.config_flie.get("line_reference", default_value=str(self.DEFAULT_LINE_REF))
-        self.line_reference = [float(i) for i in self.line_reference.strip().strip('[]').split(',')]
-        self.cliff_reference = self.config_flie.get("cliff_reference", default_value=str(self.DEFAULT_CLIFF_REF))
-        self.cliff_reference = [float(i) for i in self.cliff_reference.strip().strip('[]').split(',')]
-        # transfer reference
-        self.grayscale.reference(self.line_reference)
+        self.line_reference = self._parse_list(self.config_flie.get("line_reference", default_value=str(self.DEFAULT_LINE_REF)), float)
+        self.cliff_reference = self._parse_list(self.config_flie.get("cliff_reference", default_value=str(self.DEFAULT_CLIFF_REF)), float)
 
         # --------- ultrasonic init ---------
-        trig, echo= ultrasonic_pins
-        self.ultrasonic = Ultrasonic(Pin(trig), Pin(echo, mode=Pin.IN, pull=Pin.PULL_DOWN))
-        
+        self._ultrasonic_pins = ultrasonic_pins
+        self._ultrasonic = None
+        self.ranger = None
+
+        if not fast_start:
+            # create them now rather than on first use
+            self.grayscale
+            self.ultrasonic
+
+        # --------- actuator batching ---------
+        self._hw_lock = threading.RLock()
+        self._batch_depth = 0
+        self._staged = {}
+
+    HAT_STATE_FILE = '/tmp/picar-x-hat-state'
+
+    @staticmethod
+    def _boot_id():
+        try:
+            with open('/proc/sys/kernel/random/boot_id') as f:
+                return f.read().strip()
+        except OSError:
+            return ''
+
+    def _firmware_version(self):
+        '''
+        Firmware version read from the MCU, e.g. "1.0.0", None if it does not answer.
+        '''
+        try:
+            version = self._hat.get_firmware_version()
+        except OSError:
+            return None
+        if not version:
+            return None
+        return '.'.join(str(i) for i in version)
+
+    def _hat_state_known(self):
+        '''
+        True if an earlier Picarx reset the MCU during the current boot and the
+        MCU still answers with the firmware version read after that reset.
+
+        A stuck or replaced MCU fails the check. Registers another program
+        changed since the reset are not detected, which is why fast_start is
+        opt-in.
+        '''
+        try:
+            with open(self.HAT_STATE_FILE) as f:
+                recorded = f.read().split()
+        except OSError:
+            return False
+        boot_id = self._boot_id()
+        if not boot_id or recorded[:1] != [boot_id]:
+            return False
+        firmware = self._firmware_version()
+        return firmware is not None and recorded[1:] == [firmware]
+
+    def _mark_hat_state(self):
+        firmware = self._firmware_version()
+        if firmware is None:
+            logger.debug("Robot HAT firmware not readable, not recording its state")
+            return
+        try:
+            with open(self.HAT_STATE_FILE, 'w') as f:
+                f.write('%s %s' % (self._boot_id(), firmware))
+        except OSError as e:
+            logger.debug("Could not record Robot HAT state: %s", e)
+
+    @staticmethod
+    def _parse_list(value, cast):
+        '''
+        Parse a config value such as "[1, 1]" or a list into a list of cast values.
+        '''
+        if isinstance(value, (list, tuple)):
+            return [cast(i) for i in value]
+        return [cast(i.strip()) for i in str(value).strip().strip('[]').split(',')]
+
+    @property
+    def grayscale(self):
+        if self._grayscale is None:
+            adc0, adc1, adc2 = [self._hat.ADC(pin) for pin in self._grayscale_pins]
+            self._grayscale = self._hat.Grayscale_Module(adc0, adc1, adc2, reference=None)
+            # transfer reference
+            self._grayscale.reference(self.line_reference)
+        return self._grayscale
+
+    @property
+    def ultrasonic(self):
+        if self._ultrasonic is None:
+            trig, echo= self._ultrasonic_pins
+            hat = self._hat
+            self._ultrasonic = hat.Ultrasonic(hat.Pin(trig), hat.Pin(echo, mode=hat.Pin.IN, pull=hat.Pin.PULL_DOWN))
+        return self._ultrasonic
+
+    @contextmanager
+    def batch(self):
+        '''
+        Stage servo, motor and pin writes and commit them once on exit.
+
+        Inside the block only the last value per device is kept; on exit each
+        staged device gets a single write, direction pins ahead of PWM duty in
+        staging order. Writes of a value the hardware already holds are left to
+        the HAT's register cache to skip. Batches nest, and other threads'
+        writes wait until the batch is committed.
+
+            with px.batch():
+                px.set_dir_servo_angle(10)
+                px.forward(40)
+        '''
+        with self._hw_lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self._flush()
+
+    def _flush(self):
+        staged, self._staged = self._staged, {}
+        for device, (method, value) in staged.items():
+            self._commit(device, method, value)
+
+    def _commit(self, device, method, value):
+        if method == 'pin':
+            if value:
+                device.high()
+            else:
+                device.low()
+        else:
+            getattr(device, method)(value)
+
+    def _write(self, device, method, value):
+        with self._hw_lock:
+            if self._batch_depth:
+                self._staged[device] = (method, value)
+            else:
+                self._commit(device, method, value)
+
+    def _write_pin(self, pin, value):
+        self._write(pin, 'pin', 1 if value else 0)
+
+    def _write_pwm(self, pwm, percent):
+        self._write(pwm, 'pulse_width_percent', percent)
+
+    def _write_servo(self, servo, angle):
+        self._write(servo, 'angle', angle)
+
     def set_motor_speed(self, motor, speed):
         ''' set motor speed
         
@@ -138,11 +283,11 @@ class Picarx(object):
             speed = int(speed /2 )
         speed = speed - self.cali_speed_value[motor]
         if direction < 0:
-            self.motor_direction_pins[motor].high()
-            self.motor_speed_pins[motor].pulse_width_percent(speed)
+            self._write_pin(self.motor_direction_pins[motor], 1)
+            self._write_pwm(self.motor_speed_pins[motor], speed)
         else:
-            self.motor_direction_pins[motor].low()
-            self.motor_speed_pins[motor].pulse_width_percent(speed)
+            self._write_pin(self.motor_direction_pins[motor], 0)
+            self._write_pwm(self.motor_speed_pins[motor], speed)
 
     def motor_speed_calibration(self, value):
         self.cali_speed_value = value
@@ -171,30 +316,30 @@ class Picarx(object):
     def dir_servo_calibrate(self, value):
         self.dir_cali_val = value
         self.config_flie.set("picarx_dir_servo", "%s"%value)
-        self.dir_servo_pin.angle(value)
+        self._write_servo(self.dir_servo_pin, value)
 
     def set_dir_servo_angle(self, value):
         self.dir_current_angle = constrain(value, self.DIR_MIN, self.DIR_MAX)
         angle_value  = self.dir_current_angle + self.dir_cali_val
-        self.dir_servo_pin.angle(angle_value)
+        self._write_servo(self.dir_servo_pin, angle_value)
 
     def cam_pan_servo_calibrate(self, value):
         self.cam_pan_cali_val = value
         self.config_flie.set("picarx_cam_pan_servo", "%s"%value)
-        self.cam_pan.angle(value)
+        self._write_servo(self.cam_pan, value)
 
     def cam_tilt_servo_calibrate(self, value):
         self.cam_tilt_cali_val = value
         self.config_flie.set("picarx_cam_tilt_servo", "%s"%value)
-        self.cam_tilt.angle(value)
+        self._write_servo(self.cam_tilt, value)
 
     def set_cam_pan_angle(self, value):
         value = constrain(value, self.CAM_PAN_MIN, self.CAM_PAN_MAX)
-        self.cam_pan.angle(-1*(value + -1*self.cam_pan_cali_val))
+        self._write_servo(self.cam_pan, -1*(value + -1*self.cam_pan_cali_val))
 
     def set_cam_tilt_angle(self,value):
         value = constrain(value, self.CAM_TILT_MIN, self.CAM_TILT_MAX)
-        self.cam_tilt.angle(-1*(value + -1*self.cam_tilt_cali_val))
+        self._write_servo(self.cam_tilt, -1*(value + -1*self.cam_tilt_cali_val))
 
     def set_power(self, speed):
         self.set_motor_speed(1, speed)
@@ -204,31 +349,10 @@ class Picarx(object):
         """
         Geometry-based Ackermann approximation:
         returns inner/outer wheel speed ratio in [0, 1].
-        """
-        steer = constrain(steering_angle_deg, self.DIR_MIN, self.DIR_MAX)
-
-        # straight
-        if abs(steer) < 1e-6:
-            return 1.0
-
-        delta = math.radians(abs(steer))  # assume servo deg ~= wheel steer deg
-
-        # Turning radius of rear axle center
-        # R = L / tan(delta)
-        tan_delta = math.tan(delta)
-        if abs(tan_delta) < 1e-6:
-            return 1.0
-
-        L = self.WHEELBASE_MM
-        W = self.TRACK_WIDTH_MM
-        R = L / tan_delta
-        halfW = W / 2.0
-
-        # Inner/outer ratio (outer normalized to 1.0)
-        ratio = (R - halfW) / (R + halfW)
 
-        # Safety clamp
-        return constrain(ratio, 0.0, 1.0)
+        Looked up in the table built at init (see picarx.kinematics).
+        """
+        return self.ackermann.ratio(steering_angle_deg)
 
 
     def backward(self, speed):
@@ -268,13 +392,48 @@ class Picarx(object):
     def stop(self):
         '''
         Execute twice to make sure it stops
+
+        Inside a batch the stop is staged once and committed with the batch.
         '''
+        with self._hw_lock:
+            if self._batch_depth:
+                self._write_pwm(self.motor_speed_pins[0], 0)
+                self._write_pwm(self.motor_speed_pins[1], 0)
+                return
         for _ in range(2):
-            self.motor_speed_pins[0].pulse_width_percent(0)
-            self.motor_speed_pins[1].pulse_width_percent(0)
+            self._write_pwm(self.motor_speed_pins[0], 0)
+            self._write_pwm(self.motor_speed_pins[1], 0)
             time.sleep(0.002)
 
+    def start_ranging(self, backend=None, interval: float = 0.06):
+        '''
+        Ping the ultrasonic sensor from a background thread.
+
+        Once started, get_distance() returns the latest filtered distance
+        immediately instead of blocking on the echo.
+
+        param backend: echo backend, defaults to edge callbacks on the echo pin (simulated off-robot)
+        param interval: time between pings in seconds
+        '''
+        if self.ranger is not None:
+            return
+        from picarx.sensing.ultrasonic_ranging import Ultrasonic_Ranger, Pin_Echo_Backend, Sim_Echo_Backend
+        if backend is None:
+            if hat_loader.on_the_robot:
+                backend = Pin_Echo_Backend(self.ultrasonic.trig, self.ultrasonic.echo)
+            else:
+                backend = Sim_Echo_Backend()
+        self.ranger = Ultrasonic_Ranger(backend, interval=interval, timeout=self.TIMEOUT)
+        self.ranger.start()
+
+    def stop_ranging(self):
+        if self.ranger is not None:
+            self.ranger.close()
+            self.ranger = None
+
     def get_distance(self):
+        if self.ranger is not None:
+            return self.ranger.read()
         return self.ultrasonic.read()
 
     def set_grayscale_reference(self, value):
@@ -317,9 +476,13 @@ class Picarx(object):
     @log_on_end(logging.INFO, "Successfully closed PiCar", logger=logger)
     def close(self):
         self.reset()
-        self.ultrasonic.close()
+        self.stop_ranging()
+        if self._ultrasonic is not None:
+            self._ultrasonic.close()
 
 if __name__ == "__main__":
+    from helper.logging_config import setup_logging
+    setup_logging()
     px = Picarx()
     atexit.register(px.close)
     px.forward(50)
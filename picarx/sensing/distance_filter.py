@@ -0,0 +1,88 @@
+import threading
+import time
+
+
+class Distance_Filter(object):
+    '''
+    Median-of-N ultrasonic filter with outlier rejection and staleness.
+
+    Readings live in fixed-size arrays (value, timestamp) used as a ring.
+    value() only considers readings younger than max_age, drops samples
+    further than outlier_k MADs from the median, and returns the median of
+    the rest.
+
+    Returned codes extend robot_hat.Ultrasonic's:
+        -1 (TIMEOUT): every fresh reading timed out
+        -3 (STALE):   no reading younger than max_age
+    Out-of-range readings (-2) are stored as MAX_RANGE_CM, i.e. far away.
+    '''
+
+    TIMEOUT = -1
+    OUT_OF_RANGE = -2
+    STALE = -3
+
+    MAX_RANGE_CM = 400.0
+
+    def __init__(self, window: int = 5, max_age: float = 0.5, outlier_k: float = 3.0, min_tolerance_cm: float = 2.0):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = int(window)
+        self.max_age = float(max_age)
+        self.outlier_k = float(outlier_k)
+        self.min_tolerance_cm = float(min_tolerance_cm)
+
+        import numpy as np
+        self._values = np.full(self.window, np.nan)
+        self._stamps = np.full(self.window, -np.inf)
+        self._index = 0
+        self._lock = threading.Lock()
+
+    def push(self, distance: float, timestamp: float = None):
+        if timestamp is None:
+            timestamp = time.monotonic()
+        if distance == self.TIMEOUT:
+            value = float('nan')
+        elif distance == self.OUT_OF_RANGE:
+            value = self.MAX_RANGE_CM
+        else:
+            value = min(float(distance), self.MAX_RANGE_CM)
+        with self._lock:
+            self._values[self._index] = value
+            self._stamps[self._index] = timestamp
+            self._index = (self._index + 1) % self.window
+
+    def is_stale(self, now: float = None) -> bool:
+        if now is None:
+            now = time.monotonic()
+        import numpy as np
+        with self._lock:
+            return not np.any(self._stamps >= now - self.max_age)
+
+    def value(self, now: float = None) -> float:
+        '''
+        Filtered distance in cm, or one of the TIMEOUT/STALE codes.
+        '''
+        if now is None:
+            now = time.monotonic()
+        import numpy as np
+        with self._lock:
+            fresh = self._stamps >= now - self.max_age
+            if not np.any(fresh):
+                return self.STALE
+            values = self._values[fresh]
+
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self.TIMEOUT
+
+        median = np.median(values)
+        deviation = np.abs(values - median)
+        tolerance = max(self.outlier_k * np.median(deviation), self.min_tolerance_cm)
+        return round(float(np.median(values[deviation <= tolerance])), 2)
+
+    def reset(self):
+        import numpy as np
+        with self._lock:
+            self._values.fill(np.nan)
+            self._stamps.fill(-np.inf)
+            self._index = 0
@@ -0,0 +1,177 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__spec__.name if __spec__ else __name__)
+
+from picarx import Picarx
+from picarx.sensing.sensing import Sensing
+
+import atexit
+
+
+class Grayscale_Sampler(Sensing):
+    '''
+    Background sampler for the three grayscale channels.
+
+    A daemon thread reads the channels at a fixed rate into a NumPy ring
+    buffer, median-filters the buffered window and smooths the result with
+    an EMA. The filtered values, the line status and the cliff status are
+    cached for read_values() and optionally published to RossROS buses, so
+    consumers such as Edge_Detector never touch the ADCs themselves.
+    '''
+
+    CHANNELS = 3
+
+    def __init__(
+        self,
+        px: Picarx,
+        rate_hz: float = 200.0,
+        window: int = 5,
+        alpha: float = 0.5,
+        values_bus=None,
+        line_status_bus=None,
+        cliff_bus=None,
+        name: str = "Grayscale Sampler",
+    ):
+        if rate_hz <= 0:
+            raise ValueError("rate_hz must be positive")
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("alpha must be in (0, 1]")
+
+        self.px = px
+        self.period = 1.0 / rate_hz
+        self.window = int(window)
+        self.alpha = float(alpha)
+        self.values_bus = values_bus
+        self.line_status_bus = line_status_bus
+        self.cliff_bus = cliff_bus
+        self.name = name
+
+        import numpy as np
+        self._buffer = np.zeros((self.window, self.CHANNELS), dtype=np.float64)
+        self._count = 0
+        self._ema = None
+
+        self._lock = threading.Lock()
+        self._values = None
+        self._normalised = None
+        self._line_status = None
+        self._cliff = False
+
+        self._stop_event = threading.Event()
+        self._thread = None
+        logger.info("Grayscale sampler initialized at %.0f Hz (window=%d, alpha=%.2f)",
+                    rate_hz, self.window, self.alpha)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def close(self):
+        self.stop()
+
+    def _run(self):
+        next_t = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                self.sample()
+            except Exception:
+                logger.exception("Grayscale sample failed")
+
+            # Absolute deadlines so read time does not stretch the period
+            next_t += self.period
+            delay = next_t - time.monotonic()
+            if delay < 0:
+                next_t = time.monotonic()
+                delay = 0
+            self._stop_event.wait(delay)
+
+    def sample(self):
+        '''
+        Read the channels once, update the filters and publish the result.
+        '''
+        import numpy as np
+        raw = self.px.get_grayscale_data()
+        self._buffer[self._count % self.window] = raw
+        self._count += 1
+
+        n = min(self._count, self.window)
+        median = np.median(self._buffer[:n], axis=0)
+        if self._ema is None:
+            self._ema = median
+        else:
+            self._ema = self.alpha * median + (1.0 - self.alpha) * self._ema
+
+        line_ref = np.asarray(self.px.line_reference, dtype=np.float64)
+        cliff_ref = np.asarray(self.px.cliff_reference, dtype=np.float64)
+
+        values = self._ema.tolist()
+        normalised = (self._ema / line_ref).tolist()
+        # Same semantics as Picarx.get_line_status / get_cliff_status
+        line_status = (self._ema <= line_ref).astype(int).tolist()
+        cliff = bool(np.any(self._ema <= cliff_ref))
+
+        with self._lock:
+            self._values = values
+            self._normalised = normalised
+            self._line_status = line_status
+            self._cliff = cliff
+
+        if self.values_bus is not None:
+            self.values_bus.set_message(values, self.name)
+        if self.line_status_bus is not None:
+            self.line_status_bus.set_message(line_status, self.name)
+        if self.cliff_bus is not None:
+            self.cliff_bus.set_message(cliff, self.name)
+
+    def read_values(self):
+        '''
+        Latest filtered values, or None before the first sample.
+        '''
+        with self._lock:
+            return self._values
+
+    def read_normalised(self):
+        '''
+        Latest filtered values divided by the line reference.
+        '''
+        with self._lock:
+            return self._normalised
+
+    def get_line_status(self):
+        with self._lock:
+            return self._line_status
+
+    def get_cliff_status(self):
+        with self._lock:
+            return self._cliff
+
+
+if __name__ == "__main__":
+    from helper.logging_config import setup_logging
+    setup_logging()
+    px = Picarx()
+    atexit.register(px.close)
+    sampler = Grayscale_Sampler(px, rate_hz=200.0)
+    sampler.start()
+    try:
+        while True:
+            time.sleep(0.1)
+            logger.info("Filtered: %s, line: %s, cliff: %s",
+                        sampler.read_values(), sampler.get_line_status(), sampler.get_cliff_status())
+    except KeyboardInterrupt:
+        logger.info("Exiting grayscale sampler test.")
+    finally:
+        sampler.stop()
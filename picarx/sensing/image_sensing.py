@@ -4,22 +4,25 @@ import time
 import atexit
 from typing import Optional
 
-from helper.logging_config import setup_logging
-
-setup_logging()
 logger = logging.getLogger(__spec__.name if __spec__ else __name__)
 
-try:
-    # SunFounder PiCar-X camera helper (works on the robot when the stack is installed)
-    from picamera2 import Picamera2
-    backend = "picam"
-except Exception:
-    Picamera2 = None
-    backend = "opencv"
+# Picamera2 brings up libcamera on import, so it is only loaded when a picam
+# backend is actually started.
+Picamera2 = None
 
-import cv2
-import numpy as np
 
+def _load_picamera2():
+    global Picamera2
+    if Picamera2 is None:
+        try:
+            # SunFounder PiCar-X camera helper (works on the robot when the stack is installed)
+            from picamera2 import Picamera2
+        except Exception:
+            return None
+    return Picamera2
+
+# cv2 and NumPy are imported where frames are captured or shown, so importing
+# this module stays cheap.
 from picarx.sensing.sensing import Sensing
 
 
@@ -45,7 +48,7 @@ class Image_Sensing(Sensing):
         if self.backend not in ("picam", "opencv"):
             raise ValueError("backend must be one of: 'picam', 'opencv'")
 
-        self._cap: Optional[cv2.VideoCapture] = None
+        self._cap: Optional["cv2.VideoCapture"] = None
         self._picam_inited = False
 
         logger.info("Image sensing module initializing (backend=%s)", self.backend)
@@ -54,7 +57,7 @@ class Image_Sensing(Sensing):
     def _start(self) -> None:
         use_backend = self.backend
         if use_backend == "picam":
-            if Picamera2 is None:
+            if _load_picamera2() is None:
                 logger.warning("Picamera2 not available; falling back to OpenCV backend")
                 use_backend = "opencv"
             else:
@@ -86,6 +89,7 @@ class Image_Sensing(Sensing):
             raise
 
     def _start_opencv(self) -> None:
+        import cv2
         self._cap = cv2.VideoCapture(self.device_index)
         if not self._cap.isOpened():
             raise RuntimeError(f"Could not open camera device index {self.device_index}")
@@ -106,14 +110,14 @@ class Image_Sensing(Sensing):
             self.fps,
         )
 
-    def read_values(self) -> Optional[np.ndarray]:
+    def read_values(self) -> Optional["np.ndarray"]:
         """
         Read and return the latest camera frame as a BGR numpy array.
 
         Returns:
             np.ndarray (H,W,3) BGR frame on success, else None
         """
-        frame: Optional[np.ndarray] = None
+        frame: Optional["np.ndarray"] = None
 
         if self.backend == "picam":
             # Picamera2 stores the latest frame in Picamera2.capture_array()
@@ -161,6 +165,9 @@ class Image_Sensing(Sensing):
 
 
 if __name__ == "__main__":
+    import cv2
+    from helper.logging_config import setup_logging
+    setup_logging()
     sensing = Image_Sensing(backend="picam", width=640, height=480, fps=30, device_index=0)
     # atexit.register(sensing.close)
 
@@ -0,0 +1,170 @@
+import logging
+import random
+import threading
+import time
+
+from picarx.sensing.distance_filter import Distance_Filter
+
+logger = logging.getLogger(__spec__.name if __spec__ else __name__)
+
+SOUND_SPEED = 343.3  # m/s
+
+
+class Pin_Echo_Backend(object):
+    '''
+    Edge-callback backend on robot_hat Pins.
+
+    The echo pin is put in IRQ mode on both edges; each edge is timestamped
+    in the callback, so nothing polls the pin.
+    '''
+
+    def __init__(self, trig, echo):
+        self.trig = trig
+        self.echo = echo
+        self._callback = None
+        self.echo.irq(self._on_edge, self.echo.IRQ_RISING_FALLING, bouncetime=0, pull=self.echo.PULL_DOWN)
+
+    def set_callback(self, callback):
+        self._callback = callback
+
+    def _on_edge(self, *_):
+        timestamp = time.perf_counter()
+        if self._callback is not None:
+            self._callback(timestamp)
+
+    def trigger(self):
+        # 10 us trigger pulse
+        self.trig.off()
+        self.trig.on()
+        time.sleep(0.00001)
+        self.trig.off()
+
+    def close(self):
+        self._callback = None
+        self.echo.close()
+
+
+class Sim_Echo_Backend(object):
+    '''
+    Simulated echo: fires the rising and falling edges from timers, with the
+    pulse width given by distance_fn() in cm (None means no echo).
+    '''
+
+    TRIGGER_LATENCY = 0.0005  # s between trigger and echo rising edge
+
+    def __init__(self, distance_fn=None, noise_cm: float = 0.0):
+        self.distance_fn = distance_fn if distance_fn is not None else (lambda: 100.0)
+        self.noise_cm = noise_cm
+        self._callback = None
+        self._timers = []
+
+    def set_callback(self, callback):
+        self._callback = callback
+
+    def _fire(self, timestamp):
+        if self._callback is not None:
+            self._callback(timestamp)
+
+    def trigger(self):
+        distance = self.distance_fn()
+        if distance is None:
+            return
+        if self.noise_cm:
+            distance += random.gauss(0.0, self.noise_cm)
+        distance = max(0.0, distance)
+        start = time.perf_counter() + self.TRIGGER_LATENCY
+        width = distance * 2 / 100 / SOUND_SPEED
+        # Edge timestamps are exact; the timers only decide when they are delivered
+        self._timers = [
+            threading.Timer(self.TRIGGER_LATENCY, self._fire, args=(start,)),
+            threading.Timer(self.TRIGGER_LATENCY + width, self._fire, args=(start + width,)),
+        ]
+        for timer in self._timers:
+            timer.daemon = True
+            timer.start()
+
+    def close(self):
+        self._callback = None
+        for timer in self._timers:
+            timer.cancel()
+
+
+class Ultrasonic_Ranger(object):
+    '''
+    Background ultrasonic ranging.
+
+    A scheduler thread triggers a ping every interval and sleeps on an event
+    until the backend reports the falling echo edge (or the timeout expires).
+    read() returns the latest filtered distance without any I/O.
+
+    Error codes follow Distance_Filter: -1 for timeout, -3 when stale.
+    '''
+
+    def __init__(self, backend, interval: float = 0.06, timeout: float = 0.02, window: int = 5, max_age: float = 0.5):
+        self.backend = backend
+        self.interval = interval
+        self.timeout = timeout
+
+        self._edges = []
+        self._echo_done = threading.Event()
+        self.filter = Distance_Filter(window=window, max_age=max_age)
+        self.last_raw = -1
+
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.backend.set_callback(self._on_edge)
+
+    def _on_edge(self, timestamp):
+        self._edges.append(timestamp)
+        if len(self._edges) >= 2:
+            self._echo_done.set()
+
+    def ping(self):
+        '''
+        Run a single ping and return the raw distance in cm (-1 on timeout).
+        '''
+        self._edges = []
+        self._echo_done.clear()
+        self.backend.trigger()
+        if not self._echo_done.wait(self.timeout):
+            return -1
+        rising, falling = self._edges[0], self._edges[1]
+        during = falling - rising
+        return round(during * SOUND_SPEED / 2 * 100, 2)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="Ultrasonic Ranger", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        self.backend.close()
+
+    def _run(self):
+        next_t = time.monotonic()
+        while not self._stop_event.is_set():
+            raw = self.ping()
+            self.last_raw = raw
+            self.filter.push(raw)
+
+            next_t += self.interval
+            delay = next_t - time.monotonic()
+            if delay < 0:
+                next_t = time.monotonic()
+                delay = 0
+            self._stop_event.wait(delay)
+
+    def read(self):
+        '''
+        Latest filtered distance in cm, or a Distance_Filter error code.
+        '''
+        return self.filter.value()
@@ -1,21 +1,31 @@
 import logging
 
-from helper.logging_config import setup_logging
-setup_logging()
-
 logger = logging.getLogger(__spec__.name if __spec__ else __name__)
 
 from picarx import Picarx
 from picarx.sensing.sensing import Sensing
+from picarx.sensing.distance_filter import Distance_Filter
 
 
 class Ultrasonic_Sensing(Sensing):
 
-    def __init__(self, px: Picarx):
+    def __init__(self, px: Picarx, window: int = 5, max_age: float = 0.5):
         self.px = px
+        self.filter = Distance_Filter(window=window, max_age=max_age)
         logger.info("Ultrasonic sensing module initialized")
 
     def read_values(self):
-        distance = self.px.get_distance()
-        logger.debug(f"Ultrasonic sensor reading: {distance} cm")
+        '''
+        Filtered distance in cm, or a Distance_Filter code (-1 timeout, -3 stale).
+
+        With background ranging active (px.start_ranging()) this only reads the
+        ranger's cached filter, so it can be polled at controller rate. Otherwise
+        each call pings once and feeds the local filter.
+        '''
+        if self.px.ranger is not None:
+            distance = self.px.ranger.filter.value()
+        else:
+            self.filter.push(self.px.get_distance())
+            distance = self.filter.value()
+        logger.debug("Ultrasonic filtered reading: %s cm", distance)
         return distance
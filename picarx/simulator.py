@@ -0,0 +1,600 @@
+'''
+Closed-loop kinematic simulator for the PiCar-X.
+
+A Picarx is built against a simulated Robot HAT on a virtual clock. Each
+tick the simulator decodes the steering servo pulse and the motor duty and
+direction from the HAT registers, integrates a kinematic bicycle model, and
+feeds the grayscale ADC channels, a rendered downward camera view and an
+ultrasonic distance back from the world map. Nothing sleeps, so laps run
+as fast as the controller code allows.
+
+World units are millimetres, x right and y up, heading counter-clockwise
+from +x.
+'''
+import logging
+import math
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__spec__.name if __spec__ else __name__)
+
+from picarx.hat_loader import load_hat
+from picarx.sensing.sensing import Sensing
+
+
+class Track(object):
+    '''
+    Stadium-shaped line track rendered into NumPy rasters.
+
+    floor holds surface reflectance (1 floor, 0 line), distance the
+    distance in mm to the centerline and arclength the position along it,
+    so sensor, cross-track error and lap progress lookups are single
+    array reads.
+    '''
+
+    def __init__(
+        self,
+        straight_mm: float = 1500.0,
+        radius_mm: float = 500.0,
+        line_width_mm: float = 18.0,
+        margin_mm: float = 300.0,
+        resolution_mm: float = 4.0,
+        line_reflectance: float = 0.1,
+        floor_reflectance: float = 1.0,
+    ):
+        self.straight_mm = straight_mm
+        self.radius_mm = radius_mm
+        self.line_width_mm = line_width_mm
+        self.resolution_mm = resolution_mm
+
+        half = straight_mm / 2
+        self.length = 2 * straight_mm + 2 * math.pi * radius_mm
+
+        self.width_mm = straight_mm + 2 * radius_mm + 2 * margin_mm
+        self.height_mm = 2 * radius_mm + 2 * margin_mm
+        self.origin = np.array([-(half + radius_mm + margin_mm), -(radius_mm + margin_mm)])
+        self.shape = (int(math.ceil(self.height_mm / resolution_mm)), int(math.ceil(self.width_mm / resolution_mm)))
+
+        xs = self.origin[0] + (np.arange(self.shape[1]) + 0.5) * resolution_mm
+        ys = self.origin[1] + (np.arange(self.shape[0]) + 0.5) * resolution_mm
+        gx, gy = np.meshgrid(xs, ys)
+        distance, arclength = self.nearest(gx, gy)
+        self.distance = distance.astype(np.float32)
+        self.arclength = arclength.astype(np.float32)
+        on_line = self.distance <= line_width_mm / 2
+        self.floor = np.where(on_line, line_reflectance, floor_reflectance).astype(np.float32)
+
+        # start at the middle of the bottom straight heading +x
+        self.start_pose = (0.0, -radius_mm, 0.0)
+
+    def nearest(self, x, y):
+        '''
+        Distance to the centerline and arclength of the nearest centerline
+        point. Arclength runs counter-clockwise from the start pose.
+        '''
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        half = self.straight_mm / 2
+        r = self.radius_mm
+
+        on_straight = np.abs(x) <= half
+        cx = np.where(x > 0, half, -half)
+        angle = np.arctan2(y, x - cx)
+        distance = np.where(on_straight, np.abs(np.abs(y) - r), np.abs(np.hypot(x - cx, y) - r))
+
+        bottom = np.where(x >= 0, x, self.length + x)
+        top = half + math.pi * r + (half - x)
+        right = half + r * (angle + math.pi / 2)
+        left = 3 * half + math.pi * r + r * np.mod(angle - math.pi / 2, 2 * math.pi)
+        arclength = np.where(on_straight, np.where(y < 0, bottom, top), np.where(x > 0, right, left))
+        return distance, np.mod(arclength, self.length)
+
+    def to_pixel(self, x, y):
+        '''
+        World mm to (row, col) raster indices, clipped to the map.
+        '''
+        col = ((np.asarray(x) - self.origin[0]) / self.resolution_mm).astype(np.intp)
+        row = ((np.asarray(y) - self.origin[1]) / self.resolution_mm).astype(np.intp)
+        return np.clip(row, 0, self.shape[0] - 1), np.clip(col, 0, self.shape[1] - 1)
+
+    def sample(self, raster, x, y):
+        row, col = self.to_pixel(x, y)
+        return raster[row, col]
+
+
+class Sim_Camera(Sensing):
+    '''
+    Image_Sensing stand-in that returns the simulator's rendered camera view.
+    '''
+
+    def __init__(self, simulator):
+        self.simulator = simulator
+
+    def read_values(self):
+        return self.simulator.camera_frame()
+
+
+class Picarx_Simulator(object):
+    '''
+    Closed-loop simulation of one PiCar-X on a Track.
+
+        sim = Picarx_Simulator(Track())
+        controller = Steering_Controller()
+        detector = Edge_Detector()
+        report = sim.run(lambda px: controller.run(px, detector.detect(px.get_grayscale_data())), laps=3)
+    '''
+
+    STEER_CHANNEL = 2
+    LEFT_PWM_CHANNEL = 13
+    RIGHT_PWM_CHANNEL = 12
+    LEFT_DIR_PIN = 23   # D4
+    RIGHT_DIR_PIN = 24  # D5
+
+    GRAYSCALE_CHANNELS = (0, 1, 2)
+    GRAYSCALE_AHEAD_MM = 130.0
+    GRAYSCALE_SPACING_MM = 22.0
+    ADC_LINE = 200
+    ADC_FLOOR = 1400
+
+    CAMERA_SIZE = (120, 160)
+    CAMERA_VIEW_MM = (225.0, 300.0)
+    CAMERA_AHEAD_MM = 150.0
+
+    def __init__(
+        self,
+        track: Track,
+        max_speed_mm_s: float = 700.0,
+        motor_tau: float = 0.08,
+        servo_rate: float = 600.0,
+        obstacles=(),
+        config: str = None,
+    ):
+        '''
+        param max_speed_mm_s: wheel speed at 100% duty
+        param motor_tau: motor response time constant in seconds
+        param servo_rate: steering servo slew rate in degrees per second
+        param obstacles: (x, y, radius) circles in mm seen by the ultrasonic sensor
+        param config: Picarx config file
+        '''
+        hat = load_hat()
+        if not hasattr(hat, "Sim_HAT"):
+            raise RuntimeError("Picarx_Simulator needs sim_robot_hat, not the robot_hat hardware library")
+
+        self.track = track
+        self.max_speed_mm_s = max_speed_mm_s
+        self.motor_tau = motor_tau
+        self.servo_rate = servo_rate
+        self.obstacles = np.asarray(obstacles, dtype=np.float64).reshape(-1, 3)
+
+        self.clock = hat.Virtual_Clock()
+        self.hat = hat.Sim_HAT(clock=self.clock)
+        for i, channel in enumerate(self.GRAYSCALE_CHANNELS):
+            self.hat.set_adc(channel, lambda t, i=i: self._grayscale_adc()[i])
+
+        from picarx import Picarx
+        with self.hat:
+            self.px = Picarx(config=config) if config else Picarx()
+        self.wheelbase = self.px.WHEELBASE_MM
+
+        self._camera_grid = self._make_camera_grid()
+        self.reset()
+
+    # --------- state ---------
+    def reset(self, pose=None):
+        self.x, self.y, self.heading = pose if pose is not None else self.track.start_pose
+        self.steer = 0.0
+        self.left_speed = 0.0
+        self.right_speed = 0.0
+        self.distance_travelled = 0.0
+        _, s = self.track.nearest(self.x, self.y)
+        self._last_s = float(s)
+        self.progress = 0.0
+        self._grayscale_cache = None
+
+    @property
+    def speed(self):
+        return (self.left_speed + self.right_speed) / 2
+
+    def cross_track_error(self):
+        return float(self.track.sample(self.track.distance, self.x, self.y))
+
+    # --------- actuators ---------
+    def _read_actuators(self):
+        hat = self.hat
+        us = hat.pulse_width_us(self.STEER_CHANNEL)
+        steer_target = (us - 500.0) / 2000.0 * 180.0 - 90.0 if us > 0 else 0.0
+
+        # forward is left direction low, right direction high (mirrored motor)
+        left = hat.duty_cycle(self.LEFT_PWM_CHANNEL) * (-1 if hat.gpio.get(self.LEFT_DIR_PIN, 0) else 1)
+        right = hat.duty_cycle(self.RIGHT_PWM_CHANNEL) * (1 if hat.gpio.get(self.RIGHT_DIR_PIN, 0) else -1)
+        return steer_target, left * self.max_speed_mm_s, right * self.max_speed_mm_s
+
+    def step(self, dt: float):
+        '''
+        Integrate the car over dt from the current HAT outputs and advance the clock.
+        '''
+        steer_target, left_target, right_target = self._read_actuators()
+
+        max_step = self.servo_rate * dt
+        self.steer += max(-max_step, min(max_step, steer_target - self.steer))
+        k = 1.0 - math.exp(-dt / self.motor_tau)
+        self.left_speed += (left_target - self.left_speed) * k
+        self.right_speed += (right_target - self.right_speed) * k
+
+        # bicycle model about the rear axle; positive servo angle turns right
+        v = self.speed
+        self.heading -= v * math.tan(math.radians(self.steer)) / self.wheelbase * dt
+        self.x += v * math.cos(self.heading) * dt
+        self.y += v * math.sin(self.heading) * dt
+        self.distance_travelled += abs(v) * dt
+
+        s = float(self.track.sample(self.track.arclength, self.x, self.y))
+        ds = s - self._last_s
+        if ds < -self.track.length / 2:
+            ds += self.track.length
+        elif ds > self.track.length / 2:
+            ds -= self.track.length
+        self.progress += ds
+        self._last_s = s
+
+        self._grayscale_cache = None
+        self.clock.advance(dt)
+
+    # --------- sensors ---------
+    def _body_to_world(self, ahead, left):
+        c, s = math.cos(self.heading), math.sin(self.heading)
+        return self.x + ahead * c - left * s, self.y + ahead * s + left * c
+
+    def _grayscale_adc(self):
+        if self._grayscale_cache is None:
+            lateral = np.array([self.GRAYSCALE_SPACING_MM, 0.0, -self.GRAYSCALE_SPACING_MM])
+            xs, ys = self._body_to_world(self.GRAYSCALE_AHEAD_MM, lateral)
+            reflectance = self.track.sample(self.track.floor, xs, ys)
+            values = self.ADC_LINE + (self.ADC_FLOOR - self.ADC_LINE) * reflectance
+            self._grayscale_cache = values.astype(int).tolist()
+        return self._grayscale_cache
+
+    def _make_camera_grid(self):
+        rows, cols = self.CAMERA_SIZE
+        depth, width = self.CAMERA_VIEW_MM
+        # top image row is furthest ahead, left column is to the car's left
+        ahead = self.CAMERA_AHEAD_MM + depth * (1 - (np.arange(rows) + 0.5) / rows)
+        left = width * (0.5 - (np.arange(cols) + 0.5) / cols)
+        return np.meshgrid(ahead, left, indexing="ij")
+
+    def camera_frame(self):
+        '''
+        Downward camera view ahead of the car as an (H, W, 3) uint8 BGR frame.
+        '''
+        ahead, left = self._camera_grid
+        xs, ys = self._body_to_world(ahead, left)
+        gray = (self.track.sample(self.track.floor, xs, ys) * 255).astype(np.uint8)
+        return np.repeat(gray[..., None], 3, axis=2)
+
+    def distance_cm(self, max_range_cm: float = 400.0):
+        '''
+        Ultrasonic range to the nearest obstacle straight ahead, -2 if out of range.
+        '''
+        if not len(self.obstacles):
+            return -2
+        c, s = math.cos(self.heading), math.sin(self.heading)
+        rel = self.obstacles[:, :2] - np.array([self.x, self.y])
+        along = rel[:, 0] * c + rel[:, 1] * s
+        across2 = (rel ** 2).sum(axis=1) - along ** 2
+        r2 = self.obstacles[:, 2] ** 2
+        hit = (along > 0) & (across2 <= r2)
+        if not hit.any():
+            return -2
+        d = (along[hit] - np.sqrt(r2[hit] - across2[hit])).min() / 10.0
+        return round(float(d), 2) if 0 <= d <= max_range_cm else -2
+
+    def echo_backend(self):
+        '''
+        Ultrasonic backend for px.start_ranging() fed from the world map.
+        '''
+        from picarx.sensing.ultrasonic_ranging import Sim_Echo_Backend
+        return Sim_Echo_Backend(distance_fn=self.distance_cm)
+
+    # --------- closed loop ---------
+    def run(self, control_step, laps: int = 1, dt: float = 0.02, max_time: float = 120.0, max_xte_mm: float = 150.0):
+        '''
+        Run control_step(px) once per tick until the laps are done.
+
+        Stops early when the car leaves the line by more than max_xte_mm or
+        max_time simulated seconds pass.
+
+        return: report dict with lap times, cross-track error and compute per tick
+        '''
+        lap_times = []
+        xte = []
+        tick_s = []
+        lap_start = self.clock.monotonic()
+        start = self.clock.monotonic()
+        wall_start = time.perf_counter()
+        status = "ok"
+
+        while len(lap_times) < laps:
+            t0 = time.perf_counter()
+            control_step(self.px)
+            self.step(dt)
+            tick_s.append(time.perf_counter() - t0)
+
+            error = self.cross_track_error()
+            xte.append(error)
+            now = self.clock.monotonic()
+            if self.progress >= self.track.length * (len(lap_times) + 1):
+                lap_times.append(now - lap_start)
+                lap_start = now
+            if error > max_xte_mm:
+                status = "off track"
+                break
+            if now - start > max_time:
+                status = "timeout"
+                break
+
+        self.px.stop()
+        xte = np.asarray(xte)
+        tick_us = np.asarray(tick_s) * 1e6
+        return {
+            "status": status,
+            "laps": len(lap_times),
+            "lap_times": lap_times,
+            "sim_time": self.clock.monotonic() - start,
+            "wall_time": time.perf_counter() - wall_start,
+            "ticks": len(tick_us),
+            "xte_rms_mm": float(np.sqrt(np.mean(xte ** 2))) if len(xte) else 0.0,
+            "xte_max_mm": float(xte.max()) if len(xte) else 0.0,
+            "tick_mean_us": float(tick_us.mean()) if len(tick_us) else 0.0,
+            "tick_p99_us": float(np.percentile(tick_us, 99)) if len(tick_us) else 0.0,
+        }
+
+    def close(self):
+        self.px.close()
+
+
+class Batch_Line_Follower(object):
+    '''
+    Edge_Detector and Steering_Controller applied to N cars at once.
+
+    Every parameter may be a scalar or a length-N array, so one instance
+    evaluates a whole parameter sweep. Calling it with the (N, 3) grayscale
+    readings returns the (servo angle, speed) each car's controller would
+    command through Picarx.
+    '''
+
+    MAX_SPEED = 100
+    MAX_STEERING_ANGLE = 30.0
+
+    def __init__(self, n: int, threshold=600, polarity=0, scaling_factor=2.0, max_angle_diff=2.0, start_speed=60):
+        def per_car(value):
+            return np.broadcast_to(np.asarray(value, dtype=np.float64), (n,)).copy()
+
+        self.n = n
+        self.threshold = per_car(threshold)
+        self.polarity = per_car(polarity)
+        self.scaling_factor = per_car(scaling_factor)
+        self.max_angle_diff = per_car(max_angle_diff)
+        self.start_speed = per_car(start_speed)
+        self.speed_step = (self.MAX_SPEED - self.start_speed) / 10.0
+        self.reset()
+
+    def reset(self):
+        self.last_angle = np.full(self.n, np.nan)
+        self.last_speed = self.start_speed.copy()
+
+    def detect(self, values):
+        '''
+        Vectorised Edge_Detector.detect over (N, 3) readings.
+        '''
+        values = np.asarray(values, dtype=np.float64)
+        left, center, right = values[:, 0], values[:, 1], values[:, 2]
+        th = self.threshold
+        left_edge = (left < th) & (center >= th)
+        right_edge = ~left_edge & (right < th) & (center >= th)
+        centred = ~left_edge & ~right_edge & (left > th) & (right > th) & (center < th)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            value = np.select(
+                [left_edge, right_edge, centred],
+                [(center - left) / center, (right - center) / center, (right - left) / ((right + left) / 2)],
+                0.0,
+            )
+        return np.where(self.polarity == 1, -value, value)
+
+    def control(self, steering_direction):
+        '''
+        Vectorised Steering_Controller.run; returns (servo angle, speed).
+        '''
+        angle = np.clip(steering_direction * self.scaling_factor * self.MAX_STEERING_ANGLE,
+                        -self.MAX_STEERING_ANGLE, self.MAX_STEERING_ANGLE)
+        diff = angle - self.last_angle
+        sharp = ~np.isnan(diff) & (np.abs(diff) > self.max_angle_diff)
+        angle = np.where(sharp, self.last_angle + np.sign(diff) * self.max_angle_diff, angle)
+        self.last_angle = angle
+
+        ramp = np.clip(np.maximum(self.start_speed, self.last_speed + self.speed_step), self.start_speed, self.MAX_SPEED)
+        speed = np.where(sharp, self.start_speed, ramp)
+        self.last_speed = np.where(sharp, self.last_speed, ramp)
+        return -angle, speed
+
+    def __call__(self, values):
+        return self.control(self.detect(values))
+
+
+class Batch_Simulator(object):
+    '''
+    N independent PiCar-X models stepped in lockstep as NumPy arrays.
+
+    Uses the same dynamics and sensor model as Picarx_Simulator, but maps
+    commands to motor outputs with picarx.kinematics.drive_duty instead of
+    going through a Picarx and HAT per car, so hundreds of configurations
+    run in one process.
+
+        policy = Batch_Line_Follower(200, scaling_factor=np.linspace(0.5, 4, 200))
+        report = Batch_Simulator(Track(), 200).run(policy, laps=1)
+    '''
+
+    def __init__(self, track: Track, n: int, max_speed_mm_s: float = 700.0, motor_tau: float = 0.08, servo_rate: float = 600.0):
+        from picarx.picarx_improved import Picarx
+        from picarx.kinematics import Ackermann_Table
+
+        self.track = track
+        self.n = n
+        self.max_speed_mm_s = max_speed_mm_s
+        self.motor_tau = motor_tau
+        self.servo_rate = servo_rate
+        self.wheelbase = Picarx.WHEELBASE_MM
+        self.dir_min = Picarx.DIR_MIN
+        self.dir_max = Picarx.DIR_MAX
+        self.ackermann = Ackermann_Table(Picarx.WHEELBASE_MM, Picarx.TRACK_WIDTH_MM, Picarx.DIR_MIN, Picarx.DIR_MAX)
+
+        lateral = Picarx_Simulator.GRAYSCALE_SPACING_MM
+        self._sensor_left = np.array([lateral, 0.0, -lateral])
+        self.reset()
+
+    def reset(self):
+        x, y, heading = self.track.start_pose
+        n = self.n
+        self.x = np.full(n, float(x))
+        self.y = np.full(n, float(y))
+        self.heading = np.full(n, float(heading))
+        self.steer = np.zeros(n)
+        self.left_speed = np.zeros(n)
+        self.right_speed = np.zeros(n)
+        _, s = self.track.nearest(self.x, self.y)
+        self._last_s = s
+        self.progress = np.zeros(n)
+        self.time = 0.0
+        self.active = np.ones(n, dtype=bool)
+
+    @property
+    def speed(self):
+        return (self.left_speed + self.right_speed) / 2
+
+    def grayscale_adc(self):
+        '''
+        (N, 3) grayscale readings, left to right.
+        '''
+        c = np.cos(self.heading)[:, None]
+        s = np.sin(self.heading)[:, None]
+        ahead = Picarx_Simulator.GRAYSCALE_AHEAD_MM
+        xs = self.x[:, None] + ahead * c - self._sensor_left * s
+        ys = self.y[:, None] + ahead * s + self._sensor_left * c
+        reflectance = self.track.sample(self.track.floor, xs, ys)
+        line, floor = Picarx_Simulator.ADC_LINE, Picarx_Simulator.ADC_FLOOR
+        return (line + (floor - line) * reflectance).astype(int)
+
+    def step(self, servo_angle, speed, dt: float):
+        '''
+        Apply (servo angle, signed speed) commands as Picarx would and integrate over dt.
+        '''
+        from picarx.kinematics import drive_duty
+
+        steer_target = np.clip(servo_angle, self.dir_min, self.dir_max)
+        left_level, left_duty, right_level, right_duty = drive_duty(steer_target, speed, self.ackermann)
+        # forward is left direction low, right direction high (mirrored motor)
+        left_target = np.where(left_level, -1.0, 1.0) * left_duty / 100.0 * self.max_speed_mm_s
+        right_target = np.where(right_level, 1.0, -1.0) * right_duty / 100.0 * self.max_speed_mm_s
+
+        active = self.active
+        max_step = self.servo_rate * dt
+        steer = self.steer + np.clip(steer_target - self.steer, -max_step, max_step)
+        k = 1.0 - math.exp(-dt / self.motor_tau)
+        left = self.left_speed + (left_target - self.left_speed) * k
+        right = self.right_speed + (right_target - self.right_speed) * k
+        self.steer = np.where(active, steer, self.steer)
+        self.left_speed = np.where(active, left, 0.0)
+        self.right_speed = np.where(active, right, 0.0)
+
+        # bicycle model about the rear axle; positive servo angle turns right
+        v = self.speed
+        self.heading = self.heading - v * np.tan(np.radians(self.steer)) / self.wheelbase * dt
+        self.x = self.x + v * np.cos(self.heading) * dt
+        self.y = self.y + v * np.sin(self.heading) * dt
+
+        s = self.track.sample(self.track.arclength, self.x, self.y).astype(np.float64)
+        ds = s - self._last_s
+        length = self.track.length
+        ds = np.where(ds < -length / 2, ds + length, np.where(ds > length / 2, ds - length, ds))
+        self.progress += ds
+        self._last_s = s
+        self.time += dt
+
+    def run(self, policy, laps: int = 1, dt: float = 0.02, max_time: float = 120.0, max_xte_mm: float = 150.0):
+        '''
+        Run policy(grayscale (N, 3)) -> (servo angle, speed) for every car until
+        each has finished, left the line or timed out.
+
+        return: report dict of per-car arrays plus batch timing
+        '''
+        n = self.n
+        lap_times = np.full((n, laps), np.nan)
+        laps_done = np.zeros(n, dtype=int)
+        lap_start = np.zeros(n)
+        off_track = np.zeros(n, dtype=bool)
+        xte_sq = np.zeros(n)
+        xte_max = np.zeros(n)
+        ticks = np.zeros(n, dtype=int)
+        tick_s = []
+        wall_start = time.perf_counter()
+
+        while self.active.any() and self.time < max_time:
+            t0 = time.perf_counter()
+            servo_angle, speed = policy(self.grayscale_adc())
+            self.step(servo_angle, speed, dt)
+            tick_s.append(time.perf_counter() - t0)
+
+            active = self.active
+            error = self.track.sample(self.track.distance, self.x, self.y)
+            xte_sq += np.where(active, error ** 2, 0.0)
+            xte_max = np.where(active, np.maximum(xte_max, error), xte_max)
+            ticks += active
+
+            finished_lap = active & (self.progress >= self.track.length * (laps_done + 1))
+            rows = np.nonzero(finished_lap)[0]
+            lap_times[rows, laps_done[rows]] = self.time - lap_start[rows]
+            lap_start[rows] = self.time
+            laps_done += finished_lap
+
+            off_track |= active & (error > max_xte_mm)
+            self.active = active & ~off_track & (laps_done < laps)
+
+        status = np.where(laps_done >= laps, "ok", np.where(off_track, "off track", "timeout"))
+        tick_us = np.asarray(tick_s) * 1e6
+        return {
+            "status": status,
+            "laps": laps_done,
+            "lap_times": lap_times,
+            "xte_rms_mm": np.sqrt(xte_sq / np.maximum(ticks, 1)),
+            "xte_max_mm": xte_max,
+            "sim_time": self.time,
+            "wall_time": time.perf_counter() - wall_start,
+            "ticks": len(tick_us),
+            "tick_mean_us": float(tick_us.mean()) if len(tick_us) else 0.0,
+        }
+
+
+def format_report(report):
+    lines = [f"status: {report['status']}, laps: {report['laps']}"]
+    for i, lap in enumerate(report["lap_times"]):
+        lines.append(f"  lap {i + 1}: {lap:.2f} s")
+    lines.append(f"cross-track error: rms {report['xte_rms_mm']:.1f} mm, max {report['xte_max_mm']:.1f} mm")
+    lines.append(f"compute per tick: mean {report['tick_mean_us']:.0f} us, p99 {report['tick_p99_us']:.0f} us")
+    speedup = report["sim_time"] / report["wall_time"] if report["wall_time"] > 0 else float("inf")
+    lines.append(f"{report['ticks']} ticks, {report['sim_time']:.1f} s simulated in {report['wall_time']:.2f} s ({speedup:.0f}x real time)")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    from helper.logging_config import setup_logging
+    from picarx.core.edge_detector import Edge_Detector
+    from picarx.controller.steering_controller import Steering_Controller
+    setup_logging()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    sim = Picarx_Simulator(Track())
+    detector = Edge_Detector(threshold=600, polarity=0)
+    controller = Steering_Controller()
+    report = sim.run(lambda px: controller.run(px, detector.detect(px.get_grayscale_data())), laps=3)
+    print(format_report(report))
+    sim.close()
@@ -2,22 +2,22 @@
 import logging
 
 from helper.logging_config import setup_logging
-setup_logging()
 
 logger = logging.getLogger(__spec__.name if __spec__ else __name__)
 
 from picarx import Picarx
 import atexit
 
+from picarx.maneuver_engine import Maneuver_Engine
 from picarx.maneuvers import (
-    forward_straight,
-    backward_straight,
-    forward_turn,
-    backward_turn,
-    parallel_park_right,
-    parallel_park_left,
-    k_turn_left,
-    k_turn_right,
+    forward_straight_segments,
+    backward_straight_segments,
+    forward_turn_segments,
+    backward_turn_segments,
+    parallel_park_right_segments,
+    parallel_park_left_segments,
+    k_turn_left_segments,
+    k_turn_right_segments,
 )
 
 HELP_TEXT = """
@@ -34,14 +34,19 @@ Teleop commands:
   kl -> K-turn left
   kr -> K-turn right
 
-  x  -> stop
+  Maneuvers queue up and run in the background.
+
+  x  -> stop (cancels running and queued maneuvers)
   h  -> help
   quit / exit -> quit
 """
 
 def main():
+    setup_logging()
     px = Picarx()
     atexit.register(px.close)
+    engine = Maneuver_Engine(px)
+    engine.start()
     logger.info("Teleop started.")
     print(HELP_TEXT)
 
@@ -65,51 +70,51 @@ def main():
                 continue
 
             if cmd == "x":
-                px.stop()
+                engine.cancel()
                 print("Stopped.")
                 continue
 
             # Map commands to maneuvers
-            try:
-                if cmd == "w":
-                    forward_straight(px, speed=speed, duration_s=duration)
+            if cmd == "w":
+                segments = forward_straight_segments(speed=speed, duration_s=duration)
 
-                elif cmd == "s":
-                    backward_straight(px, speed=speed, duration_s=duration)
+            elif cmd == "s":
+                segments = backward_straight_segments(speed=speed, duration_s=duration)
 
-                elif cmd == "a":
-                    forward_turn(px, steering_deg=-px.DIR_MAX, speed=speed, duration_s=duration)
+            elif cmd == "a":
+                segments = forward_turn_segments(steering_deg=-px.DIR_MAX, speed=speed, duration_s=duration)
 
-                elif cmd == "d":
-                    forward_turn(px, steering_deg=+px.DIR_MAX, speed=speed, duration_s=duration)
+            elif cmd == "d":
+                segments = forward_turn_segments(steering_deg=+px.DIR_MAX, speed=speed, duration_s=duration)
 
-                elif cmd == "q":
-                    backward_turn(px, steering_deg=-px.DIR_MAX, speed=speed, duration_s=duration)
+            elif cmd == "q":
+                segments = backward_turn_segments(steering_deg=-px.DIR_MAX, speed=speed, duration_s=duration)
 
-                elif cmd == "e":
-                    backward_turn(px, steering_deg=+px.DIR_MAX, speed=speed, duration_s=duration)
+            elif cmd == "e":
+                segments = backward_turn_segments(steering_deg=+px.DIR_MAX, speed=speed, duration_s=duration)
 
-                elif cmd == "pr":
-                    parallel_park_right(px, speed=speed)
+            elif cmd == "pr":
+                segments = parallel_park_right_segments(px.DIR_MAX, speed=speed)
 
-                elif cmd == "pl":
-                    parallel_park_left(px, speed=speed)
+            elif cmd == "pl":
+                segments = parallel_park_left_segments(px.DIR_MAX, speed=speed)
 
-                elif cmd == "kl":
-                    k_turn_left(px, speed=speed)
+            elif cmd == "kl":
+                segments = k_turn_left_segments(px.DIR_MAX, speed=speed)
 
-                elif cmd == "kr":
-                    k_turn_right(px, speed=speed)
+            elif cmd == "kr":
+                segments = k_turn_right_segments(px.DIR_MAX, speed=speed)
 
-                else:
-                    print(f"Unknown command: '{cmd}'. Type 'h' for help.")
+            else:
+                print(f"Unknown command: '{cmd}'. Type 'h' for help.")
+                continue
 
-            except Exception as ex:
-                logger.exception("Maneuver failed for cmd='%s': %s", cmd, ex)
-                px.stop()
+            engine.submit(segments, name=cmd)
 
     except KeyboardInterrupt:
         print("\nCtrl+C received. Exiting teleop.")
+    finally:
+        engine.close()
 
 if __name__ == "__main__":
     main()
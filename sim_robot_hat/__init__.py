@@ -2,22 +2,87 @@
 """
 Robot Hat Library
 """
-from .adc import ADC
-from .filedb import fileDB
-from .config import Config
-from .i2c import I2C
-from .modules import *
-from .music import Music
-from .motor import Motor, Motors
-from .pin import Pin
-from .pwm import PWM
-from .servo import Servo
-from .utils import *
-from .robot import Robot
+import importlib
+
 from .version import __version__
 
-from .device import Devices
-__device__ = Devices()
+# Submodules are imported on first attribute access, so "import
+# sim_robot_hat" stays cheap and only pulls in what a program uses.
+_LAZY = {
+    "ADC": "adc",
+    "fileDB": "filedb",
+    "Config": "config",
+    "Config_Store": "config_store",
+    "I2C": "i2c",
+    "Ultrasonic": "modules",
+    "ADXL345": "modules",
+    "RGB_LED": "modules",
+    "Buzzer": "modules",
+    "Grayscale_Module": "modules",
+    "Music": "music",
+    "Motor": "motor",
+    "Motors": "motor",
+    "Pin": "pin",
+    "PWM": "pwm",
+    "Timer_Manager": "pwm",
+    "Register_Cache": "regcache",
+    "Servo": "servo",
+    "Sim_HAT": "sim_device",
+    "Sim_SMBus": "sim_device",
+    "Virtual_Clock": "sim_device",
+    "current_hat": "sim_device",
+    "set_current_hat": "sim_device",
+    "Robot": "robot",
+    "Devices": "device",
+}
+# names re-exported with "from .utils import *" and "from .modules import *"
+_STAR_MODULES = ("utils", "modules")
+# submodules the package used to import up front, which "import *" exported
+_EXPORTED_SUBMODULES = ("adc", "basic", "config", "device", "filedb", "i2c", "modules",
+                        "motor", "music", "pin", "pwm", "robot", "servo", "utils", "version")
+
+
+def _star_names():
+    # "from sim_robot_hat import *" exports the same names as when every
+    # submodule was imported eagerly, plus the classes added since
+    names = set(_LAZY) | set(_EXPORTED_SUBMODULES) | {"get_firmware_version"}
+    for module in _STAR_MODULES:
+        module = importlib.import_module(f".{module}", __name__)
+        names.update(name for name in vars(module) if not name.startswith("_"))
+    return sorted(names)
+
+
+def _is_submodule(name):
+    import importlib.util
+    return importlib.util.find_spec(f"{__name__}.{name}") is not None
+
+
+def __getattr__(name):
+    if name == "__device__":
+        from .device import Devices
+        value = Devices()
+    elif name == "__all__":
+        # built on first use, it imports utils and modules
+        value = _star_names()
+    elif name in _LAZY:
+        value = getattr(importlib.import_module(f".{_LAZY[name]}", __name__), name)
+    elif not name.startswith("_") and _is_submodule(name):
+        # submodule, e.g. sim_robot_hat.utils
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        for module in _STAR_MODULES:
+            module = importlib.import_module(f".{module}", __name__)
+            if not name.startswith("_") and hasattr(module, name):
+                value = getattr(module, name)
+                break
+        else:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY) | {"__device__"})
 
 def __usage__():
     print('''
@@ -32,6 +97,7 @@ info                    get hat info
     quit()
 
 def get_firmware_version():
+    from .i2c import I2C
     ADDR = [0x14, 0x15]
     VERSSION_REG_ADDR = 0x05
     i2c = I2C(ADDR)
@@ -41,6 +107,9 @@ def get_firmware_version():
 def __main__():
     import sys
     import os
+    from . import utils
+    from .utils import reset_mcu, info, warn
+    __device__ = __getattr__("__device__")
     if len(sys.argv) == 2:
         if sys.argv[1] == "reset_mcu":
             reset_mcu()
@@ -15,12 +15,11 @@ class ADC(I2C):
         :param chn: channel number (0-7/A0-A7)
         :type chn: int/str
         """
-        return
         if address is not None:
             super().__init__(address, *args, **kwargs)
         else:
             super().__init__(self.ADDR, *args, **kwargs)
-        self._debug(f'ADC device address: 0x{self.address:02X}')
+        self._debug('ADC device address: 0x%02X', self.address)
 
         if isinstance(chn, str):
             # If chn is a string, assume it's a pin name, remove A and convert to int
@@ -44,15 +43,16 @@ class ADC(I2C):
         :return: ADC value(0-4095)
         :rtype: int
         """
-        return 868
-        # Write register address
-        self.write([self.chn, 0, 0])
-        # Read values
-        msb, lsb = super().read(2)
+        # Channel select and readback must not interleave with other threads
+        with self.hold_bus():
+            # Write register address
+            self.write([self.chn, 0, 0])
+            # Read values
+            msb, lsb = super().read(2)
 
         # Combine MSB and LSB
         value = (msb << 8) + lsb
-        self._debug(f"Read value: {value}")
+        self._debug("Read value: %s", value)
         return value
 
     def read_voltage(self):
@@ -62,10 +62,9 @@ class ADC(I2C):
         :return: Voltage value(0-3.3(V))
         :rtype: float
         """
-        return 2.1
         # Read ADC value
         value = self.read()
         # Convert to voltage
         voltage = value * 3.3 / 4095
-        self._debug(f"Read voltage: {voltage}")
+        self._debug("Read voltage: %s", voltage)
         return voltage
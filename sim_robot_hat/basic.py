@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 #!/usr/bin/env python3
 import logging
-import time
+import threading
 
 
 class _Basic_class(object):
@@ -21,6 +21,9 @@ class _Basic_class(object):
     DEBUG_NAMES = ['critical', 'error', 'warning', 'info', 'debug']
     """Debug level names"""
 
+    _handler = None
+    _handler_lock = threading.Lock()
+
     def __init__(self, debug_level='warning'):
         """
         Initialize the basic class
@@ -28,19 +31,31 @@ class _Basic_class(object):
         :param debug_level: debug level, 0(critical), 1(error), 2(warning), 3(info) or 4(debug)
         :type debug_level: str/int
         """
-        self.logger = logging.getLogger(f"self._class_name-{time.time()}")
-        self.ch = logging.StreamHandler()
-        form = "%(asctime)s	[%(levelname)s]	%(message)s"
-        self.formatter = logging.Formatter(form)
-        self.ch.setFormatter(self.formatter)
-        self.logger.addHandler(self.ch)
-        self._debug = self.logger.debug
-        self._info = self.logger.info
-        self._warning = self.logger.warning
-        self._error = self.logger.error
-        self._critical = self.logger.critical
+        self.logger = self._class_logger()
         self.debug_level = debug_level
 
+    @classmethod
+    def _class_logger(cls):
+        """
+        Get the logger shared by all objects of a class
+
+        Levels are per object, so the logger itself lets everything through
+        and _debug() and friends check the object's level first.
+        """
+        logger = cls.__dict__.get("_logger")
+        if logger is None:
+            with _Basic_class._handler_lock:
+                if _Basic_class._handler is None:
+                    handler = logging.StreamHandler()
+                    handler.setFormatter(logging.Formatter("%(asctime)s	[%(levelname)s]	%(message)s"))
+                    _Basic_class._handler = handler
+                logger = logging.getLogger(f"{cls.__module__}.{cls.__qualname__}")
+                logger.setLevel(logging.DEBUG)
+                if _Basic_class._handler not in logger.handlers:
+                    logger.addHandler(_Basic_class._handler)
+                cls._logger = logger
+        return logger
+
     @property
     def debug_level(self):
         """Debug level"""
@@ -56,6 +71,27 @@ class _Basic_class(object):
         else:
             raise ValueError(
                 f'Debug value must be 0(critical), 1(error), 2(warning), 3(info) or 4(debug), not "{debug}".')
-        self.logger.setLevel(self.DEBUG_LEVELS[self._debug_level])
-        self.ch.setLevel(self.DEBUG_LEVELS[self._debug_level])
-        self._debug(f'Set logging level to [{self._debug_level}]')
+        self._level = self.DEBUG_LEVELS[self._debug_level]
+        self._debug_on = self._level <= logging.DEBUG
+        self._debug('Set logging level to [%s]', self._debug_level)
+
+    # Messages take %-style arguments, formatted only if the level is enabled
+    def _debug(self, msg, *args):
+        if self._debug_on:
+            self.logger.debug(msg, *args)
+
+    def _info(self, msg, *args):
+        if self._level <= logging.INFO:
+            self.logger.info(msg, *args)
+
+    def _warning(self, msg, *args):
+        if self._level <= logging.WARNING:
+            self.logger.warning(msg, *args)
+
+    def _error(self, msg, *args):
+        if self._level <= logging.ERROR:
+            self.logger.error(msg, *args)
+
+    def _critical(self, msg, *args):
+        if self._level <= logging.CRITICAL:
+            self.logger.critical(msg, *args)
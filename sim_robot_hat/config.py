@@ -1,5 +1,6 @@
 import os
 from time import sleep
+from .config_store import atomic_write
 
 class Config():
 
@@ -10,6 +11,8 @@ class Config():
             self.file_check_create(self.path, mode, owner, description)
         #
         self._dict = {}
+        self._parsed = None
+        self._signature = None
         self.read()
 
     def __getitem__(self, key):
@@ -65,6 +68,14 @@ class Config():
         except Exception as e:
             raise(e)
 
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
     @staticmethod
     def _read(path):
         _dict = {}
@@ -145,11 +156,8 @@ class Config():
                 part[_section].append('\n')
                 _dict.pop(_section)
 
-        # write new contents to file
-        with open(path, 'w') as f:
-            for _section in part.keys():
-                for line in part[_section]:
-                    f.write(line)
+        # write new contents to file, replacing it in one step
+        atomic_write(path, ''.join(line for _section in part.keys() for line in part[_section]))
 
         # print new contents
         # for _section in part:
@@ -157,7 +165,12 @@ class Config():
         #         print(line, end='', flush=True)
 
     def read(self):
-        self._dict = self._read(self.path)
+        # parse the file again only when it changed since the last read
+        signature = self._stat(self.path)
+        if signature is None or signature != self._signature:
+            self._parsed = self._read(self.path)
+            self._signature = signature
+        self._dict = {section: dict(options) for section, options in self._parsed.items()}
         return self._dict
 
     def write(self):
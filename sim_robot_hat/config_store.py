@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Cached store for "name = value" config files
+
+The file is parsed once into memory. Reads are served from memory, writes
+update memory and are flushed together a short delay later with an atomic
+rename, so calibration loops that call set() repeatedly cost one file
+write. Edits made to the file by other programs are picked up on the next
+access once the file's modification time changes.
+"""
+import atexit
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__spec__.name if __spec__ else __name__)
+
+HEADER = "# robot-hat config and calibration value of robots\n\n"
+"""First lines of a newly created config file"""
+
+
+def atomic_write(path, text, mode=None):
+    """
+    Replace a file's contents in one step
+
+    Writes to a temporary file in the same directory and renames it over the
+    target, so readers never see a half-written file.
+
+    :param path: file path
+    :type path: str
+    :param text: new contents
+    :type text: str
+    :param mode: permission bits, defaults to those of the file being replaced
+    :type mode: int
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    if mode is None:
+        try:
+            mode = os.stat(path).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = 0o644
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class Config_Store(object):
+    """
+    In-memory view of a "name = value" config file shared by all its users
+    """
+
+    _stores = {}
+    _stores_lock = threading.Lock()
+
+    FLUSH_DELAY = 0.5
+    """Seconds from the first unsaved set() to the file write"""
+    WATCH_INTERVAL = 1.0
+    """Minimum seconds between checks for external edits"""
+
+    def __init__(self, path, mode=None, owner=None, flush_delay=FLUSH_DELAY, watch_interval=WATCH_INTERVAL):
+        """
+        Load a config file
+
+        :param path: config file, created on the first flush if missing
+        :type path: str
+        :param mode: permission bits for a new file, octal digits, e.g. "774"
+        :type mode: str/int
+        :param owner: user owning a new file and its directory
+        :type owner: str
+        :param flush_delay: seconds from the first unsaved set() to the file write
+        :type flush_delay: float
+        :param watch_interval: minimum seconds between checks for external edits
+        :type watch_interval: float
+        """
+        self.path = path
+        self.mode = int(str(mode), 8) if mode is not None else None
+        self.owner = owner or None
+        self.flush_delay = flush_delay
+        self.watch_interval = watch_interval
+        self.loads = 0
+        self.flushes = 0
+        self._lock = threading.RLock()
+        self._lines = []
+        self._index = {}
+        self._values = {}
+        self._pending = {}
+        self._timer = None
+        self._signature = None
+        self._checked = 0.0
+        self._load()
+
+    @classmethod
+    def for_path(cls, path, mode=None, owner=None):
+        """
+        Get the shared store of a config file, loading it on first use
+
+        :param path: config file
+        :type path: str
+        :param mode: permission bits for a new file
+        :type mode: str/int
+        :param owner: user owning a new file
+        :type owner: str
+        :return: config store
+        :rtype: Config_Store
+        """
+        key = os.path.abspath(path)
+        with cls._stores_lock:
+            store = cls._stores.get(key)
+            if store is None:
+                store = cls(path, mode, owner)
+                cls._stores[key] = store
+            return store
+
+    @classmethod
+    def flush_all(cls):
+        """Write unsaved changes of every store"""
+        with cls._stores_lock:
+            stores = list(cls._stores.values())
+        for store in stores:
+            store.flush()
+
+    # --------- file ---------
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _load(self):
+        signature = self._stat()
+        try:
+            with open(self.path, "r") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            lines = [HEADER]
+        except OSError as e:
+            logger.warning("Could not read %s: %s", self.path, e)
+            lines = []
+        if lines and not lines[-1].endswith("\n"):
+            lines[-1] += "\n"
+        self._lines = lines
+        self._index = {}
+        self._values = {}
+        for i, line in enumerate(lines):
+            if line.startswith("#") or "=" not in line:
+                continue
+            name, value = line.split("=", 1)
+            name = name.strip()
+            # last definition wins, as in the line-scanning reader
+            self._index[name] = i
+            self._values[name] = value.replace(" ", "").strip()
+        # changes not yet flushed survive an external edit
+        for name, value in self._pending.items():
+            self._put(name, value)
+        self._signature = signature
+        self._checked = time.monotonic()
+        self.loads += 1
+
+    def _check_external(self):
+        now = time.monotonic()
+        if now - self._checked < self.watch_interval:
+            return
+        self._checked = now
+        if self._stat() != self._signature:
+            logger.debug("%s changed on disk, reloading", self.path)
+            self._load()
+
+    def reload(self):
+        """Parse the file again now, keeping unsaved changes"""
+        with self._lock:
+            self._load()
+
+    # --------- values ---------
+    def get(self, name, default=None):
+        """
+        Get a value
+
+        :param name: name of the value
+        :type name: str
+        :param default: returned if the name is not in the file
+        :type default: str
+        :return: value
+        :rtype: str
+        """
+        with self._lock:
+            self._check_external()
+            return self._values.get(name, default)
+
+    def _put(self, name, value):
+        line = "%s = %s\n" % (name, value)
+        i = self._index.get(name)
+        if i is None:
+            self._index[name] = len(self._lines)
+            self._lines.append(line)
+            self._lines.append("\n")
+        else:
+            self._lines[i] = line
+        self._values[name] = value.replace(" ", "")
+
+    def set(self, name, value):
+        """
+        Set a value, written to the file after flush_delay
+
+        :param name: name of the value
+        :type name: str
+        :param value: value, stored as its string form
+        :type value: object
+        """
+        value = str(value)
+        with self._lock:
+            self._check_external()
+            if self._values.get(name) == value.replace(" ", ""):
+                return
+            self._put(name, value)
+            self._pending[name] = value
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    @property
+    def dirty(self):
+        """True while changes are waiting to be written"""
+        with self._lock:
+            return bool(self._pending)
+
+    def flush(self):
+        """
+        Write unsaved changes now
+
+        :return: True if the file is up to date
+        :rtype: bool
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return True
+            created = self._signature is None
+            try:
+                directory = os.path.dirname(os.path.abspath(self.path))
+                os.makedirs(directory, mode=0o754, exist_ok=True)
+                atomic_write(self.path, "".join(self._lines), self.mode if created else None)
+            except OSError as e:
+                # keep the changes in memory and retry on the next set()
+                logger.warning("Could not save %s: %s", self.path, e)
+                return False
+            if created:
+                self._chown(directory)
+            self._pending.clear()
+            self._signature = self._stat()
+            self.flushes += 1
+            return True
+
+    def _chown(self, directory):
+        if self.owner is None:
+            return
+        for path in (directory, self.path):
+            try:
+                shutil.chown(path, self.owner, self.owner)
+            except (OSError, LookupError) as e:
+                logger.debug("Could not chown %s: %s", path, e)
+
+
+atexit.register(Config_Store.flush_all)
@@ -12,12 +12,36 @@
 '''
 import os
 from time import sleep
+from .config_store import Config_Store
+
+SIM_CONFIG_DIR = os.environ.get("SIM_ROBOT_HAT_CONFIG_DIR") or os.path.join(
+	os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "sim_robot_hat")
+"""Per-user directory the simulated files live in, instead of the real paths"""
+
+
+def sim_config_path(path:str):
+	"""
+	Get the file a simulated fileDB uses for a config path
+
+	The path is mirrored under SIM_CONFIG_DIR, e.g. /opt/picar-x/picar-x.conf
+	becomes SIM_CONFIG_DIR/opt/picar-x/picar-x.conf, so the simulator never
+	reads or writes the robot's real calibration.
+
+	:param path: config file path
+	:type path: str
+	:return: simulated file path
+	:rtype: str
+	"""
+	return os.path.join(SIM_CONFIG_DIR, os.path.abspath(path).lstrip(os.sep))
 
 
 class fileDB(object):
 	"""A file based database.
 
     A file based database, read and write arguements in the specific file.
+    Objects on the same file share one in-memory Config_Store: reads do not
+    touch the file, and writes are saved together shortly after. The file
+    itself is kept under SIM_CONFIG_DIR, see sim_config_path().
     """
 	def __init__(self, db:str, mode:str=None, owner:str=None):  
 		'''
@@ -32,12 +56,11 @@ class fileDB(object):
 		'''
 
 		self.db = db
-		# Check if db_file is existed, otherwise create one
-		return
-		if self.db != None:	
-			self.file_check_create(db, mode, owner)
-		else:
+		if self.db == None:
 			raise ValueError('db: Missing file path parameter.')
+		# sim: the file is created under SIM_CONFIG_DIR on the first save,
+		# owned by the user running the simulator
+		self._store = Config_Store.for_path(sim_config_path(db), mode)
 
 
 	def file_check_create(self, file_path:str, mode:str=None, owner:str=None):
@@ -88,30 +111,7 @@ class fileDB(object):
 		:return: the value of the arguement
 		:rtype: str
 		"""
-		return default_value
-		try:
-			conf = open(self.db,'r')
-			lines=conf.readlines()
-			conf.close()
-			file_len=len(lines)-1
-			flag = False
-			# Find the arguement and set the value
-			for i in range(file_len):
-				if lines[i][0] != '#':
-					if lines[i].split('=')[0].strip() == name:
-						value = lines[i].split('=')[1].replace(' ', '').strip()
-						flag = True
-			if flag:
-				return value
-			else:
-				return default_value
-		except FileNotFoundError:
-			conf = open(self.db,'w')
-			conf.write("")
-			conf.close()
-			return default_value
-		except :
-			return default_value
+		return self._store.get(name, default_value)
 	
 	def set(self, name, value):
 		"""
@@ -122,27 +122,13 @@ class fileDB(object):
 		:param value: the value of the arguement
 		:type value: str
 		"""
-		return
-		# Read the file
-		conf = open(self.db,'r')
-		lines=conf.readlines()
-		conf.close()
-		file_len=len(lines)-1
-		flag = False
-		# Find the arguement and set the value
-		for i in range(file_len):
-			if lines[i][0] != '#':
-				if lines[i].split('=')[0].strip() == name:
-					lines[i] = '%s = %s\n' % (name, value)
-					flag = True
-		# If arguement does not exist, create one
-		if not flag:
-			lines.append('%s = %s\n\n' % (name, value))
-
-		# Save the file
-		conf = open(self.db,'w')
-		conf.writelines(lines)
-		conf.close()
+		self._store.set(name, value)
+
+	def flush(self):
+		"""
+		Save pending changes to the file now
+		"""
+		self._store.flush()
 
 if __name__ == '__main__':
     db = fileDB('/opt/robot-hat/test2.config')
@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 from .basic import _Basic_class
-from .utils import run_command
-# from smbus2 import SMBus
-import multiprocessing
+from .regcache import Register_Cache
+from .sim_device import Sim_SMBus as SMBus, current_hat
+from contextlib import contextmanager
+import threading
 
 
 def _retry_wrapper(func):
@@ -10,9 +11,10 @@ def _retry_wrapper(func):
     def wrapper(self, *arg, **kwargs):
         for _ in range(self.RETRY):
             try:
-                return func(self, *arg, **kwargs)
+                with self._bus_lock:
+                    return func(self, *arg, **kwargs)
             except OSError:
-                self._debug(f"OSError: {func.__name__}")
+                self._debug("OSError: %s", func.__name__)
                 continue
         else:
             return False
@@ -20,11 +22,71 @@ def _retry_wrapper(func):
     return wrapper
 
 
+class _Bus_Pool(object):
+    """
+    One SMBus connection and lock per bus, shared by every I2C object on it
+    """
+    _buses = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def acquire(cls, bus):
+        """
+        Get the shared connection to a bus, opening it on first use
+
+        :param bus: I2C bus number
+        :type bus: int
+        :return: pool key, SMBus, bus lock
+        :rtype: tuple
+        """
+        # sim: every simulated HAT has its own buses
+        key = (current_hat().name, bus)
+        with cls._lock:
+            entry = cls._buses.get(key)
+            if entry is None:
+                entry = cls._buses[key] = [SMBus(bus), threading.RLock(), 0]
+            entry[2] += 1
+            return key, entry[0], entry[1]
+
+    @classmethod
+    def release(cls, key):
+        """
+        Drop a reference to a bus, closing it when the last user goes
+
+        :param key: pool key from acquire()
+        :type key: tuple
+        """
+        with cls._lock:
+            entry = cls._buses.get(key)
+            if entry is None:
+                return
+            entry[2] -= 1
+            if entry[2] <= 0:
+                del cls._buses[key]
+                entry[0].close()
+
+    @classmethod
+    def open_buses(cls):
+        """
+        Get the number of users of each open bus
+
+        :return: {key: users}
+        :rtype: dict
+        """
+        with cls._lock:
+            return {key: entry[2] for key, entry in cls._buses.items()}
+
+
 class I2C(_Basic_class):
     """
     I2C bus read/write functions
     """
     RETRY = 5
+    SCAN_RANGE = range(0x08, 0x78)
+    """Addresses probed by scan(), as i2cdetect"""
+
+    _scan_cache = {}
+    _scan_lock = threading.Lock()
 
     # i2c_lock = multiprocessing.Value('i', 0)
 
@@ -38,9 +100,9 @@ class I2C(_Basic_class):
         :type bus: int
         """
         super().__init__(*args, **kwargs)
-        return
         self._bus = bus
-        self._smbus = SMBus(self._bus)
+        self._pool_key, self._smbus, self._bus_lock = _Bus_Pool.acquire(self._bus)
+        self._hat = self._smbus.hat
         if isinstance(address, list):
             connected_devices = self.scan()
             for _addr in address:
@@ -54,46 +116,60 @@ class I2C(_Basic_class):
 
         # print(f'address: 0x{self.address:02X}')
 
+    @contextmanager
+    def hold_bus(self):
+        """
+        Hold the bus across a compound transaction, e.g. select then read
+
+        Other threads' transactions on this bus wait until the block exits.
+        Reentrant, so nested holds and the single transfers inside are fine.
+        """
+        with self._bus_lock:
+            yield self
+
+    @property
+    def register_cache(self):
+        """Write-through register cache shared by all objects on this device"""
+        return Register_Cache.for_device((self._hat.name, self._bus, self.address))
+
     @_retry_wrapper
     def _write_byte(self, data):
         # with I2C.i2c_lock.get_lock():
-        self._debug(f"_write_byte: [0x{data:02X}]")
+        self._debug("_write_byte: [0x%02X]", data)
         result = self._smbus.write_byte(self.address, data)
         return result
 
     @_retry_wrapper
     def _write_byte_data(self, reg, data):
         # with I2C.i2c_lock.get_lock():
-        self._debug(f"_write_byte_data: [0x{reg:02X}] [0x{data:02X}]")
+        self._debug("_write_byte_data: [0x%02X] [0x%02X]", reg, data)
         return self._smbus.write_byte_data(self.address, reg, data)
 
     @_retry_wrapper
     def _write_word_data(self, reg, data):
         # with I2C.i2c_lock.get_lock():
-        return
-        self._debug(f"_write_word_data: [0x{reg:02X}] [0x{data:04X}]")
+        self._debug("_write_word_data: [0x%02X] [0x%04X]", reg, data)
         return self._smbus.write_word_data(self.address, reg, data)
 
     @_retry_wrapper
     def _write_i2c_block_data(self, reg, data):
         # with I2C.i2c_lock.get_lock():
-        self._debug(
-            f"_write_i2c_block_data: [0x{reg:02X}] {[f'0x{i:02X}' for i in data]}"
-        )
+        if self._debug_on:
+            self._debug("_write_i2c_block_data: [0x%02X] %s", reg, [f'0x{i:02X}' for i in data])
         return self._smbus.write_i2c_block_data(self.address, reg, data)
 
     @_retry_wrapper
     def _read_byte(self):
         # with I2C.i2c_lock.get_lock():
         result = self._smbus.read_byte(self.address)
-        self._debug(f"_read_byte: [0x{result:02X}]")
+        self._debug("_read_byte: [0x%02X]", result)
         return result
 
     @_retry_wrapper
     def _read_byte_data(self, reg):
         # with I2C.i2c_lock.get_lock():
         result = self._smbus.read_byte_data(self.address, reg)
-        self._debug(f"_read_byte_data: [0x{reg:02X}] [0x{result:02X}]")
+        self._debug("_read_byte_data: [0x%02X] [0x%02X]", reg, result)
         return result
 
     @_retry_wrapper
@@ -101,63 +177,83 @@ class I2C(_Basic_class):
         # with I2C.i2c_lock.get_lock():
         result = self._smbus.read_word_data(self.address, reg)
         result_list = [result & 0xFF, (result >> 8) & 0xFF]
-        self._debug(f"_read_word_data: [0x{reg:02X}] [0x{result:04X}]")
+        self._debug("_read_word_data: [0x%02X] [0x%04X]", reg, result)
         return result_list
 
     @_retry_wrapper
     def _read_i2c_block_data(self, reg, num):
         # with I2C.i2c_lock.get_lock():
         result = self._smbus.read_i2c_block_data(self.address, reg, num)
-        self._debug(
-            f"_read_i2c_block_data: [0x{reg:02X}] {[f'0x{i:02X}' for i in result]}"
-        )
+        if self._debug_on:
+            self._debug("_read_i2c_block_data: [0x%02X] %s", reg, [f'0x{i:02X}' for i in result])
         return result
 
-    @_retry_wrapper
     def is_ready(self):
         """Check if the I2C device is ready
 
         :return: True if the I2C device is ready, False otherwise
         :rtype: bool
         """
-        addresses = self.scan()
-        if self.address in addresses:
-            return True
-        else:
+        with self.hold_bus():
+            return self._probe(self.address)
+
+    def _probe(self, address):
+        # Same probes as i2cdetect's auto mode: a byte read in the EEPROM
+        # ranges, where a quick write could change data, a quick write elsewhere
+        try:
+            if 0x30 <= address <= 0x37 or 0x50 <= address <= 0x5F:
+                self._smbus.read_byte(address)
+            else:
+                self._smbus.write_quick(address)
+        except OSError:
             return False
+        return True
 
-    def scan(self):
+    def scan(self, refresh=False):
         """Scan the I2C bus for devices
 
+        Probes each address directly instead of running i2cdetect. The result
+        is cached per bus for the whole process, so devices constructed with
+        an address list share one scan.
+
+        :param refresh: probe the bus again instead of using the cached result
+        :type refresh: bool
         :return: List of I2C addresses of devices found
         :rtype: list
         """
-        cmd = f"i2cdetect -y {self._bus}"
-        # Run the i2cdetect command
-        _, output = run_command(cmd)
-
-        # Parse the output
-        outputs = output.split('\n')[1:]
-        addresses = []
-        addresses_str = []
-        for tmp_addresses in outputs:
-            if tmp_addresses == "":
-                continue
-            tmp_addresses = tmp_addresses.split(':')[1]
-            # Split the addresses into a list
-            tmp_addresses = tmp_addresses.strip().split(' ')
-            for address in tmp_addresses:
-                if address != '--':
-                    addresses.append(int(address, 16))
-                    addresses_str.append(f'0x{address}')
-        self._debug(f"Conneceted i2c device: {addresses_str}")
-        return addresses
+        with I2C._scan_lock:
+            addresses = I2C._scan_cache.get(self._pool_key)
+        if addresses is None or refresh:
+            with self.hold_bus():
+                addresses = [addr for addr in self.SCAN_RANGE if self._probe(addr)]
+            with I2C._scan_lock:
+                I2C._scan_cache[self._pool_key] = addresses
+            if self._debug_on:
+                self._debug("Conneceted i2c device: %s", [f'0x{addr:02X}' for addr in addresses])
+        return list(addresses)
+
+    @classmethod
+    def clear_scan_cache(cls, hat=None):
+        """
+        Forget cached scans so the next scan() probes the bus again
+
+        :param hat: name of the HAT whose scans to forget, None for all
+        :type hat: str
+        """
+        with cls._scan_lock:
+            if hat is None:
+                cls._scan_cache.clear()
+                return
+            for key in [key for key in cls._scan_cache if key[0] == hat]:
+                del cls._scan_cache[key]
 
     def write(self, data):
         """Write data to the I2C device
 
         :param data: Data to write
         :type data: int/list/bytearray
+        :return: True if the write went through, False if every retry failed
+        :rtype: bool
         :raises: ValueError if write is not an int, list or bytearray
         """
         if isinstance(data, bytearray):
@@ -180,19 +276,21 @@ class I2C(_Basic_class):
         # Write data
         if len(data_all) == 1:
             data = data_all[0]
-            self._write_byte(data)
+            result = self._write_byte(data)
         elif len(data_all) == 2:
             reg = data_all[0]
             data = data_all[1]
-            self._write_byte_data(reg, data)
+            result = self._write_byte_data(reg, data)
         elif len(data_all) == 3:
             reg = data_all[0]
             data = (data_all[2] << 8) + data_all[1]
-            self._write_word_data(reg, data)
+            result = self._write_word_data(reg, data)
         else:
             reg = data_all[0]
             data = list(data_all[1:])
-            self._write_i2c_block_data(reg, data)
+            result = self._write_i2c_block_data(reg, data)
+        # _retry_wrapper returns False once every retry failed
+        return result is not False
 
     def read(self, length=1):
         """Read data from I2C device
@@ -206,8 +304,9 @@ class I2C(_Basic_class):
             raise ValueError(f"length must be int, not {type(length)}")
 
         result = []
-        for _ in range(length):
-            result.append(self._read_byte())
+        with self.hold_bus():
+            for _ in range(length):
+                result.append(self._read_byte())
         return result
 
     def mem_write(self, data, memaddr):
@@ -257,11 +356,13 @@ class I2C(_Basic_class):
         :return: True if the I2C device is avaliable, False otherwise
         :rtype: bool
         """
-        return self.address in self.scan()
+        with self.hold_bus():
+            return self._probe(self.address)
 
     def __del__(self):
-        return
-        self._smbus.close()
+        if getattr(self, "_smbus", None) is None:
+            return
+        _Bus_Pool.release(self._pool_key)
         self._smbus = None
 
 if __name__ == "__main__":
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Opt-in I2C transaction tracer
+
+install() wraps the low-level transfer methods of an I2C class, so every
+transaction is recorded with address, register, size, duration, caller and
+thread into a ring buffer. It works for sim_robot_hat.I2C and for the real
+robot_hat.I2C, which share the same method names::
+
+    from sim_robot_hat import i2c_trace
+    tracer = i2c_trace.install()            # or install(robot_hat.I2C)
+    ...
+    print(i2c_trace.format_summary(tracer.summary()))
+    i2c_trace.uninstall()
+"""
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque, namedtuple
+
+Record = namedtuple("Record", ["start", "duration", "op", "address", "reg", "size", "caller", "thread", "loop"])
+"""One traced I2C transaction"""
+
+# method name: (op, has register, payload size from the call arguments)
+_METHODS = {
+    "_write_byte": ("write", False, lambda args: 1),
+    "_write_byte_data": ("write", True, lambda args: 1),
+    "_write_word_data": ("write", True, lambda args: 2),
+    "_write_i2c_block_data": ("write", True, lambda args: len(args[1])),
+    "_read_byte": ("read", False, lambda args: 1),
+    "_read_byte_data": ("read", True, lambda args: 1),
+    "_read_word_data": ("read", True, lambda args: 2),
+    "_read_i2c_block_data": ("read", True, lambda args: args[1]),
+}
+
+BUS_SPEED = 100000
+"""Default I2C clock (Hz) of the Raspberry Pi, used for wire time estimates"""
+
+_tracer = None
+_installed = {}
+
+
+class I2C_Tracer(object):
+    """
+    Ring buffer of I2C transactions with summaries
+    """
+
+    def __init__(self, size=8192, callers=True, bus_speed=BUS_SPEED, clock=None):
+        """
+        Initialize the tracer
+
+        :param size: number of transactions kept
+        :type size: int
+        :param callers: record the first caller outside the HAT library
+        :type callers: bool
+        :param bus_speed: I2C clock (Hz) for wire time estimates
+        :type bus_speed: int
+        :param clock: clock for timestamps and rates, e.g. a simulator's Virtual_Clock
+        :type clock: object
+        """
+        self.records = deque(maxlen=size)
+        self.callers = callers
+        self.bus_speed = bus_speed
+        self._now = clock.monotonic if clock is not None else time.perf_counter
+        # call durations are wall time, so call utilisation is taken over a
+        # wall clock window kept next to the records
+        self._wall_starts = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.total = 0
+        self.started = self._now()
+        self._wall_started = time.perf_counter()
+        self._local = threading.local()
+        self._library_dirs = ()
+
+    def record(self, duration, op, address, reg, size):
+        caller = self._caller() if self.callers else None
+        loop = getattr(self._local, "loop", None)
+        wall = time.perf_counter() - duration
+        record = Record(self._now(), duration, op, address, reg, size, caller,
+                        threading.current_thread().name, loop)
+        with self._lock:
+            self.total += 1
+            self.records.append(record)
+            self._wall_starts.append(wall)
+
+    def _caller(self):
+        frame = sys._getframe(3)
+        while frame is not None and frame.f_code.co_filename.startswith(self._library_dirs):
+            frame = frame.f_back
+        if frame is None:
+            return None
+        code = frame.f_code
+        return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+    def loop(self, name):
+        """
+        Attribute transactions made by this thread inside the block to a loop
+
+        :param name: loop name
+        :type name: str
+        :return: context manager
+        """
+        return _Loop(self._local, name)
+
+    def clear(self):
+        """Forget recorded transactions and restart the summary window"""
+        with self._lock:
+            self.records.clear()
+            self._wall_starts.clear()
+            self.total = 0
+            self.started = self._now()
+            self._wall_started = time.perf_counter()
+
+    def wire_time(self, record):
+        """
+        Estimate the time a transaction holds the bus
+
+        :param record: transaction
+        :type record: Record
+        :return: seconds
+        :rtype: float
+        """
+        # address byte, optional register byte and payload, 9 clocks each;
+        # register reads add a repeated start and address byte
+        nbytes = 1 + record.size + (1 if record.reg is not None else 0)
+        if record.op == "read" and record.reg is not None:
+            nbytes += 1
+        return nbytes * 9 / self.bus_speed
+
+    def summary(self, top=5):
+        """
+        Summarise the recorded transactions
+
+        Once the ring buffer has wrapped, the window starts at the oldest
+        transaction still held. Rates use the tracer's clock; call
+        utilisation divides wall time spent in calls by wall time elapsed.
+
+        :param top: number of top callers to list
+        :type top: int
+        :return: counts, rates, utilisation, per-loop counts and top callers
+        :rtype: dict
+        """
+        with self._lock:
+            records = list(self.records)
+            total = self.total
+            wrapped = len(records) == self.records.maxlen
+            start = records[0].start if wrapped and records else self.started
+            wall_start = self._wall_starts[0] if wrapped and records else self._wall_started
+        if not records:
+            return {"count": 0, "elapsed": 0.0}
+        elapsed = max(self._now() - start, 1e-9)
+        wall_elapsed = max(time.perf_counter() - wall_start, 1e-9)
+        busy = sum(r.duration for r in records)
+        wire = sum(self.wire_time(r) for r in records)
+        loops = Counter(r.loop or r.thread for r in records)
+        return {
+            "count": len(records),
+            "dropped": total - len(records),
+            "elapsed": elapsed,
+            "rate_hz": len(records) / elapsed,
+            "by_op": dict(Counter(r.op for r in records)),
+            "bytes": sum(r.size for r in records),
+            "busy_s": busy,
+            "call_utilisation": busy / wall_elapsed,
+            "wire_utilisation": wire / elapsed,
+            "per_loop": {name: {"count": count, "rate_hz": count / elapsed} for name, count in loops.most_common()},
+            "top_callers": Counter(r.caller for r in records).most_common(top),
+            "top_registers": Counter((r.address, r.reg) for r in records).most_common(top),
+        }
+
+
+class _Loop(object):
+
+    def __init__(self, local, name):
+        self._local = local
+        self._name = name
+
+    def __enter__(self):
+        self._previous = getattr(self._local, "loop", None)
+        self._local.loop = self._name
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._local.loop = self._previous
+
+
+def _traced(method, op, has_reg, sizer):
+
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        tracer = _tracer
+        if tracer is None:
+            return method(self, *args)
+        start = time.perf_counter()
+        try:
+            return method(self, *args)
+        finally:
+            tracer.record(time.perf_counter() - start, op, self.address,
+                          args[0] if has_reg else None, sizer(args))
+
+    wrapper._i2c_trace_original = method
+    return wrapper
+
+
+def install(i2c_class=None, tracer=None):
+    """
+    Start tracing transfers made through an I2C class and its subclasses
+
+    :param i2c_class: class to patch, defaults to sim_robot_hat.I2C
+    :type i2c_class: type
+    :param tracer: tracer to record into, a new one by default
+    :type tracer: I2C_Tracer
+    :return: active tracer
+    :rtype: I2C_Tracer
+    """
+    global _tracer
+    if i2c_class is None:
+        from .i2c import I2C as i2c_class
+    if tracer is None:
+        tracer = I2C_Tracer()
+    library_dir = os.path.dirname(os.path.abspath(sys.modules[i2c_class.__module__].__file__))
+    tracer._library_dirs = tuple(set(tracer._library_dirs) | {library_dir + os.sep})
+
+    if i2c_class not in _installed:
+        originals = {}
+        for name, (op, has_reg, sizer) in _METHODS.items():
+            method = i2c_class.__dict__.get(name)
+            if method is None:
+                continue
+            originals[name] = method
+            setattr(i2c_class, name, _traced(method, op, has_reg, sizer))
+        _installed[i2c_class] = originals
+    _tracer = tracer
+    return tracer
+
+
+def uninstall():
+    """Stop tracing and restore the original I2C methods"""
+    global _tracer
+    _tracer = None
+    for i2c_class, originals in _installed.items():
+        for name, method in originals.items():
+            setattr(i2c_class, name, method)
+    _installed.clear()
+
+
+def active_tracer():
+    """
+    Get the tracer transactions are recorded into
+
+    :return: tracer, None when tracing is off
+    :rtype: I2C_Tracer
+    """
+    return _tracer
+
+
+def format_summary(summary):
+    """
+    Format a summary for printing
+
+    :param summary: result of I2C_Tracer.summary()
+    :type summary: dict
+    :return: report
+    :rtype: str
+    """
+    if not summary["count"]:
+        return "no I2C transactions recorded"
+    lines = [
+        f"{summary['count']} transactions in {summary['elapsed']:.2f} s "
+        f"({summary['rate_hz']:.0f}/s, {summary['bytes']} bytes, {summary['by_op']}, "
+        f"{summary['dropped']} older dropped)",
+        f"bus utilisation: {summary['wire_utilisation'] * 100:.1f}% on the wire, "
+        f"{summary['call_utilisation'] * 100:.1f}% in calls",
+        "per loop:",
+    ]
+    for name, stats in summary["per_loop"].items():
+        lines.append(f"  {name:<32} {stats['count']:7d}  {stats['rate_hz']:8.1f}/s")
+    lines.append("top callers:")
+    for caller, count in summary["top_callers"]:
+        lines.append(f"  {caller or '?':<32} {count:7d}")
+    lines.append("top registers:")
+    for (address, reg), count in summary["top_registers"]:
+        reg = "--" if reg is None else f"0x{reg:02X}"
+        lines.append(f"  0x{address:02X} {reg:<27} {count:7d}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # trace one simulated lap of the grayscale line follower
+    import logging
+    from picarx.simulator import Track, Picarx_Simulator
+    from picarx.core.edge_detector import Edge_Detector
+    from picarx.controller.steering_controller import Steering_Controller
+
+    sim = Picarx_Simulator(Track())
+    detector = Edge_Detector()
+    controller = Steering_Controller()
+    logging.getLogger().setLevel(logging.WARNING)
+    # rates per simulated second
+    tracer = install(tracer=I2C_Tracer(size=65536, clock=sim.clock))
+
+    def control_step(px):
+        with tracer.loop("grayscale"):
+            values = px.get_grayscale_data()
+        with tracer.loop("steering"):
+            controller.run(px, detector.detect(values))
+
+    report = sim.run(control_step, laps=1)
+    uninstall()
+    print(format_summary(tracer.summary()))
+    sim.close()
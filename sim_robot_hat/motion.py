@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Precomputed servo trajectories played on absolute deadlines
+
+Motion_Engine plans a whole multi-servo move as a NumPy array, converts
+every frame to PWM register values in one step and then only writes
+registers while playing, one bus hold per frame. Channels whose value did
+not change are skipped by the device's Register_Cache. Frames are due at fixed offsets from the start of
+the move, so slow writes or late wake-ups do not add up; when playback
+falls behind by more than a frame, the frames already overdue are dropped
+and the latest one is written.
+"""
+import time
+
+import numpy as np
+
+PROFILES = ("linear", "min_jerk")
+"""Interpolation profiles accepted by Motion_Engine.plan()"""
+
+
+def profile_curve(profile, steps):
+    """
+    Get the progress (0 to 1) at the end of each step of a move
+
+    :param profile: "linear" or "min_jerk" (zero velocity and acceleration at both ends)
+    :type profile: str
+    :param steps: number of steps
+    :type steps: int
+    :return: progress per step, the last one is 1
+    :rtype: numpy.ndarray
+    """
+    tau = np.arange(1, steps + 1) / steps
+    if profile == "linear":
+        return tau
+    if profile == "min_jerk":
+        return tau ** 3 * (10 - 15 * tau + 6 * tau ** 2)
+    raise ValueError(f'profile must be one of {PROFILES}, not "{profile}"')
+
+
+class Motion_Engine(object):
+    """
+    Plays servo trajectories on a group of Servo objects
+    """
+
+    STEP_TIME = 0.01
+    """Seconds between frames"""
+
+    def __init__(self, servos, step_time=STEP_TIME, clock=None):
+        """
+        Initialize the motion engine
+
+        :param servos: servos, one per trajectory column
+        :type servos: list
+        :param step_time: seconds between frames
+        :type step_time: float
+        :param clock: clock with monotonic() and sleep(), defaults to the HAT's clock
+        :type clock: object
+        """
+        self.servos = list(servos)
+        self.step_time = step_time
+        if clock is None:
+            clock = getattr(getattr(self.servos[0], "_hat", None), "clock", time)
+        self.clock = clock
+        self.last_report = None
+
+    def plan(self, start, targets, duration, profile="linear"):
+        """
+        Interpolate from start to targets
+
+        :param start: current angles
+        :type start: list
+        :param targets: target angles
+        :type targets: list
+        :param duration: seconds the move should take
+        :type duration: float
+        :param profile: "linear" or "min_jerk"
+        :type profile: str
+        :return: angles, one row per frame, the last row is targets
+        :rtype: numpy.ndarray
+        """
+        start = np.asarray(start, dtype=float)
+        targets = np.asarray(targets, dtype=float)
+        steps = max(1, int(duration / self.step_time))
+        progress = profile_curve(profile, steps)
+        return start + np.outer(progress, targets - start)
+
+    def pulse_values(self, angles):
+        """
+        Convert servo angles to PWM register values, as Servo.angle() does
+
+        :param angles: angles (-90~90), any shape with one column per servo
+        :type angles: numpy.ndarray
+        :return: pulse width register values
+        :rtype: numpy.ndarray
+        """
+        servo = self.servos[0]
+        angles = np.clip(angles, -90, 90)
+        pulse_width_time = servo.MIN_PW + (angles + 90) * (servo.MAX_PW - servo.MIN_PW) / 180
+        pulse_width_time = np.clip(pulse_width_time, servo.MIN_PW, servo.MAX_PW)
+        return (pulse_width_time / 20000 * servo.PERIOD).astype(int)
+
+    def write(self, values):
+        """
+        Write one frame of register values
+
+        :param values: register value per servo
+        :type values: list
+        """
+        with self.servos[0].hold_bus():
+            for servo, value in zip(self.servos, values):
+                servo.pulse_width(value)
+
+    def play(self, values):
+        """
+        Write frames of register values on their deadlines
+
+        Blocks until the move is over, one step_time after the last frame.
+
+        :param values: register values, one row per frame
+        :type values: numpy.ndarray
+        :return: requested and achieved duration (s), frames written and
+                 dropped, worst lateness (s) and mean frame write time (s)
+        :rtype: dict
+        """
+        frames = np.asarray(values).tolist()
+        count = len(frames)
+        clock = self.clock
+        step = self.step_time
+        written = dropped = 0
+        worst_late = busy = 0.0
+        start = clock.monotonic()
+        i = 0
+        while i < count:
+            due = start + i * step
+            now = clock.monotonic()
+            if now < due:
+                clock.sleep(due - now)
+            else:
+                late = now - due
+                worst_late = max(worst_late, late)
+                # overdue frames are stale, jump to the one due now
+                behind = min(count - 1, int((now - start) / step))
+                if behind > i:
+                    dropped += behind - i
+                    i = behind
+            t = time.perf_counter()
+            self.write(frames[i])
+            busy += time.perf_counter() - t
+            written += 1
+            i += 1
+        end = start + count * step
+        now = clock.monotonic()
+        if now < end:
+            clock.sleep(end - now)
+            now = clock.monotonic()
+        self.last_report = {
+            "requested_s": count * step,
+            "achieved_s": now - start,
+            "frames": written,
+            "dropped": dropped,
+            "worst_late_s": worst_late,
+            "write_mean_s": busy / written if written else 0.0,
+        }
+        return self.last_report
+
+    def move(self, start, targets, duration, profile="linear", transform=None):
+        """
+        Plan and play a move
+
+        :param start: current angles
+        :type start: list
+        :param targets: target angles
+        :type targets: list
+        :param duration: seconds the move should take
+        :type duration: float
+        :param profile: "linear" or "min_jerk"
+        :type profile: str
+        :param transform: function mapping planned angles to servo angles, e.g. adding offsets
+        :type transform: callable
+        :return: (planned angles, timing report)
+        :rtype: tuple
+        """
+        angles = self.plan(start, targets, duration, profile)
+        raw = transform(angles) if transform is not None else angles
+        return angles, self.play(self.pulse_values(raw))
+
+
+if __name__ == "__main__":
+    # compare servo_move's per-step loop with the engine on a simulated HAT
+    import logging
+    from .robot import Robot
+    from .sim_device import Sim_HAT
+
+    logging.getLogger().setLevel(logging.WARNING)
+    with Sim_HAT() as hat:
+        robot = Robot([0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11], db="/tmp/robot-hat-motion.conf")
+        targets = [30, -30, 45, -45, 20, -20, 60, -60, 10, -10, 0, 5]
+        for profile in PROFILES:
+            robot.reset()
+            hat.clear_traffic()
+            report = robot.servo_move(targets, speed=60, profile=profile)
+            print(f"{profile:<10} requested {report['requested_s'] * 1000:6.1f} ms, "
+                  f"achieved {report['achieved_s'] * 1000:6.1f} ms, {report['frames']} frames, "
+                  f"{report['dropped']} dropped, worst late {report['worst_late_s'] * 1000:.2f} ms, "
+                  f"{report['write_mean_s'] * 1e6:.0f} us per frame, {len(hat.writes())} register writes")
@@ -3,6 +3,7 @@ from .basic import _Basic_class
 from .pwm import PWM
 from .pin import Pin
 from .filedb import fileDB
+from .utils import get_username
 
 class Motor():
     """Motor"""
@@ -138,7 +139,7 @@ class Motors(_Basic_class):
         """
         super().__init__(*args, **kwargs)
 
-        self.db = fileDB(db=db, mode='774', owner=User)
+        self.db = fileDB(db=db, mode='774', owner=get_username())
         self.left_id = int(self.db.get("left", default_value=0))
         self.right_id = int(self.db.get("right", default_value=0))
         left_reversed = bool(self.db.get(
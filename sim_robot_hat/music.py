@@ -4,10 +4,38 @@ import time
 import threading
 # import pyaudiopi
 import os
-import struct
-import math
+import functools
+import numpy as np
 from .utils import enable_speaker, disable_speaker
 
+
+@functools.lru_cache(maxsize=256)
+def tone_data(freq: float, duration: float, rate: int):
+    """
+    Render a sine tone as 16-bit mono samples, cached
+
+    Repeated notes cost a cache lookup. The first half of duration is the
+    tone, as in Music.get_tone_data().
+
+    :param freq: frequency
+    :type freq: float
+    :param duration: duration in seconds
+    :type duration: float
+    :param rate: sample rate
+    :type rate: int
+    :return: tone data
+    :rtype: bytes
+    """
+    # Credit to: Aditya Shankar & Gringo Suave https://stackoverflow.com/a/53231212/14827323
+    frame_count = int(rate * duration / 2.0)
+    remainder_frames = frame_count % rate
+    wave = np.zeros(frame_count + remainder_frames, dtype='<i2')
+    # sin(2*pi * cycles so far), truncated like int()
+    phase = np.arange(frame_count) * (2 * np.pi * freq / rate)
+    wave[:frame_count] = np.sin(phase) * 32767
+    return wave.tobytes()
+
+
 class Music(_Basic_class):
     """Play music, sound affect and note control"""
 
@@ -59,6 +87,12 @@ class Music(_Basic_class):
     """Notes name, MIDI compatible"""
 
     def __init__(self):
+        """Initialize music"""
+        self.time_signature(4, 4)
+        self.tempo(120, 1/4)
+        self.key_signature(0)
+        self._pyaudio = None
+        self._stream = None
         return
         import warnings
         warnings_bk = warnings.filters
@@ -67,12 +101,8 @@ class Music(_Basic_class):
         os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "1" 
         import pygame
         warnings.filters = warnings_bk
-        """Initialize music"""
         self.pygame = pygame
         self.pygame.mixer.init()
-        self.time_signature(4, 4)
-        self.tempo(120, 1/4)
-        self.key_signature(0)
         #
         enable_speaker()
 
@@ -263,50 +293,40 @@ class Music(_Basic_class):
         :param duration: duration in seconds
         :type duration: float
         :return: tone data
-        :rtype: list
+        :rtype: bytes
         """
+        return tone_data(float(freq), float(duration), self.RATE)
+
+    def render_melody(self, notes):
         """
-        Credit to: Aditya Shankar & Gringo Suave https://stackoverflow.com/a/53231212/14827323
+        Render a melody into one buffer to play later without gaps
+
+        :param notes: (note, beat) pairs, note is a name from NOTES, a
+                      frequency, or None for a rest; beat as in beat()
+        :type notes: list
+        :return: tone data
+        :rtype: bytes
         """
-        duration /= 2.0
-        frame_count = int(self.RATE * duration)
-
-        remainder_frames = frame_count % self.RATE
-        wavedata = []
-
-        for i in range(frame_count):
-            a = self.RATE / freq  # number of frames per wave
-            b = i / a
-            # explanation for b
-            # considering one wave, what part of the wave should this be
-            # if we graph the sine wave in a
-            # displacement vs i graph for the particle
-            # where 0 is the beginning of the sine wave and
-            # 1 the end of the sine wave
-            # which part is "i" is denoted by b
-            # for clarity you might use
-            # though this is redundant since math.sin is a looping function
-            # b = b - int(b)
-
-            c = b * (2 * math.pi)
-            # explanation for c
-            # now we map b to between 0 and 2*math.PI
-            # since 0 - 2*PI, 2*PI - 4*PI, ...
-            # are the repeating domains of the sin wave (so the decimal values will
-            # also be mapped accordingly,
-            # and the integral values will be multiplied
-            # by 2*PI and since sin(n*2*PI) is zero where n is an integer)
-            d = math.sin(c) * 32767
-            e = int(d)
-            wavedata.append(e)
-
-        for i in range(remainder_frames):
-            wavedata.append(0)
-
-        number_of_bytes = str(len(wavedata))
-        wavedata = struct.pack(number_of_bytes + 'h', *wavedata)
-
-        return wavedata
+        parts = []
+        for note, beat in notes:
+            duration = self.beat(beat)
+            size = 2 * int(self.RATE * duration)
+            if note is None:
+                parts.append(bytes(size))
+                continue
+            freq = self.note(note) if isinstance(note, str) else note
+            # tones sound for half their duration, pad the rest with silence
+            parts.append(self.get_tone_data(freq, duration)[:size].ljust(size, b"\0"))
+        return b"".join(parts)
+
+    def _tone_stream(self):
+        # one PyAudio output stream, opened on the first tone
+        if self._stream is None:
+            import pyaudio
+            self._pyaudio = pyaudio.PyAudio()
+            self._stream = self._pyaudio.open(format=pyaudio.paInt16, channels=self.CHANNELS,
+                                              rate=self.RATE, output=True)
+        return self._stream
 
     def play_tone_for(self, freq, duration):
         """
@@ -317,13 +337,13 @@ class Music(_Basic_class):
         :param duration: duration in seconds
         :type duration: float
         """
+        self._tone_stream().write(self.get_tone_data(freq, duration))
+
+    def play_melody(self, data):
         """
-        Credit to: Aditya Shankar & Gringo Suave https://stackoverflow.com/a/53231212/14827323
+        Play a buffer from render_melody()
+
+        :param data: tone data
+        :type data: bytes
         """
-        p = pyaudio.PyAudio()
-        frames = self.get_tone_data(freq, duration)
-        stream = p.open(format=self.FORMAT, channels=self.CHANNELS,
-                        rate=self.RATE, output=True)
-        stream.write(frames)
-        # stream.stop_stream()
-        # stream.close()
+        self._tone_stream().write(data)
@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 from .basic import _Basic_class
+from .regcache import Register_Cache
+from .sim_device import current_hat
 # import gpiozero  # https://gpiozero.readthedocs.io/en/latest/installing.html
 # from gpiozero import OutputDevice, InputDevice, Button
 
@@ -94,6 +96,8 @@ class Pin(_Basic_class):
         # setup
         self._value = 0
         self.gpio = None
+        self._hat = current_hat()
+        self._cache = Register_Cache.for_device((self._hat.name, "gpio"))
         self.setup(mode, pull, active_state)
         self._info("Pin init finished.")
 
@@ -127,7 +131,8 @@ class Pin(_Basic_class):
             raise ValueError(
                 f'pull param error, should be None, Pin.PULL_NONE, Pin.PULL_DOWN, Pin.PULL_UP'
             )
-        #
+        # new mode, level is unknown
+        self._cache.invalidate(self._pin_num)
         return
         if self.gpio != None:
             if self.gpio.pin != None:
@@ -181,12 +186,19 @@ class Pin(_Basic_class):
         :return: pin value(0/1)
         :rtype: int
         """
-        return 0
+        if value == None:
+            return self._hat.read_gpio(self._pin_num)
+        value = 1 if bool(value) else 0
+        self._value = value
+        if self._cache.should_write(self._pin_num, value):
+            self._hat.write_gpio(self._pin_num, value)
+            self._cache.record(self._pin_num, value)
+        return value
         if value == None:
             if self._mode in [None, self.OUT]:
                 self.setup(self.IN)
             result = self.gpio.value
-            self._debug(f"read pin {self.gpio.pin}: {result}")
+            self._debug("read pin %s: %s", self.gpio.pin, result)
             return result
         else:
             if self._mode in [self.IN]:
@@ -1,8 +1,207 @@
 #!/usr/bin/env python3
+import functools
 import math
+import threading
 from .i2c import I2C
 
-timer = [{"arr": 1} for _ in range(7)]
+
+@functools.lru_cache(maxsize=128)
+def timer_config(clock, freq):
+    """
+    Find the prescaler and period closest to a frequency
+
+    :param clock: timer clock (Hz)
+    :type clock: float
+    :param freq: frequency (Hz)
+    :type freq: int
+    :return: (prescaler, period)
+    :rtype: tuple
+    """
+    # middle value for equal arr prescaler
+    st = int(math.sqrt(clock/freq))
+    # get -5 value as start
+    st -= 5
+    # prevent negetive value
+    if st <= 0:
+        st = 1
+    best = None
+    for psc in range(st, st+10):
+        arr = int(clock/freq/psc)
+        accuracy = abs(freq-clock/psc/arr)
+        if best is None or accuracy < best[0]:
+            best = (accuracy, psc, arr)
+    return best[1], best[2]
+
+
+class Timer_Manager(object):
+    """
+    Prescaler and period of the timers of one PWM device
+
+    Channels share timers (P0-P3 on timer 0, P4-P7 on timer 1, ...), so PWM
+    objects configure timers here instead of writing the registers directly.
+    Until a channel on a timer outputs its first pulse, settings are only
+    recorded; that first pulse writes prescaler and period once. After that,
+    changes are written as they are made.
+
+    The 50 Hz default of a new PWM only applies to a timer nobody has
+    configured, so constructing another channel does not undo an earlier
+    explicit setting. Explicit settings always apply, last one wins.
+    """
+
+    _managers = {}
+    _managers_lock = threading.Lock()
+
+    def __init__(self, count=7):
+        """
+        Initialize the timers as unconfigured
+
+        :param count: number of timers
+        :type count: int
+        """
+        self._timers = [{"psc": None, "arr": None, "freq": None, "explicit": False,
+                         "written": None, "channels": set()} for _ in range(count)]
+        self.pending = [False] * count
+        """Per timer: a pulse on it must first write the timer registers"""
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_device(cls, key):
+        """
+        Get the shared timer manager for a device, creating it on first use
+
+        :param key: device key, e.g. (hat, bus, address)
+        :type key: hashable
+        :return: timer manager
+        :rtype: Timer_Manager
+        """
+        with cls._managers_lock:
+            manager = cls._managers.get(key)
+            if manager is None:
+                manager = cls()
+                cls._managers[key] = manager
+            return manager
+
+    @classmethod
+    def invalidate_all(cls, hat=None):
+        """
+        Forget what was written to the timers, e.g. after resetting the MCU
+
+        :param hat: name of the HAT whose timers to invalidate, None for all
+        :type hat: str
+        """
+        with cls._managers_lock:
+            managers = [manager for key, manager in cls._managers.items()
+                        if hat is None or key[0] == hat]
+        for manager in managers:
+            manager.invalidate()
+
+    @classmethod
+    def forget(cls, hat):
+        """
+        Drop the timer managers of a HAT that is gone
+
+        :param hat: HAT name
+        :type hat: str
+        """
+        with cls._managers_lock:
+            for key in [key for key in cls._managers if key[0] == hat]:
+                del cls._managers[key]
+
+    def invalidate(self, index=None):
+        """
+        Rewrite the timer registers before the next pulse
+
+        :param index: timer index, None for all timers
+        :type index: int
+        """
+        with self._lock:
+            for i, timer in enumerate(self._timers):
+                if index is not None and i != index:
+                    continue
+                timer["written"] = None
+                self.pending[i] = timer["psc"] is not None or timer["arr"] is not None
+
+    def attach(self, index, channel):
+        """
+        Record that a channel runs on a timer
+
+        :param index: timer index
+        :type index: int
+        :param channel: channel number
+        :type channel: int
+        """
+        with self._lock:
+            self._timers[index]["channels"].add(channel)
+
+    def get(self, index):
+        """
+        Get the settings of a timer
+
+        :param index: timer index
+        :type index: int
+        :return: (prescaler, period, frequency), None where unset
+        :rtype: tuple
+        """
+        with self._lock:
+            timer = self._timers[index]
+            return timer["psc"], timer["arr"], timer["freq"]
+
+    def configure(self, index, channel, psc=None, arr=None, freq=None, default=False):
+        """
+        Change the settings of a timer
+
+        :param index: timer index
+        :type index: int
+        :param channel: channel making the change
+        :type channel: int
+        :param psc: prescaler, None to keep
+        :type psc: int
+        :param arr: period, None to keep
+        :type arr: int
+        :param freq: frequency the settings were chosen for, None to derive it
+        :type freq: float
+        :param default: only apply if the timer has no explicit settings
+        :type default: bool
+        :return: (applied, live, other channels on the timer); live means the
+                 timer already runs and the change should be written now
+        :rtype: tuple
+        """
+        with self._lock:
+            timer = self._timers[index]
+            others = sorted(timer["channels"] - {channel})
+            if default and timer["explicit"]:
+                return False, False, others
+            if psc is not None:
+                timer["psc"] = psc
+            if arr is not None:
+                timer["arr"] = arr
+            if freq is None and timer["psc"] and timer["arr"]:
+                freq = PWM.CLOCK/timer["psc"]/timer["arr"]
+            timer["freq"] = freq
+            timer["explicit"] = timer["explicit"] or not default
+            live = timer["written"] is not None
+            self.pending[index] = (timer["psc"], timer["arr"]) != timer["written"]
+            return True, live, others
+
+    def commit(self, index):
+        """
+        Take the settings of a timer that still have to be written
+
+        :param index: timer index
+        :type index: int
+        :return: (prescaler, period) to write, either may be None; None if
+                 nothing is pending
+        :rtype: tuple
+        """
+        with self._lock:
+            if not self.pending[index]:
+                return None
+            timer = self._timers[index]
+            written = timer["written"] or (None, None)
+            self.pending[index] = False
+            timer["written"] = (timer["psc"], timer["arr"])
+            return (timer["psc"] if timer["psc"] != written[0] else None,
+                    timer["arr"] if timer["arr"] != written[1] else None)
 
 
 class PWM(I2C):
@@ -56,19 +255,63 @@ class PWM(I2C):
             self.timer_index = 5
         elif channel == 19:
             self.timer_index = 6
+        # timers are shared by the channels on this device
+        self._timers = Timer_Manager.for_device((self._hat.name, self._bus, self.address))
+        self._timers.attach(self.timer_index, channel)
 
         self._pulse_width = 0
-        self._freq = 50
-        self.freq(50)
+        self._configure(*timer_config(self.CLOCK, 50), freq=50, default=True)
 
         # print(f'PWM channel {channel} initialized')
         # print(f'PWM timer_index {self.timer_index}')
 
 
     def _i2c_write(self, reg, value):
-        value_h = value >> 8
-        value_l = value & 0xff
-        self.write([reg, value_h, value_l])
+        # Skip writes whose value is already in the register. The bus is held
+        # from the check to the write so another thread cannot slip a write
+        # in between; the value is only cached once the write went through
+        with self.hold_bus():
+            cache = self.register_cache
+            if not cache.should_write(reg, value):
+                return True
+            value_h = value >> 8
+            value_l = value & 0xff
+            if self.write([reg, value_h, value_l]):
+                cache.record(reg, value)
+                return True
+            # the register may hold anything now, issue the next write
+            cache.invalidate(reg)
+            return False
+
+    def _configure(self, psc=None, arr=None, freq=None, default=False):
+        applied, live, others = self._timers.configure(
+            self.timer_index, self.channel, psc, arr, freq, default)
+        if applied and others:
+            self._debug("Timer %d also drives channels %s", self.timer_index, others)
+        if live:
+            self._write_timer()
+
+    def _write_timer(self):
+        # prescaler and period of this channel's timer, if they changed
+        with self.hold_bus():
+            config = self._timers.commit(self.timer_index)
+            if config is None:
+                return
+            psc, arr = config
+            if self.timer_index < 4:
+                psc_reg = self.REG_PSC + self.timer_index
+                arr_reg = self.REG_ARR + self.timer_index
+            else:
+                psc_reg = self.REG_PSC2 + self.timer_index - 4
+                arr_reg = self.REG_ARR2 + self.timer_index - 4
+            ok = True
+            if psc is not None:
+                ok = self._i2c_write(psc_reg, psc-1)
+            if arr is not None:
+                ok = self._i2c_write(arr_reg, arr) and ok
+            if not ok:
+                # try again on the next pulse
+                self._timers.invalidate(self.timer_index)
 
     def freq(self, freq=None):
         """
@@ -80,30 +323,12 @@ class PWM(I2C):
         :rtype: float
         """
         if freq == None:
-            return self._freq
-
-        self._freq = int(freq)
-        # [prescaler,arr] list
-        result_ap = []
-        # accuracy list
-        result_acy = []
-        # middle value for equal arr prescaler
-        st = int(math.sqrt(self.CLOCK/self._freq))
-        # get -5 value as start
-        st -= 5
-        # prevent negetive value
-        if st <= 0:
-            st = 1
-        for psc in range(st, st+10):
-            arr = int(self.CLOCK/self._freq/psc)
-            result_ap.append([psc, arr])
-            result_acy.append(abs(self._freq-self.CLOCK/psc/arr))
-        i = result_acy.index(min(result_acy))
-        psc = result_ap[i][0]
-        arr = result_ap[i][1]
-        self._debug(f"prescaler: {psc}, period: {arr}")
-        self.prescaler(psc)
-        self.period(arr)
+            return self._timers.get(self.timer_index)[2]
+
+        freq = int(freq)
+        psc, arr = timer_config(self.CLOCK, freq)
+        self._debug("prescaler: %s, period: %s", psc, arr)
+        self._configure(psc, arr, freq=freq)
 
     def prescaler(self, prescaler=None):
         """
@@ -115,16 +340,11 @@ class PWM(I2C):
         :rtype: int
         """
         if prescaler == None:
-            return self._prescaler
+            return self._timers.get(self.timer_index)[0]
 
-        self._prescaler = round(prescaler)
-        self._freq = self.CLOCK/self._prescaler/timer[self.timer_index]["arr"]
-        if self.timer_index < 4:
-            reg = self.REG_PSC + self.timer_index
-        else:
-            reg = self.REG_PSC2 + self.timer_index - 4
-        self._debug(f"Set prescaler to: {self._prescaler}")
-        self._i2c_write(reg, self._prescaler-1)
+        prescaler = round(prescaler)
+        self._debug("Set prescaler to: %s", prescaler)
+        self._configure(psc=prescaler)
 
     def period(self, arr=None):
         """
@@ -135,25 +355,19 @@ class PWM(I2C):
         :return: period
         :rtype: int
         """
-        global timer
         if arr == None:
-            return timer[self.timer_index]["arr"]
+            return self._timers.get(self.timer_index)[1]
 
-        timer[self.timer_index]["arr"] = round(arr)
-        self._freq = self.CLOCK/self._prescaler/timer[self.timer_index]["arr"]
-
-        if self.timer_index < 4:
-            reg = self.REG_ARR + self.timer_index
-        else:
-            reg = self.REG_ARR2 + self.timer_index - 4
-
-        self._debug(f"Set arr to: {timer[self.timer_index]['arr']}")
-        self._i2c_write(reg, timer[self.timer_index]["arr"])
+        arr = round(arr)
+        self._debug("Set arr to: %s", arr)
+        self._configure(arr=arr)
 
     def pulse_width(self, pulse_width=None):
         """
         Set/get pulse width, leave blank to get pulse width
 
+        The first pulse on a timer also writes its prescaler and period.
+
         :param pulse_width: pulse width(0-65535)
         :type pulse_width: float
         :return: pulse width
@@ -164,6 +378,8 @@ class PWM(I2C):
 
         self._pulse_width = int(pulse_width)
         reg = self.REG_CHN + self.channel
+        if self._timers.pending[self.timer_index]:
+            self._write_timer()
         self._i2c_write(reg, self._pulse_width)
 
     def pulse_width_percent(self, pulse_width_percent=None):
@@ -175,13 +391,12 @@ class PWM(I2C):
         :return: pulse width percentage
         :rtype: float
         """
-        global timer
         if pulse_width_percent == None:
             return self._pulse_width_percent
 
         self._pulse_width_percent = pulse_width_percent
         temp = self._pulse_width_percent / 100.0
-        pulse_width = temp * timer[self.timer_index]["arr"]
+        pulse_width = temp * self.period()
         self.pulse_width(pulse_width)
 
 
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+import threading
+
+
+class Register_Cache(object):
+    """
+    Write-through shadow of a device's registers
+
+    Holds the last value written to each register so writes of an unchanged
+    value can be skipped. One cache exists per device key, a tuple starting
+    with the HAT name, e.g. (hat, bus, address) for the MCU or (hat, "gpio")
+    for Raspberry Pi pins.
+    """
+
+    _caches = {}
+    _caches_lock = threading.Lock()
+
+    def __init__(self, name=None):
+        """
+        Initialize an empty register cache
+
+        :param name: name used in stats
+        :type name: str
+        """
+        self.name = name
+        self.enabled = True
+        self.issued = 0
+        self.elided = 0
+        self._shadow = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_device(cls, key):
+        """
+        Get the shared cache for a device, creating it on first use
+
+        :param key: device key, e.g. (hat, bus, address)
+        :type key: hashable
+        :return: register cache
+        :rtype: Register_Cache
+        """
+        with cls._caches_lock:
+            cache = cls._caches.get(key)
+            if cache is None:
+                cache = cls(name=str(key))
+                cls._caches[key] = cache
+            return cache
+
+    @classmethod
+    def invalidate_all(cls, hat=None):
+        """
+        Invalidate device caches, e.g. after resetting the MCU
+
+        :param hat: name of the HAT whose caches to invalidate, None for all
+        :type hat: str
+        """
+        with cls._caches_lock:
+            caches = [cache for key, cache in cls._caches.items()
+                      if hat is None or key[0] == hat]
+        for cache in caches:
+            cache.invalidate()
+
+    @classmethod
+    def forget(cls, hat):
+        """
+        Drop the caches of a HAT that is gone
+
+        :param hat: HAT name
+        :type hat: str
+        """
+        with cls._caches_lock:
+            for key in [key for key in cls._caches if key[0] == hat]:
+                del cls._caches[key]
+
+    @classmethod
+    def all_stats(cls):
+        """
+        Get stats of all device caches
+
+        :return: {key: stats}
+        :rtype: dict
+        """
+        with cls._caches_lock:
+            return {key: cache.stats() for key, cache in cls._caches.items()}
+
+    def should_write(self, reg, value):
+        """
+        Check a write against the shadow
+
+        The shadow is not changed; call record() once the write went through.
+
+        :param reg: register
+        :type reg: int
+        :param value: value to write
+        :type value: int
+        :return: True if the write must be issued, False if it can be elided
+        :rtype: bool
+        """
+        with self._lock:
+            if self.enabled and self._shadow.get(reg) == value:
+                self.elided += 1
+                return False
+            return True
+
+    def record(self, reg, value):
+        """
+        Record a value that was written to a register
+
+        :param reg: register
+        :type reg: int
+        :param value: value written
+        :type value: int
+        """
+        with self._lock:
+            self._shadow[reg] = value
+            self.issued += 1
+
+    def invalidate(self, reg=None):
+        """
+        Forget shadowed values so the next write is always issued
+
+        :param reg: register to invalidate, None for all
+        :type reg: int
+        """
+        with self._lock:
+            if reg is None:
+                self._shadow.clear()
+            else:
+                self._shadow.pop(reg, None)
+
+    def reset_stats(self):
+        """Reset issued/elided counters"""
+        with self._lock:
+            self.issued = 0
+            self.elided = 0
+
+    def stats(self):
+        """
+        Get issued/elided write counters
+
+        :return: {"issued": int, "elided": int}
+        :rtype: dict
+        """
+        with self._lock:
+            return {"issued": self.issued, "elided": self.elided}
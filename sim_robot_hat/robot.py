@@ -4,13 +4,28 @@ from .pwm import PWM
 from .servo import Servo
 import time
 from .filedb import fileDB
-import os
+from .utils import get_username, get_user_home
 
-# user and User home directory
-User = os.popen('echo ${SUDO_USER:-$LOGNAME}').readline().strip()
-UserHome = os.popen('getent passwd %s | cut -d: -f 6' %
-                    User).readline().strip()
-config_file = '%s/.config/robot-hat/robot-hat.conf' % UserHome
+
+def default_config_file():
+    """
+    Get the default config file, in the invoking user's home directory
+
+    :return: config file path
+    :rtype: str
+    """
+    return '%s/.config/robot-hat/robot-hat.conf' % get_user_home()
+
+
+def __getattr__(name):
+    # user and User home directory, looked up on first use instead of at import
+    if name == 'User':
+        return get_username()
+    if name == 'UserHome':
+        return get_user_home()
+    if name == 'config_file':
+        return default_config_file()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class Robot(_Basic_class):
@@ -36,13 +51,16 @@ class Robot(_Basic_class):
     # max_dps = 500
     """Servo max Degree Per Second"""
 
-    def __init__(self, pin_list, db=config_file, name=None, init_angles=None, init_order=None, **kwargs):
+    STEP_TIME = 0.01
+    """Seconds between servo_move() frames"""
+
+    def __init__(self, pin_list, db=None, name=None, init_angles=None, init_order=None, **kwargs):
         """
         Initialize the robot class
 
         :param pin_list: list of pin number[0-11]
         :type pin_list: list
-        :param db: config file path
+        :param db: config file path, defaults to default_config_file()
         :type db: str
         :param name: robot name
         :type name: str
@@ -63,7 +81,9 @@ class Robot(_Basic_class):
 
         self.offset_value_name = f"{self.name}_servo_offset_list"
         # offset
-        self.db = fileDB(db=db, mode='774', owner=User)
+        if db is None:
+            db = default_config_file()
+        self.db = fileDB(db=db, mode='774', owner=get_username())
         temp = self.db.get(self.offset_value_name,
                            default_value=str(self.new_list(0)))
         temp = [float(i.strip()) for i in temp.strip("[]").split(",")]
@@ -92,6 +112,7 @@ class Robot(_Basic_class):
             time.sleep(0.15)
 
         self.last_move_time = time.time()
+        self._motion = None
 
     def new_list(self, default_value):
         """
@@ -128,94 +149,65 @@ class Robot(_Basic_class):
                 self.direction[i] * (self.origin_positions[i] + angles[i] + self.offset[i]))
         self.servo_write_raw(rel_angles)
 
-    def servo_move(self, targets, speed=50, bpm=None):
+    @property
+    def motion(self):
+        """Motion engine playing servo_move() on this robot's servos"""
+        if self._motion is None:
+            from .motion import Motion_Engine
+            self._motion = Motion_Engine(self.servo_list, step_time=self.STEP_TIME)
+        return self._motion
+
+    def _servo_angles(self, angles):
+        # planned angles to servo angles, as servo_write_all() does
+        import numpy as np
+        return np.asarray(self.direction) * (np.asarray(self.origin_positions) + angles + np.asarray(self.offset))
+
+    def servo_move(self, targets, speed=50, bpm=None, profile="linear"):
         """
         Move servo to specific angles with speed or bpm
 
+        The whole move is planned up front and played by the motion engine
+        on absolute deadlines.
+
         :param targets: list of servo angles
         :type targets: list
         :param speed: speed of servo move
         :type speed: int or float
         :param bpm: beats per minute
         :type bpm: int or float
+        :param profile: "linear" or "min_jerk"
+        :type profile: str
+        :return: timing report of the move, see Motion_Engine.play()
+        :rtype: dict
         """
-        '''
-            calculate the max delta angle, multiply by 2 to define a max_step
-            loop max_step times, every servo add/minus 1 when step reaches its adder_flag
-        '''
         speed = max(0, speed)
         speed = min(100, speed)
-        step_time = 10  # ms 
-        delta = []
-        absdelta = []
-        max_step = 0
-        steps = []
-        # print(f"targets: {targets}")
-        # print(f"current:{self.servo_positions}")
-        # st = time.time()
-        # if self.name == "legs":
-        #     print(f"move_interval: {time.time() - self.last_move_time}")
-        #     self.last_move_time = time.time()
-
-        for i in range(self.pin_num):
-            value = targets[i] - self.servo_positions[i]
-            delta.append(value)
-            absdelta.append(abs(value))
 
         # Calculate max delta angle
-        max_delta = int(max(absdelta))
+        max_delta = int(max(abs(targets[i] - self.servo_positions[i]) for i in range(self.pin_num)))
         if max_delta == 0:
-            time.sleep(step_time/1000)
-            return
+            time.sleep(self.STEP_TIME)
+            return None
 
         # Calculate total servo move time
         if bpm: # bpm: beats per minute
             total_time = 60 / bpm * 1000 # time taken per beat, unit: ms
         else:
             total_time = -9.9 * speed + 1000 # time spent in one step, unit: ms
-        # print(f"Total time: {total_time} ms")
 
         # Calculate max dps
         current_max_dps = max_delta / total_time * 1000 # dps, degrees per second
 
         # If current max dps is larger than max dps, then calculate a new total servo move time
         if current_max_dps > self.max_dps:
-            # print(
-            #     f"Current Max DPS {current_max_dps} is too high. Max DPS is {self.max_dps}")
-            # print(f"Total time: {total_time} ms")
-            # print(f"Max Delta: {max_delta}")
             total_time = max_delta / self.max_dps * 1000
-            # print(f"New Total time: {total_time} ms")
-        # calculate max step
-        max_step = int(total_time / step_time)
-
-        # Calculate all step-angles for each servo
-        for i in range(self.pin_num):
-            step = float(delta[i])/max_step
-            steps.append(step)
-
-        # print(f"usage1: {time.time() - st}")
-        # st = time.time()
-
-        # print(f"max_delta: {max_delta}, max_step: {max_step}")
-        for _ in range(max_step):
-            start_timer = time.time()
-            delay = step_time/1000
-
-            for j in range(self.pin_num):
-                self.servo_positions[j] += steps[j]
-            self.servo_write_all(self.servo_positions)
 
-            servo_move_time = time.time() - start_timer
-            # print(f"Servo move: {servo_move_time}")
-            delay = delay - servo_move_time
-            delay = max(0, delay)
-            time.sleep(delay)
-            # _dealy_start = time.time()
-            # if delay > 0:
-            #     while (time.time() - _dealy_start < delay):
-            #         pass
-        # print(f"usage2: {time.time() - st}, max_steps: {max_step}")
+        angles, report = self.motion.move(self.servo_positions, targets[:self.pin_num], total_time / 1000,
+                                          profile, transform=self._servo_angles)
+        self.servo_positions = angles[-1].tolist()
+        self._debug("servo_move: requested %.3f s, achieved %.3f s, %d frames dropped",
+                    report["requested_s"], report["achieved_s"], report["dropped"])
+        return report
 
     def do_action(self, motion_name, step=1, speed=50):
         """
@@ -36,9 +36,9 @@ class Servo(PWM):
             angle = -90
         if angle > 90:
             angle = 90
-        self._debug(f"Set angle to: {angle}")
+        self._debug("Set angle to: %s", angle)
         pulse_width_time = mapping(angle, -90, 90, self.MIN_PW, self.MAX_PW)
-        self._debug(f"Pulse width: {pulse_width_time}")
+        self._debug("Pulse width: %s", pulse_width_time)
         self.pulse_width_time(pulse_width_time)
 
     def pulse_width_time(self, pulse_width_time):
@@ -54,7 +54,7 @@ class Servo(PWM):
             pulse_width_time = self.MIN_PW
 
         pwr = pulse_width_time / 20000
-        self._debug(f"pulse width rate: {pwr}")
+        self._debug("pulse width rate: %s", pwr)
         value = int(pwr * self.PERIOD)
-        self._debug(f"pulse width value: {value}")
+        self._debug("pulse width value: %s", value)
         self.pulse_width(value)
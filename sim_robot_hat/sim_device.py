@@ -0,0 +1,531 @@
+#!/usr/bin/env python3
+"""
+Register-level model of the Robot HAT MCU
+
+Stands in for the hardware behind the I2C, ADC, PWM and Pin classes, so the
+library's real read/write paths run off the robot. Time comes from an
+injectable clock; with a Virtual_Clock, sleeps return immediately and
+advance simulated time.
+"""
+import errno
+import itertools
+import sys
+import threading
+import time
+import weakref
+from collections import deque, namedtuple
+
+Transaction = namedtuple("Transaction", ["time", "op", "address", "reg", "value"])
+"""One bus transaction seen by the HAT"""
+
+
+class Virtual_Clock(object):
+    """
+    Simulated monotonic clock
+
+    sleep() advances simulated time instead of blocking, so code driven by
+    this clock runs faster than real time. Any object with monotonic() and
+    sleep(), such as the time module, can be used as a clock.
+    """
+
+    def __init__(self, start=0.0):
+        """
+        Initialize the clock
+
+        :param start: initial time in seconds
+        :type start: float
+        """
+        self._now = float(start)
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def monotonic(self):
+        """
+        Get the current simulated time
+
+        :return: time in seconds
+        :rtype: float
+        """
+        return self._now
+
+    def sleep(self, seconds):
+        """
+        Advance simulated time instead of blocking
+
+        :param seconds: time to sleep in seconds
+        :type seconds: float
+        """
+        self.advance(seconds)
+
+    def advance(self, seconds):
+        """
+        Advance simulated time and notify listeners
+
+        :param seconds: time step in seconds
+        :type seconds: float
+        """
+        if seconds <= 0:
+            return
+        with self._lock:
+            self._now += seconds
+            now = self._now
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(now, seconds)
+
+    def add_listener(self, listener):
+        """
+        Call listener(now, dt) each time the clock advances
+
+        :param listener: callback
+        :type listener: function
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """
+        Stop notifying a listener
+
+        :param listener: callback
+        :type listener: function
+        """
+        with self._lock:
+            self._listeners.remove(listener)
+
+
+def _forget_hat(name):
+    # Drop a HAT's entries from the class-level registries of the device
+    # modules; modules that were never imported hold none
+    package = __name__.rpartition(".")[0]
+    regcache = sys.modules.get(package + ".regcache")
+    if regcache is not None:
+        regcache.Register_Cache.forget(name)
+    pwm = sys.modules.get(package + ".pwm")
+    if pwm is not None:
+        pwm.Timer_Manager.forget(name)
+    i2c = sys.modules.get(package + ".i2c")
+    if i2c is not None:
+        i2c.I2C.clear_scan_cache(name)
+
+
+class Sim_HAT(object):
+    """
+    Simulated Robot HAT MCU
+
+    Models the MCU registers the library talks to:
+
+    - 0x20 + ch: PWM channel pulse width (P0-P19)
+    - 0x40-0x43 / 0x50-0x52: timer prescaler - 1 (timers 0-3 / 4-6)
+    - 0x44-0x47 / 0x54-0x56: timer period (timers 0-3 / 4-6)
+    - 0x10 + (7 - ch): ADC channel select, the conversion is read back as
+      two bytes (MSB, LSB)
+    - 0x05: firmware version, 3 bytes
+
+    Raspberry Pi GPIO levels are kept in the gpio dict, pulling MCURST low
+    resets the registers. Every transaction is recorded in traffic.
+
+    Devices bind to the current HAT when they are created; use the HAT as a
+    context manager to build a robot against a specific instance::
+
+        with Sim_HAT(clock=Virtual_Clock()) as hat:
+            px = Picarx()
+    """
+
+    ADDRESSES = (0x14,)
+    """I2C addresses the MCU answers on"""
+    REG_ADC = 0x10
+    REG_FIRMWARE = 0x05
+    REG_CHN = 0x20
+    REG_PSC = 0x40
+    REG_ARR = 0x44
+    REG_PSC2 = 0x50
+    REG_ARR2 = 0x54
+
+    CHANNELS = 20
+    TIMERS = 7
+    ADC_CHANNELS = 8
+    ADC_MAX = 4095
+    CLOCK = 72000000.0
+
+    MCURST = 5
+    """BCM pin wired to the MCU reset line"""
+
+    _names = itertools.count()
+
+    ADC_DEFAULT = 868
+    """Power-on reading of the analog channels"""
+    BATTERY_DEFAULT = 2606
+    """A4 reading of a ~6.3 V battery through the 1/3 divider"""
+
+    def __init__(self, clock=None, addresses=ADDRESSES, firmware=(1, 0, 0), traffic_size=10000, name=None):
+        """
+        Initialize the simulated HAT
+
+        :param clock: clock with monotonic() and sleep(), defaults to the time module
+        :type clock: object
+        :param addresses: I2C addresses to answer on
+        :type addresses: tuple
+        :param firmware: firmware version (major, minor, patch)
+        :type firmware: tuple
+        :param traffic_size: number of transactions kept in traffic
+        :type traffic_size: int
+        :param name: name used to key per-HAT state such as register caches
+        :type name: str
+        """
+        self.name = name if name is not None else f"hat{next(self._names)}"
+        self.clock = clock if clock is not None else time
+        self.addresses = tuple(addresses)
+        self.firmware = tuple(firmware)
+        self.traffic = deque(maxlen=traffic_size)
+        self.adc_inputs = {}
+        self.gpio_inputs = {}
+        self.gpio = {}
+        self._lock = threading.RLock()
+        self._previous = []
+        self.reset()
+        # per-HAT state kept by the device classes goes with the HAT
+        self._finalizer = weakref.finalize(self, _forget_hat, self.name)
+        self._finalizer.atexit = False
+
+    # --------- current HAT ---------
+    def __enter__(self):
+        global _current
+        with _current_lock:
+            self._previous.append(_current)
+            _current = self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        global _current
+        with _current_lock:
+            _current = self._previous.pop()
+
+    def close(self):
+        """
+        Drop the register caches, timer state and bus scans kept for this HAT
+
+        Done automatically when the HAT is garbage collected; devices created
+        on the HAT should not be used afterwards.
+        """
+        self._finalizer()
+
+    # --------- state ---------
+    def reset(self):
+        """Put every register back to its power-on value"""
+        with self._lock:
+            self.pulse_width = [0] * self.CHANNELS
+            self.prescaler = [0] * self.TIMERS
+            self.period = [0] * self.TIMERS
+            self._adc_channel = None
+            self._read_buffer = deque()
+            self.resets = getattr(self, "resets", -1) + 1
+
+    def set_adc(self, channel, value):
+        """
+        Set the input of an analog channel
+
+        :param channel: channel number (0-7)
+        :type channel: int
+        :param value: raw reading (0-4095) or function of time returning one
+        :type value: int/function
+        """
+        self.adc_inputs[channel] = value
+
+    def adc_value(self, channel):
+        """
+        Get the current conversion result of an analog channel
+
+        :param channel: channel number (0-7)
+        :type channel: int
+        :return: raw reading (0-4095)
+        :rtype: int
+        """
+        source = self.adc_inputs.get(channel)
+        if source is None:
+            value = self.BATTERY_DEFAULT if channel == 4 else self.ADC_DEFAULT
+        elif callable(source):
+            value = source(self.clock.monotonic())
+        else:
+            value = source
+        return max(0, min(self.ADC_MAX, int(value)))
+
+    def timer_index(self, channel):
+        """
+        Get the timer driving a PWM channel
+
+        :param channel: channel number (0-19)
+        :type channel: int
+        :return: timer index (0-6)
+        :rtype: int
+        """
+        if channel < 16:
+            return channel // 4
+        if channel < 18:
+            return 4
+        return channel - 13
+
+    def duty_cycle(self, channel):
+        """
+        Get the output duty cycle of a PWM channel
+
+        :param channel: channel number (0-19)
+        :type channel: int
+        :return: duty cycle (0-1)
+        :rtype: float
+        """
+        arr = self.period[self.timer_index(channel)]
+        if arr <= 0:
+            return 0.0
+        return min(1.0, self.pulse_width[channel] / arr)
+
+    def frequency(self, channel):
+        """
+        Get the output frequency of a PWM channel
+
+        :param channel: channel number (0-19)
+        :type channel: int
+        :return: frequency (Hz), 0 if the timer is not configured
+        :rtype: float
+        """
+        timer = self.timer_index(channel)
+        psc = self.prescaler[timer] + 1
+        arr = self.period[timer]
+        if arr <= 0:
+            return 0.0
+        return self.CLOCK / psc / arr
+
+    def pulse_width_us(self, channel):
+        """
+        Get the high time of a PWM channel
+
+        :param channel: channel number (0-19)
+        :type channel: int
+        :return: pulse width (us)
+        :rtype: float
+        """
+        freq = self.frequency(channel)
+        if freq <= 0:
+            return 0.0
+        return self.duty_cycle(channel) * 1000000.0 / freq
+
+    # --------- gpio ---------
+    def write_gpio(self, pin, value):
+        """
+        Drive a Raspberry Pi GPIO
+
+        :param pin: BCM pin number
+        :type pin: int
+        :param value: level (0/1)
+        :type value: int
+        """
+        with self._lock:
+            previous = self.gpio.get(pin)
+            self.gpio[pin] = value
+            self._log("gpio", None, pin, value)
+            if pin == self.MCURST and value == 0 and previous != 0:
+                self.reset()
+
+    def read_gpio(self, pin):
+        """
+        Read a Raspberry Pi GPIO
+
+        Levels set in gpio_inputs (value or function of time) take priority
+        over the last level driven on the pin.
+
+        :param pin: BCM pin number
+        :type pin: int
+        :return: level (0/1)
+        :rtype: int
+        """
+        source = self.gpio_inputs.get(pin)
+        if source is None:
+            return self.gpio.get(pin, 0)
+        if callable(source):
+            source = source(self.clock.monotonic())
+        return 1 if source else 0
+
+    # --------- traffic ---------
+    def _log(self, op, address, reg, value):
+        self.traffic.append(Transaction(self.clock.monotonic(), op, address, reg, value))
+
+    def writes(self, reg=None):
+        """
+        Get the recorded register writes
+
+        :param reg: only writes to this register, None for all
+        :type reg: int
+        :return: transactions
+        :rtype: list
+        """
+        return [t for t in list(self.traffic)
+                if t.op == "write" and (reg is None or t.reg == reg)]
+
+    def clear_traffic(self):
+        """Forget the recorded transactions"""
+        self.traffic.clear()
+
+    # --------- bus side ---------
+    def write_register(self, address, reg, value):
+        """
+        Handle a 16-bit register write from the bus
+
+        :param address: I2C address
+        :type address: int
+        :param reg: register
+        :type reg: int
+        :param value: value, MSB first on the wire
+        :type value: int
+        """
+        with self._lock:
+            self._log("write", address, reg, value)
+            if self.REG_CHN <= reg < self.REG_CHN + self.CHANNELS:
+                self.pulse_width[reg - self.REG_CHN] = value
+            elif self.REG_PSC <= reg < self.REG_PSC + 4:
+                self.prescaler[reg - self.REG_PSC] = value
+            elif self.REG_ARR <= reg < self.REG_ARR + 4:
+                self.period[reg - self.REG_ARR] = value
+            elif self.REG_PSC2 <= reg < self.REG_PSC2 + 3:
+                self.prescaler[reg - self.REG_PSC2 + 4] = value
+            elif self.REG_ARR2 <= reg < self.REG_ARR2 + 3:
+                self.period[reg - self.REG_ARR2 + 4] = value
+            elif self.REG_ADC <= reg < self.REG_ADC + self.ADC_CHANNELS:
+                # conversion is returned on the next two byte reads
+                self._adc_channel = 7 - (reg - self.REG_ADC)
+                result = self.adc_value(self._adc_channel)
+                self._read_buffer = deque([result >> 8, result & 0xFF])
+
+    def read_byte(self, address):
+        """
+        Handle a single byte read from the bus
+
+        :param address: I2C address
+        :type address: int
+        :return: byte
+        :rtype: int
+        """
+        with self._lock:
+            value = self._read_buffer.popleft() if self._read_buffer else 0
+            self._log("read", address, None, value)
+            return value
+
+    def read_block(self, address, reg, length):
+        """
+        Handle a block read from the bus
+
+        :param address: I2C address
+        :type address: int
+        :param reg: register
+        :type reg: int
+        :param length: number of bytes
+        :type length: int
+        :return: bytes
+        :rtype: list
+        """
+        with self._lock:
+            if reg == self.REG_FIRMWARE:
+                data = list(self.firmware)
+            else:
+                data = []
+            data = (data + [0] * length)[:length]
+            self._log("read", address, reg, data)
+            return data
+
+
+class Sim_SMBus(object):
+    """
+    smbus2.SMBus look-alike that routes transactions to a Sim_HAT
+
+    Addresses the HAT does not answer on fail with OSError, like a NACK on
+    the real bus.
+    """
+
+    def __init__(self, bus=1, hat=None):
+        """
+        Open the simulated bus
+
+        :param bus: bus number
+        :type bus: int
+        :param hat: HAT on the bus, defaults to the current HAT
+        :type hat: Sim_HAT
+        """
+        self.bus = bus
+        self.hat = hat if hat is not None else current_hat()
+
+    def _check(self, address):
+        if address not in self.hat.addresses:
+            raise OSError(errno.EREMOTEIO, "Remote I/O error")
+
+    def write_quick(self, address):
+        self._check(address)
+        self.hat._log("write", address, None, None)
+
+    def write_byte(self, address, value):
+        self._check(address)
+        self.hat._log("write", address, None, value)
+
+    def write_byte_data(self, address, reg, value):
+        self._check(address)
+        self.hat.write_register(address, reg, value)
+
+    def write_word_data(self, address, reg, value):
+        self._check(address)
+        # SMBus sends the low byte first, the MCU takes the first byte as MSB
+        self.hat.write_register(address, reg, ((value & 0xFF) << 8) | (value >> 8))
+
+    def write_i2c_block_data(self, address, reg, data):
+        self._check(address)
+        value = 0
+        for byte in data:
+            value = (value << 8) | byte
+        self.hat.write_register(address, reg, value)
+
+    def read_byte(self, address):
+        self._check(address)
+        return self.hat.read_byte(address)
+
+    def read_byte_data(self, address, reg):
+        self._check(address)
+        return self.hat.read_block(address, reg, 1)[0]
+
+    def read_word_data(self, address, reg):
+        self._check(address)
+        low, high = self.hat.read_block(address, reg, 2)
+        return (high << 8) | low
+
+    def read_i2c_block_data(self, address, reg, length):
+        self._check(address)
+        return self.hat.read_block(address, reg, length)
+
+    def close(self):
+        pass
+
+
+_current = None
+_current_lock = threading.Lock()
+
+
+def current_hat():
+    """
+    Get the HAT new devices bind to, creating a default one on first use
+
+    :return: current HAT
+    :rtype: Sim_HAT
+    """
+    global _current
+    with _current_lock:
+        if _current is None:
+            _current = Sim_HAT()
+        return _current
+
+
+def set_current_hat(hat):
+    """
+    Make hat the default HAT for new devices
+
+    :param hat: HAT
+    :type hat: Sim_HAT
+    """
+    global _current
+    with _current_lock:
+        _current = hat
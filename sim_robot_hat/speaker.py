@@ -6,9 +6,55 @@ import librosa
 import numpy as np
 import threading
 import time
+from collections import OrderedDict
 from uuid import uuid4  # 用于生成唯一播放ID
 
+class _Decoded_Cache:
+    """解码后音频的LRU缓存，按总字节数限制大小"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()  # 格式: {(路径, mtime, 大小): (data, samplerate)}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+            return item
+
+    def put(self, key, data, samplerate):
+        if data.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= old[0].nbytes
+            self._items[key] = (data, samplerate)
+            self.size += data.nbytes
+            # 淘汰最久未使用的
+            while self.size > self.max_bytes:
+                _, (old_data, _) = self._items.popitem(last=False)
+                self.size -= old_data.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+
 class Speaker:
+    CHUNK_SIZE = 1024
+    """每次写入音频流的帧数"""
+    CACHE_BYTES = 64 * 1024 * 1024
+    """解码缓存上限（字节）"""
+    STREAM_SECONDS = 30
+    """超过此时长的soundfile格式文件边解码边播放，不进缓存"""
+
+    _cache = _Decoded_Cache(CACHE_BYTES)
+
     def __init__(self):
         # 初始化喇叭状态
         self.speaker_enabled = False
@@ -18,7 +64,7 @@ class Speaker:
         self.pa = pyaudio.PyAudio()
         
         # 播放任务管理（ID -> 播放信息）
-        self.play_tasks = {}  # 格式: {id: {stream, thread, is_playing, position, total_frames, samplerate}}
+        self.play_tasks = {}  # 格式: {id: {stream, thread, is_playing, resume, stopped, position, total_frames, samplerate}}
         self.task_lock = threading.Lock()  # 线程安全锁
         
         # 支持的格式
@@ -39,8 +85,9 @@ class Speaker:
         
         # 停止所有播放任务
         with self.task_lock:
-            for task_id in list(self.play_tasks.keys()):
-                self.stop(task_id)
+            task_ids = list(self.play_tasks.keys())
+        for task_id in task_ids:
+            self.stop(task_id)
 
     def enable_speaker(self):
         """开启喇叭"""
@@ -62,16 +109,67 @@ class Speaker:
         return self.supported_formats[ext]['handler']
 
     def _read_audio(self, file_path, handler):
-        """读取音频数据"""
+        """读取音频数据，返回只读、连续的 (帧数, 声道数) float32 数组"""
         if handler == 'soundfile':
-            data, samplerate = sf.read(file_path)
+            data, samplerate = sf.read(file_path, dtype='float32', always_2d=True)
         else:  # librosa
             data, samplerate = librosa.load(file_path, sr=None, mono=False)
             if data.ndim > 1:
                 data = data.T  # 转置为(帧数, 声道数)
-        return data.astype(np.float32), samplerate
+            else:
+                data = data[:, np.newaxis]
+        data = np.ascontiguousarray(data, dtype=np.float32)
+        # 缓存共享同一数组，禁止修改；只读缓冲区也可直接交给PyAudio
+        data.flags.writeable = False
+        return data, samplerate
+
+    @staticmethod
+    def _cache_key(file_path):
+        st = os.stat(file_path)
+        return os.path.abspath(file_path), st.st_mtime_ns, st.st_size
+
+    def _load(self, file_path):
+        """
+        获取音频来源：短文件完整解码并缓存，长文件返回流式解码信息
+        :return: (data 或 None, samplerate, channels, total_frames)
+        """
+        key = self._cache_key(file_path)
+        cached = self._cache.get(key)
+        if cached is not None:
+            data, samplerate = cached
+            return data, samplerate, data.shape[1], len(data)
 
-    def _play_background(self, task_id, data, samplerate, channels):
+        handler = self._get_handler(file_path)
+        if handler == 'soundfile':
+            info = sf.info(file_path)
+            if info.frames > self.STREAM_SECONDS * info.samplerate:
+                return None, info.samplerate, info.channels, info.frames
+
+        data, samplerate = self._read_audio(file_path, handler)
+        self._cache.put(key, data, samplerate)
+        return data, samplerate, data.shape[1], len(data)
+
+    def preload(self, file_path):
+        """
+        预先解码音效到缓存，之后 play() 几乎无延迟
+        """
+        self._load(file_path)
+
+    @staticmethod
+    def _chunks(file_path, data, chunk_size):
+        """按块产出可直接写入的字节视图（零拷贝）"""
+        if data is not None:
+            frame_bytes = data.shape[1] * data.itemsize
+            buffer = memoryview(data).cast('B')
+            for pos in range(0, len(data), chunk_size):
+                end = min(pos + chunk_size, len(data))
+                yield end - pos, buffer[pos * frame_bytes:end * frame_bytes]
+        else:
+            # 长文件：边解码边播放
+            for block in sf.blocks(file_path, blocksize=chunk_size, dtype='float32', always_2d=True):
+                yield len(block), memoryview(block).cast('B').toreadonly()
+
+    def _play_background(self, task_id, file_path, data, samplerate, channels):
         """后台播放线程函数"""
         try:
             # 打开音频流
@@ -79,47 +177,28 @@ class Speaker:
                 format=pyaudio.paFloat32,
                 channels=channels,
                 rate=samplerate,
-                output=True
+                output=True,
+                frames_per_buffer=self.CHUNK_SIZE
             )
 
             # 更新任务信息
             with self.task_lock:
-                self.play_tasks[task_id].update({
-                    'stream': stream,
-                    'is_playing': True,
-                    'position': 0,
-                    'total_frames': len(data),
-                    'samplerate': samplerate
-                })
-
-            chunk_size = 1024
-            task = self.play_tasks[task_id]
+                task = self.play_tasks[task_id]
+                task['stream'] = stream
 
             # 播放循环
-            while task['position'] < len(data) and task['is_playing']:
-                # 检查暂停状态
-                while not task['is_playing']:
-                    time.sleep(0.1)
-                    if task.get('stopped', False):
-                        break
-
-                if task.get('stopped', False):
+            for frames, chunk in self._chunks(file_path, data, self.CHUNK_SIZE):
+                # 暂停时阻塞等待恢复或停止
+                task['resume'].wait()
+                if task['stopped']:
                     break
 
-                # 计算当前块
-                end = min(task['position'] + chunk_size, len(data))
-                chunk = data[task['position']:end]
-                
-                # 处理单声道
-                if channels == 1 and len(chunk.shape) == 1:
-                    chunk = np.expand_dims(chunk, axis=1)
-
                 # 播放
-                stream.write(chunk.tobytes())
+                stream.write(chunk, frames)
                 
                 # 更新位置
                 with self.task_lock:
-                    task['position'] = end
+                    task['position'] += frames
 
         except Exception as e:
             print(f"播放错误 (ID: {task_id}): {str(e)}")
@@ -141,19 +220,22 @@ class Speaker:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"文件不存在：{file_path}")
 
-        # 读取音频数据
-        handler = self._get_handler(file_path)
-        data, samplerate = self._read_audio(file_path, handler)
-        channels = data.shape[1] if len(data.shape) > 1 else 1
+        # 读取音频数据（缓存命中时无需解码）
+        data, samplerate, channels, total_frames = self._load(file_path)
 
         # 生成唯一ID
         task_id = str(uuid4())
 
         # 初始化任务信息
+        resume = threading.Event()
+        resume.set()
         with self.task_lock:
             self.play_tasks[task_id] = {
-                'is_playing': False,
+                'is_playing': True,
+                'resume': resume,
                 'position': 0,
+                'total_frames': total_frames,
+                'samplerate': samplerate,
                 'thread': None,
                 'stopped': False
             }
@@ -162,14 +244,14 @@ class Speaker:
         thread = threading.Thread(
             name=f"play_background_{task_id}",
             target=self._play_background,
-            args=(task_id, data, samplerate, channels),
+            args=(task_id, file_path, data, samplerate, channels),
             daemon=True
         )
-        thread.start()
 
         # 记录线程信息
         with self.task_lock:
             self.play_tasks[task_id]['thread'] = thread
+        thread.start()
 
         return task_id
 
@@ -201,14 +283,18 @@ class Speaker:
         with self.task_lock:
             if task_id not in self.play_tasks:
                 raise ValueError(f"无效的播放ID：{task_id}")
-            self.play_tasks[task_id]['is_playing'] = False
+            task = self.play_tasks[task_id]
+            task['is_playing'] = False
+            task['resume'].clear()
 
     def resume(self, task_id):
         """恢复播放"""
         with self.task_lock:
             if task_id not in self.play_tasks:
                 raise ValueError(f"无效的播放ID：{task_id}")
-            self.play_tasks[task_id]['is_playing'] = True
+            task = self.play_tasks[task_id]
+            task['is_playing'] = True
+            task['resume'].set()
 
     def stop(self, task_id):
         """停止播放并清理资源"""
@@ -219,6 +305,7 @@ class Speaker:
             task = self.play_tasks[task_id]
             task['is_playing'] = False
             task['stopped'] = True
+            task['resume'].set()  # 唤醒暂停中的线程
 
         # 等待线程结束
         task['thread'].join(timeout=1.0)
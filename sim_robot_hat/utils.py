@@ -152,12 +152,20 @@ def reset_mcu():
     Reading ADC, manipulating PWM, etc.
     """
     from .pin import Pin
+    from .pwm import Timer_Manager
+    from .regcache import Register_Cache
+    from .sim_device import current_hat
+    hat = current_hat()
+    clock = hat.clock
     pin = Pin("MCURST")
     pin.off()
-    time.sleep(0.01)
+    clock.sleep(0.01)
     pin.on()
-    time.sleep(0.01)
+    clock.sleep(0.01)
     pin.close()
+    # registers of this HAT are back to power-on values
+    Register_Cache.invalidate_all(hat.name)
+    Timer_Manager.invalidate_all(hat.name)
 
 def get_battery_voltage():
     """
@@ -176,7 +184,30 @@ def get_battery_voltage():
     return voltage
 
 def get_username():
-    return os.popen('echo ${SUDO_USER:-$LOGNAME}').readline().strip()
+    """
+    Get the user running the program, the invoking user under sudo
+
+    :return: user name, same as ${SUDO_USER:-$LOGNAME}
+    :rtype: str
+    """
+    return os.environ.get('SUDO_USER') or os.environ.get('LOGNAME', '')
+
+def get_user_home(user=None):
+    """
+    Get a user's home directory from the password database
+
+    :param user: user name, defaults to get_username()
+    :type user: str
+    :return: home directory, '' if the user is unknown
+    :rtype: str
+    """
+    import pwd
+    if user is None:
+        user = get_username()
+    try:
+        return pwd.getpwnam(user).pw_dir
+    except KeyError:
+        return ''
 
 def set_pin(pin: int, value: bool):
     """